@@ -0,0 +1,221 @@
+import os
+import struct
+
+from app.editor_buffer.journal import HEADER, file_fingerprint
+
+# Record kinds. Every record is a kind byte, a payload length and the payload.
+EDIT = b"E"      # position and removed length, then the inserted text (UTF-8)
+SNAPSHOT = b"D"  # the whole document (UTF-8): replaces everything before it
+
+MAGIC = b"WAL1\n"
+# The log starts with the size and mtime of the file its records apply to
+_BASE = struct.Struct("<qq")
+_EDIT = struct.Struct("<qq")
+# The log is compacted into a snapshot once its edits outgrow both this and the document
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+def wal_path(filename: str) -> str:
+    """
+    Return the path of the autosave log kept beside a file (".<name>.wal").
+
+    Args:
+        filename (str): The document's path.
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, "." + name + ".wal")
+
+
+# Autosave Class
+class Autosave:
+    """
+    Write-ahead log of every change made to a buffer since its file was last saved.
+
+    The log listens to the buffer's edits and appends each one as a small record
+    before it is applied, so keeping unsaved work safe costs O(edit) rather than a
+    rewrite of the file. When the records outgrow the document, the log is compacted
+    into a single snapshot of the text (see compact_if_due). After a crash, recover() replays the log on
+    top of the saved file.
+    """
+    def __init__(self, buffer, filename: str, fsync: bool = False):
+        """
+        Args:
+            buffer (TextBuffer): The buffer to log.
+            filename (str): The file the buffer was loaded from or saved to.
+            fsync (bool): Force every record to disk (survives power loss, not just a crash).
+        """
+        self.buffer = buffer
+        self.filename = filename
+        self.path = wal_path(filename)
+        self.fsync = fsync
+        self.file = None
+        # Bytes of edit records since the last snapshot (or since the file was saved)
+        self.edit_bytes = 0
+        # A whole-document change happened, so the next record must be a snapshot
+        self._resync = False
+
+    def start(self, snapshot: bool = False) -> None:
+        """
+        Begin a log for the file as it is now on disk (after a load or save), empty
+        unless `snapshot` is given.
+
+        Args:
+            snapshot (bool): Start the log with a snapshot of the buffer's text, for a
+                buffer that differs from the file (e.g. one loaded from a swap copy).
+        """
+        self.close()
+        if snapshot:
+            self._write_snapshot()
+            self.file = open(self.path, "ab")
+        else:
+            self.file = open(self.path, "wb")
+            self.file.write(MAGIC + _BASE.pack(*file_fingerprint(self.filename)))
+            self._sync()
+        self.edit_bytes = 0
+        self._resync = False
+        self.buffer.add_edit_listener(self._on_edit)
+
+    def recover(self) -> int:
+        """
+        Replay the changes left in the log by a session that did not save them.
+
+        The changes are applied as a single undo step, and the log is kept so that
+        they stay safe until the next save. A log written against a different version
+        of the file is discarded.
+
+        Returns:
+            int: The number of records replayed.
+        """
+        records, end = self._read_log()
+        if not records:
+            self.start()
+            return 0
+
+        with self.buffer.group():
+            for kind, payload in records:
+                if kind == SNAPSHOT:
+                    position, removed = 0, self.buffer.get_cursor_limit()
+                    inserted = payload.decode("utf-8")
+                else:
+                    position, removed = _EDIT.unpack_from(payload)
+                    inserted = payload[_EDIT.size:].decode("utf-8")
+                self.buffer.move_cursor(position)
+                if removed:
+                    self.buffer.delete(removed)
+                if inserted:
+                    self.buffer.insert(inserted)
+
+        # Carry on appending after the last complete record
+        self.file = open(self.path, "r+b")
+        self.file.truncate(end)
+        self.file.seek(end)
+        self.edit_bytes = end
+        self.buffer.add_edit_listener(self._on_edit)
+        return len(records)
+
+    def _read_log(self):
+        """Return the complete records of a log that applies to the file on disk, and where they end."""
+        if not os.path.exists(self.path):
+            return [], 0
+        with open(self.path, "rb") as f:
+            data = f.read()
+
+        offset = len(MAGIC) + _BASE.size
+        if data[:len(MAGIC)] != MAGIC or len(data) < offset \
+                or _BASE.unpack_from(data, len(MAGIC)) != file_fingerprint(self.filename):
+            return [], 0
+
+        records = []
+        while offset + HEADER.size <= len(data):
+            kind, length = HEADER.unpack_from(data, offset)
+            end = offset + HEADER.size + length
+            if end > len(data):
+                break # A record cut short by the crash
+            records.append((kind, data[offset + HEADER.size:end]))
+            offset = end
+        return records, offset
+
+    def _on_edit(self, position, removed: str, inserted: str) -> None:
+        """
+        Log a change that is about to be applied.
+
+        Args:
+            position (int | None): Where the edit happens, or None if everything changes.
+            removed (str): Text about to be deleted at position.
+            inserted (str): Text about to be inserted at position.
+        """
+        if position is None:
+            # The new text is not known until the change is done: snapshot it next time
+            self._resync = True
+            return
+
+        payload = _EDIT.pack(position, len(removed)) + inserted.encode("utf-8")
+        self.file.write(HEADER.pack(EDIT, len(payload)) + payload)
+        self._sync()
+        self.edit_bytes += HEADER.size + len(payload)
+
+    def compact(self) -> None:
+        """
+        Replace the log with one snapshot of the current text, written to a temporary
+        file and renamed into place so a crash part-way leaves the old log intact.
+        """
+        self._write_snapshot()
+        self.file.close()
+        self.file = open(self.path, "ab")
+        self.edit_bytes = 0
+        self._resync = False
+
+    def _write_snapshot(self) -> None:
+        """Write a log holding just a snapshot of the current text, and rename it into place."""
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(MAGIC + _BASE.pack(*file_fingerprint(self.filename)))
+            length_at = f.tell() + 1
+            f.write(HEADER.pack(SNAPSHOT, 0))
+            length = 0
+            for chunk in self.buffer.iter_chunks():
+                data = chunk.encode("utf-8")
+                f.write(data)
+                length += len(data)
+            f.seek(length_at)
+            f.write(struct.pack("<I", length))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    def compact_if_due(self) -> None:
+        """
+        Compact the log if a whole-document change is pending or its edits have outgrown
+        the document. The buffer calls this before each change (or batch of changes),
+        when the text matches the log.
+        """
+        if self._resync or self.edit_bytes > max(COMPACT_MIN_BYTES, self.buffer.get_cursor_limit()):
+            self.compact()
+
+    def flush(self) -> None:
+        """
+        Make sure a whole-document change (e.g. a replace-all) is in the log now,
+        rather than just before the next edit.
+        """
+        if self._resync:
+            self.compact()
+
+    def _sync(self) -> None:
+        """Hand the written records to the OS, and to the disk if fsync is on."""
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def close(self, discard: bool = False) -> None:
+        """
+        Stop logging the buffer's edits.
+
+        Args:
+            discard (bool): Also delete the log, giving up any unsaved changes in it.
+        """
+        if self.file is not None:
+            self.buffer.remove_edit_listener(self._on_edit)
+            self.file.close()
+            self.file = None
+        if discard and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,296 @@
+import os
+import tempfile
+from collections import OrderedDict
+from functools import partial
+
+from app.editor_buffer.autosave import wal_path
+from app.editor_buffer.engines import create_buffer
+from app.utils.file_manager import FileManager
+
+
+# BufferManager Class
+class BufferManager:
+    """
+    Keeps many documents open at once within a shared memory budget.
+
+    Every open document is a dict (name, filename, engine, buffer, dirty, swap, history).
+    Only some of them hold a loaded buffer: when the loaded buffers together go over
+    `memory_limit`, the least recently used ones are evicted, and they are loaded
+    again the next time they are switched to. A document with unsaved changes is
+    first written to a swap file, so evicting it never loses an edit, and its undo
+    history is kept in memory in encoded form (see TextBuffer.export_history).
+    """
+    def __init__(self, factory=create_buffer, memory_limit: int = None):
+        """
+        Args:
+            factory (Callable): Creates an empty buffer from an engine name.
+            memory_limit (int): Budget for all loaded buffers in bytes (see
+                TextBuffer.memory_usage), or None for no limit.
+
+        Raises:
+            ValueError: If the memory limit is negative.
+        """
+        if memory_limit is not None and memory_limit < 0:
+            raise ValueError("Memory limit cannot be negative")
+
+        self.factory = factory
+        self.memory_limit = memory_limit
+        # Open documents by name, least recently used first
+        self.documents = OrderedDict()
+        self.current = None
+        self._untitled = 0
+        # Swap files of evicted documents with unsaved changes, created on first use
+        self._swap_dir = None
+        self._swaps = 0
+
+    @property
+    def buffer(self):
+        """The buffer of the current document (loaded on demand), or None if nothing is open."""
+        if self.current is None:
+            return None
+        return self._loaded(self.documents[self.current])
+
+    def open(self, filename: str, engine: str = None):
+        """
+        Open a file as a new document and make it current, or switch to it if it is
+        already open.
+
+        Args:
+            filename (str): The file to open. It does not have to exist yet.
+            engine (str): The engine to hold it, by default the one FileManager recommends.
+
+        Returns:
+            TextBuffer: The document's buffer.
+
+        Raises:
+            ValueError: If the engine name is not recognised, or the file cannot be read.
+        """
+        name = os.path.abspath(filename)
+        if name not in self.documents:
+            document = self._document(name, filename, engine or FileManager.recommended_engine(filename))
+            self._loaded(document)
+            self.documents[name] = document
+        return self.switch(name)
+
+    def new(self, engine: str = "gap_buffer"):
+        """
+        Start an empty, unnamed document and make it current.
+
+        Args:
+            engine (str): The engine to hold it.
+
+        Returns:
+            TextBuffer: The document's buffer.
+
+        Raises:
+            ValueError: If the engine name is not recognised.
+        """
+        document = self._document(f"untitled-{self._untitled + 1}", None, engine)
+        self._loaded(document)
+        self._untitled += 1
+        self.documents[document["name"]] = document
+        return self.switch(document["name"])
+
+    def _document(self, name: str, filename: str, engine: str):
+        """Return the record of a document that is not loaded yet."""
+        return {"name": name, "filename": filename, "engine": engine,
+                "buffer": None, "dirty": False, "swap": None, "history": None, "loading": False}
+
+    def switch(self, name: str):
+        """
+        Make an open document current, loading it if it was evicted.
+
+        Args:
+            name (str): The document's name, as listed by list_documents(), or its filename.
+
+        Returns:
+            TextBuffer: The document's buffer.
+
+        Raises:
+            ValueError: If no document has that name, or it was evicted and cannot be read back.
+        """
+        if name not in self.documents and os.path.abspath(name) in self.documents:
+            name = os.path.abspath(name)
+        if name not in self.documents:
+            raise ValueError(f"No open document named '{name}'")
+
+        buffer = self._loaded(self.documents[name])
+        self.current = name
+        self.documents.move_to_end(name)
+        self._enforce_memory_limit()
+        return buffer
+
+    def list_documents(self) -> list:
+        """
+        Describe every open document, least recently used first.
+
+        Returns:
+            list: A dict per document with its name, filename, engine, whether it is
+                loaded, current or dirty, and the bytes its buffer holds (0 if evicted).
+        """
+        return [{
+            "name": document["name"],
+            "filename": document["filename"],
+            "engine": document["engine"],
+            "loaded": document["buffer"] is not None,
+            "current": document["name"] == self.current,
+            "dirty": document["dirty"],
+            "bytes": document["buffer"].memory_usage() if document["buffer"] else 0,
+        } for document in self.documents.values()]
+
+    def memory_usage(self) -> int:
+        """Return the bytes held by every loaded buffer (see TextBuffer.memory_usage)."""
+        return sum(document["buffer"].memory_usage()
+                   for document in self.documents.values() if document["buffer"] is not None)
+
+    def save(self, filename: str = None) -> bool:
+        """
+        Save the current document, to its own file or under a new name.
+
+        Args:
+            filename (str): Where to save it. Required for an unnamed document.
+
+        Returns:
+            bool: True if it was saved. If the file could not be written, the document
+                keeps its filename, stays dirty and keeps its swap file.
+
+        Raises:
+            ValueError: If nothing is open, or an unnamed document is given no filename.
+        """
+        if self.current is None:
+            raise ValueError("No document is open")
+
+        document = self.documents[self.current]
+        filename = filename or document["filename"]
+        if not filename:
+            raise ValueError("Unnamed document: give a filename to save it to")
+
+        if not self._loaded(document).save_to_file(filename):
+            return False
+        document["filename"] = filename
+        document["dirty"] = False
+        self._drop_swap(document)
+        return True
+
+    def close(self, name: str = None) -> None:
+        """
+        Close a document, giving up any unsaved changes. If it was current, the most
+        recently used remaining document becomes current.
+
+        Args:
+            name (str): The document to close, the current one by default.
+
+        Raises:
+            ValueError: If no document has that name.
+        """
+        name = name or self.current
+        if name not in self.documents:
+            raise ValueError(f"No open document named '{name}'")
+
+        document = self.documents.pop(name)
+        # Unsaved changes are given up, so their autosave log goes too
+        if document["buffer"] is not None:
+            document["buffer"].configure_autosave(False)
+            document["buffer"].close()
+        elif document["dirty"] and document["filename"] and os.path.exists(wal_path(document["filename"])):
+            os.remove(wal_path(document["filename"]))
+        self._drop_swap(document)
+        if name == self.current:
+            self.current = next(reversed(self.documents), None)
+
+    def close_all(self) -> None:
+        """Close every document and delete the swap files."""
+        for name in list(self.documents):
+            self.close(name)
+        if self._swap_dir is not None:
+            self._swap_dir.cleanup()
+            self._swap_dir = None
+
+    def _loaded(self, document):
+        """
+        Return a document's buffer, loading it from its swap file or its own file first
+        if needed. A swap file is loaded as a copy of the document's file, so the journal
+        and autosave log stay with the document's file.
+
+        Raises:
+            ValueError: If the file cannot be read.
+        """
+        if document["buffer"] is None:
+            buffer = self.factory(document["engine"])
+            # Attached before loading, so that unsaved edits the load recovers from the
+            # autosave log mark the document dirty
+            buffer.add_edit_listener(partial(self._mark_dirty, document))
+            filename, swap = document["filename"], document["swap"]
+            if swap or (filename and os.path.exists(filename)):
+                document["loading"] = True
+                if filename and swap:
+                    loaded = buffer.load_from_file(filename, source=swap)
+                else:
+                    loaded = buffer.load_from_file(swap or filename)
+                document["loading"] = False
+                if not loaded:
+                    buffer.close()
+                    raise ValueError(f"Cannot read '{swap or filename}'")
+            if document["history"] is not None:
+                buffer.import_history(document["history"])
+                document["history"] = None
+            document["buffer"] = buffer
+        return document["buffer"]
+
+    def _mark_dirty(self, document, position, removed: str, inserted: str) -> None:
+        """Edit listener: the document now differs from its file."""
+        if document["loading"]:
+            # The load's own whole-document change, which is not an edit
+            document["loading"] = False
+            return
+        document["dirty"] = True
+
+    def _enforce_memory_limit(self) -> None:
+        """Evict the least recently used loaded documents until the rest fit in the budget."""
+        if self.memory_limit is None:
+            return
+
+        usage = self.memory_usage()
+        for document in list(self.documents.values()):
+            if usage <= self.memory_limit:
+                break
+            if document["buffer"] is None or document["name"] == self.current:
+                continue
+            size = document["buffer"].memory_usage()
+            if self._evict(document):
+                usage -= size
+
+    def _evict(self, document) -> bool:
+        """
+        Unload a document's buffer, writing it to a swap file first if it has unsaved
+        changes, and keeping its encoded undo history. Returns False (and keeps it
+        loaded) if the swap file cannot be written.
+        """
+        buffer = document["buffer"]
+        if document["dirty"]:
+            if self._swap_dir is None:
+                self._swap_dir = tempfile.TemporaryDirectory(prefix="editor-swap-")
+            swap = document["swap"]
+            if swap is None:
+                self._swaps += 1
+                swap = os.path.join(self._swap_dir.name, "%d.swap" % self._swaps)
+            # Written directly rather than with save_to_file, which would move the
+            # journal and autosave log over to the swap file
+            try:
+                FileManager.save_chunks(buffer.iter_chunks(), swap)
+            except (OSError, ValueError) as e:
+                print(f"Failed to write swap file: {e}")
+                return False
+            document["swap"] = swap
+
+        document["history"] = buffer.export_history()
+        buffer.close()
+        document["buffer"] = None
+        return True
+
+    def _drop_swap(self, document) -> None:
+        """Delete a document's swap file, once its contents are saved or given up."""
+        if document["swap"] is not None:
+            if os.path.exists(document["swap"]):
+                os.remove(document["swap"])
+            document["swap"] = None
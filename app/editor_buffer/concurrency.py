@@ -0,0 +1,229 @@
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from app.editor_buffer.search import SEARCH_CHUNK_SIZE, find_iter, regex_iter
+from app.utils.file_manager import FileManager
+
+# Public operations run under the read lock while locking is on (see TextBuffer.configure_locking)
+READ_OPERATIONS = (
+    "get_text", "get_range", "get_selection", "get_cursors", "get_line",
+    "offset_to_line_col", "line_col_to_offset", "find", "memory_usage", "snapshot",
+)
+# Public operations run under the write lock: every edit, cursor or selection change,
+# and anything that touches the history or the files
+WRITE_OPERATIONS = (
+    "insert", "delete", "move_cursor", "select", "delete_selection", "delete_range",
+    "replace_range", "replace_all", "add_cursor", "clear_cursors", "insert_at_cursors",
+    "delete_at_cursors", "move_up", "move_down", "move_line_start", "move_line_end",
+    "find_next", "undo", "redo", "begin_group", "end_group", "record_state",
+    "history_usage", "get_stats", "configure_history", "configure_autosave", "flush_autosave",
+    "save_to_file", "load_from_file", "close",
+)
+
+
+# ReadWriteLock Class
+class ReadWriteLock:
+    """
+    A lock that lets many threads read at once, or one thread write.
+
+    Waiting writers take priority over new readers, so a stream of background reads
+    cannot starve the editing thread. Both sides are reentrant within a thread, and
+    the writing thread may also read, so locked operations can call each other.
+    A thread holding the read lock cannot upgrade to the write lock.
+    """
+    def __init__(self):
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writers_waiting = 0
+        # Thread holding the write lock, and how many times it has taken it
+        self._writer = None
+        self._write_depth = 0
+        # Per-thread depth of nested reads
+        self._local = threading.local()
+
+    def acquire_read(self) -> None:
+        """Wait until no thread is writing or waiting to write, then start reading."""
+        if self._writer == threading.get_ident():
+            return
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            with self._condition:
+                while self._writer is not None or self._writers_waiting:
+                    self._condition.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+
+    def release_read(self) -> None:
+        """Stop reading, letting a waiting writer in once the last reader is done."""
+        if self._writer == threading.get_ident():
+            return
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    def acquire_write(self) -> None:
+        """
+        Wait until no other thread is reading or writing, then start writing.
+
+        Raises:
+            RuntimeError: If this thread is holding the read lock.
+        """
+        me = threading.get_ident()
+        if self._writer == me:
+            self._write_depth += 1
+            return
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("Cannot write while holding the read lock")
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer is not None or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        """Stop writing, letting the waiting readers or the next writer in."""
+        self._write_depth -= 1
+        if self._write_depth == 0:
+            with self._condition:
+                self._writer = None
+                self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Context manager holding the read lock."""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Context manager holding the write lock."""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+    def reading(self, method):
+        """Wrap a method so that it runs holding the read lock."""
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.read():
+                return method(*args, **kwargs)
+        return wrapper
+
+    def writing(self, method):
+        """Wrap a method so that it runs holding the write lock."""
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.write():
+                return method(*args, **kwargs)
+        return wrapper
+
+
+# Snapshot Class
+class Snapshot:
+    """
+    A read-only view of a buffer's text as it was at one version.
+
+    A snapshot never changes, whatever is done to the buffer afterwards, so it can be
+    read from any thread without locking - by autosave, search indexing or syntax
+    scanning while the user keeps editing. Taking one does not copy the document
+    (see TextBuffer.snapshot for what each engine shares).
+    """
+    def __init__(self, version: int, length: int, read):
+        """
+        Args:
+            version (int): The buffer's version when the snapshot was taken.
+            length (int): Length of the text.
+            read (Callable): read(position, count) returning the text of a span.
+        """
+        self.version = version
+        self._length = length
+        self._reader = read
+
+    def __len__(self) -> int:
+        return self._length
+
+    def get_cursor_limit(self) -> int:
+        """Length of the text (named as on TextBuffer, so the search helpers accept a snapshot)."""
+        return self._length
+
+    def _read(self, position: int, count: int) -> str:
+        """Return `count` characters starting at `position` (assumed to be available)."""
+        return self._reader(position, count)
+
+    def get_text(self) -> str:
+        """Return the whole text."""
+        return self._read(0, self._length)
+
+    def get_range(self, start: int, end: int) -> str:
+        """
+        Return the text between two offsets.
+
+        Args:
+            start (int): Starting index of the range.
+            end (int): Ending index (exclusive).
+
+        Raises:
+            ValueError: If the range is invalid.
+        """
+        if not (0 <= start <= end <= self._length):
+            raise ValueError("Invalid range")
+        return self._read(start, end - start)
+
+    def iter_chunks(self, chunk_size: int = SEARCH_CHUNK_SIZE):
+        """
+        Yield the text in order, at most `chunk_size` characters at a time.
+
+        Args:
+            chunk_size (int): Maximum number of characters per chunk.
+        """
+        for position in range(0, self._length, chunk_size):
+            yield self._read(position, min(chunk_size, self._length - position))
+
+    def find(self, pattern: str, start: int = 0) -> int:
+        """
+        Return the offset of the first occurrence of a substring at or after `start`, or -1.
+
+        Raises:
+            ValueError: If the pattern is empty.
+        """
+        return next(find_iter(self, pattern, start), -1)
+
+    def find_all(self, pattern: str, start: int = 0):
+        """
+        Lazily yield the offsets of every non-overlapping occurrence of a substring.
+
+        Raises:
+            ValueError: If the pattern is empty.
+        """
+        return find_iter(self, pattern, start)
+
+    def find_regex(self, pattern, start: int = 0):
+        """Lazily yield the (start, end) spans of regular expression matches."""
+        return regex_iter(self, pattern, start)
+
+    def save_to_file(self, filename: str) -> None:
+        """
+        Write the text to a file, streaming it a chunk at a time.
+
+        Unlike TextBuffer.save_to_file this does not mark the buffer as saved: it is
+        meant for background copies such as backups.
+
+        Args:
+            filename (str): The file path to save to.
+
+        Raises:
+            ValueError: If the filename is empty.
+            IOError: If the file cannot be written.
+        """
+        FileManager.save_chunks(self.iter_chunks(), filename)
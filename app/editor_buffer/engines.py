@@ -0,0 +1,28 @@
+from app.editor_buffer.gap_buffer import GapBuffer
+from app.editor_buffer.piece_table import PieceTable
+from app.editor_buffer.rope import Rope
+from app.editor_buffer.text_buffer import TextBuffer
+
+# Every document engine that implements the TextBuffer interface, by name
+ENGINES = {
+    "gap_buffer": GapBuffer,
+    "piece_table": PieceTable,
+    "rope": Rope,
+}
+
+def create_buffer(engine: str = "gap_buffer") -> TextBuffer:
+    """
+    Create an empty buffer using the named engine.
+
+    Args:
+        engine (str): A key of ENGINES.
+
+    Returns:
+        TextBuffer: The new, empty buffer.
+
+    Raises:
+        ValueError: If the engine name is not recognised.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Choose from: {', '.join(ENGINES)}")
+    return ENGINES[engine]()
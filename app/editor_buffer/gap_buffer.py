@@ -1,7 +1,27 @@
-from app.utils.file_manager import FileManager
+import struct
+import sys
+import weakref
+from array import array, typecodes
+from functools import partial
+
+from app.editor_buffer.text_buffer import CHUNK_SIZE, TextBuffer
+
+# Typecode for the compact storage mode: one fixed-width code unit per character.
+# 'w' (UCS-4) replaces the deprecated wchar_t-based 'u' from Python 3.13 onwards.
+ARRAY_TYPECODE = 'w' if 'w' in typecodes else 'u'
+# Characters of text one step of a batch sweep costs about as much as copying: batches
+# with more edits than the text length divided by this are applied by a rebuild instead
+SWEEP_EDIT_COST = 64
+# Bytes a slot of list storage takes (a pointer to a one-character string)
+LIST_SLOT_BYTES = struct.calcsize("P")
+# Default growth policy (see GapBuffer.configure_growth)
+GROWTH_FACTOR = 2.0
+MIN_GAP = 64
+MAX_SLACK = 16 * 1024 * 1024
+SHRINK_FACTOR = 4.0
 
 # GapBuffer Class: @IsaMukadam
-class GapBuffer:
+class GapBuffer(TextBuffer):
     """
     A gap buffer data structure used for efficient text editing operations.
 
@@ -9,24 +29,117 @@ class GapBuffer:
     Insertions occur at the gap, and cursor movement adjusts the gap position,
     minimising the number of memory operations compared to standard lists or strings.
     """
-    def __init__(self, initial_size=100):
+    def __init__(self, initial_size=100, storage: str = "list"):
         """
         Initialise the gap buffer.
 
         Args:
             initial_size (int): Intial size of the underlying buffer.
+            storage (str): "list" stores a list of one-character strings, "array"
+                stores a compact array of code units (several times less memory).
+
+        Raises:
+            ValueError: If the storage mode is not recognised.
         """
+        if storage not in ("list", "array"):
+            raise ValueError(f"Unknown storage mode: {storage}")
+
+        super().__init__()
+
         # Basic functionality:
-        self.buffer = [''] * initial_size
+        self.storage = storage
+        self.buffer = self._blank(initial_size)
         self.gap_start = 0
         self.gap_end = initial_size
         self.size = initial_size
-        # Selection functionality
-        self.selection_start = None
-        self.selection_end = None
-        # Unde/Redo functionality:
-        self.undo_stack = []
-        self.redo_stack = []
+        # How much room to leave when the buffer grows, and when to give it back (see configure_growth)
+        self.growth_config = {"growth": GROWTH_FACTOR, "min_gap": MIN_GAP,
+                              "max_slack": MAX_SLACK, "shrink": SHRINK_FACTOR}
+        # The storage is shared with snapshots (their readers, while alive), and copied
+        # before text they can see changes
+        self._shared = False
+        self._sharers = weakref.WeakSet()
+
+    ########################## STORAGE HELPERS ###########################
+
+    def _blank(self, length: int):
+        """Return `length` empty slots in the current storage mode."""
+        if self.storage == "array":
+            return array(ARRAY_TYPECODE, '\0' * length)
+        return [''] * length
+
+    def _to_storage(self, text: str):
+        """Convert a string into something that can be slice-assigned into the buffer."""
+        if self.storage == "array":
+            return array(ARRAY_TYPECODE, text)
+        return text
+
+    def _to_text(self, chunk) -> str:
+        """Convert a slice of the buffer back into a string."""
+        if self.storage == "array":
+            return chunk.tounicode()
+        return ''.join(chunk)
+
+    def _count_copy(self, event: str, slots: int) -> None:
+        """Count an event that copied `slots` slots of storage (stats must be on)."""
+        slot_bytes = self.buffer.itemsize if self.storage == "array" else LIST_SLOT_BYTES
+        self._stats.count(event)
+        self._stats.count("bytes_copied", slots * slot_bytes)
+
+    ########################## GROWTH POLICY ###########################
+
+    def configure_growth(self, growth: float = GROWTH_FACTOR, min_gap: int = MIN_GAP,
+                         max_slack: int = MAX_SLACK, shrink: float = SHRINK_FACTOR) -> None:
+        """
+        Set how much room the buffer leaves when it grows, and when it gives room back.
+
+        When an insert does not fit in the gap, the buffer grows once, to the new text
+        length times `growth`, but with a gap of at least `min_gap` and at most
+        `max_slack` slots. Once deletions leave a gap more than `shrink` times what
+        growing would leave for the remaining text, the buffer is shrunk back to that
+        size. The gap between the two thresholds stops a buffer that keeps growing
+        and shrinking by a little from being copied on every edit.
+
+        Args:
+            growth (float): Buffer size relative to the text when growing (at least 1).
+            min_gap (int): Smallest gap left after growing or shrinking.
+            max_slack (int): Largest gap left after growing or shrinking, or None for no bound.
+            shrink (float): How many times too large the gap may get before the buffer
+                shrinks (greater than 1), or None to never shrink.
+
+        Raises:
+            ValueError: If a setting is out of range.
+        """
+        if growth < 1 or min_gap < 0 or (max_slack is not None and max_slack < min_gap):
+            raise ValueError("Invalid growth policy")
+        if shrink is not None and shrink <= 1:
+            raise ValueError("Shrink factor must be greater than 1")
+
+        self.growth_config = {"growth": growth, "min_gap": min_gap, "max_slack": max_slack, "shrink": shrink}
+        self._shrink_if_sparse()
+
+    def _slack(self, length: int) -> int:
+        """Return the gap the growth policy leaves beside `length` characters of text."""
+        config = self.growth_config
+        slack = max(int(length * (config["growth"] - 1)), config["min_gap"])
+        if config["max_slack"] is not None:
+            slack = min(slack, config["max_slack"])
+        return slack
+
+    def _grow(self, needed: int) -> None:
+        """Grow the buffer once so that the gap holds at least `needed` more characters."""
+        length = self.get_cursor_limit() + needed
+        self.resize(length + self._slack(length))
+
+    def _shrink_if_sparse(self) -> None:
+        """Give room back once the gap has grown well past what the growth policy would leave."""
+        shrink = self.growth_config["shrink"]
+        if shrink is None:
+            return
+        length = self.get_cursor_limit()
+        slack = self._slack(length)
+        if self.gap_end - self.gap_start > shrink * slack:
+            self._reallocate(length + slack, "shrinks")
 
     ########################## BASIC GAPBUFFER FUNCTIONALITY ###########################
 
@@ -42,8 +155,22 @@ class GapBuffer:
         """
         if new_size <= len(self.buffer):
             return
-        
-        new_buffer = [''] * new_size
+        self._reallocate(new_size, "resizes")
+
+    def _reallocate(self, new_size: int, event: str) -> None:
+        """
+        Copy the text into a new buffer of `new_size` slots (at least the text length),
+        keeping the gap where it is.
+
+        Args:
+            new_size (int): The new buffer size.
+            event (str): Stats counter for the copy ("resizes" or "shrinks").
+        """
+        if self._stats is not None:
+            self._count_copy(event, self.get_cursor_limit())
+            self._stats.peak("largest_buffer", new_size)
+
+        new_buffer = self._blank(new_size)
         # Copy text before gap
         new_buffer[:self.gap_start] = self.buffer[:self.gap_start]
         # Copy text after gap
@@ -52,27 +179,29 @@ class GapBuffer:
         # Update gap_end to new location after resizing
         self.gap_end = new_size - after_gap_length
         self.buffer = new_buffer
+        self._shared = False
+        self.size = new_size
     
 
-    def insert(self, text: str) -> None:
+    def _insert_text(self, text: str) -> None:
         """
-        Insert a string of text at the current cursor (gap start) position.
+        Write text into the gap at the cursor without touching the undo history.
 
         If the gap is not large enough to hold the new text, the buffer is resized.
 
         Args:
             text (str): The text to insert.
-
-        Returns:
-            None
         """
-        self.record_state()
+        length = len(text)
+        if length > self.gap_end - self.gap_start:
+            # Grow once for the whole insert rather than once per overflowing character
+            self._grow(length)
 
-        for char in text:
-            if self.gap_start == self.gap_end:
-                self.resize(len(self.buffer) * 2)
-            self.buffer[self.gap_start] = char
-            self.gap_start += 1 
+        # Write the whole string into the gap as a single slice assignment
+        self.buffer[self.gap_start:self.gap_start + length] = self._to_storage(text)
+        self.gap_start += length
+        if self._lines is not None:
+            self._lines.insert(text)
 
 
     def get_text(self) -> str:
@@ -82,134 +211,202 @@ class GapBuffer:
         Returns:
             str: The full visible text in the buffer.
         """
-        return ''.join(self.buffer[:self.gap_start] + self.buffer[self.gap_end:])
+        return self._to_text(self.buffer[:self.gap_start]) + self._to_text(self.buffer[self.gap_end:])
     
     def get_cursor_limit(self) -> int:
         """Returns the valid range of cursor movement (i.e., text length)."""
         return self.gap_start + (len(self.buffer) - self.gap_end)
 
-    def move_cursor(self, position: int) -> None:
+    @property
+    def cursor(self) -> int:
+        """The cursor always sits at the start of the gap."""
+        return self.gap_start
+
+    def _move_to(self, position: int) -> None:
         """
-        Move the cursor (gap) to the specified position in the text.
+        Move the gap to the specified position without touching the undo history.
 
         Args:
-            position(int): The new cursor position.
-
-        Raises:
-            ValueError: If position is out of bounds.
+            position(int): The new cursor position (assumed to be within bounds).
         """
-        # Ensure the new cursor position is within valid bounds (0 to size inclusive)
-        if not 0 <= position <= self.get_cursor_limit():
-            raise ValueError("Cursor position out of bounds")
-        
-        # Assuming it is within bounds record the state
-        self.record_state()
+        if self._shared and position != self.gap_start:
+            self._unshare()
+        if self._stats is not None and position != self.gap_start:
+            self._count_copy("gap_moves", abs(position - self.gap_start))
+            self._stats.count("gap_move_distance", abs(position - self.gap_start))
 
         # Case 1: Move the gap to the left (cursor is before current gap start)
         if position < self.gap_start:
-            # Shift characters from before the gap into the gap space, one by one
-            while self.gap_start > position:
-                self.gap_start -= 1               # Move gap_start one step left
-                self.gap_end -= 1                 # Move gap_end one step left
-                self.buffer[self.gap_end] = self.buffer[self.gap_start]  # Copy char to the right side
-                self.buffer[self.gap_start] = ''  # Clear original position
+            # Shift the block of characters between position and the gap across it in one copy
+            distance = self.gap_start - position
+            self.buffer[self.gap_end - distance:self.gap_end] = self.buffer[position:self.gap_start]
+            # Clear the vacated slots that now belong to the gap
+            self.buffer[position:min(self.gap_start, self.gap_end - distance)] = \
+                self._blank(min(self.gap_start, self.gap_end - distance) - position)
+            self.gap_start -= distance
+            self.gap_end -= distance
 
         # Case 2: Move the gap to the right (cursor is after current gap start)
         elif position > self.gap_start:
-            # Shift characters from after the gap into the gap space, one by one
-            while self.gap_start < position:
-                self.buffer[self.gap_start] = self.buffer[self.gap_end]  # Copy char from right into left
-                self.buffer[self.gap_end] = ''      # Clear original right-side char
-                self.gap_start += 1                 # Move gap_start one step right
-                self.gap_end += 1                   # Move gap_end one step right
+            # Shift the block of characters just after the gap across it in one copy
+            distance = position - self.gap_start
+            self.buffer[self.gap_start:position] = self.buffer[self.gap_end:self.gap_end + distance]
+            # Clear the vacated slots that now belong to the gap
+            clear_from = max(position, self.gap_end)
+            self.buffer[clear_from:self.gap_end + distance] = self._blank(self.gap_end + distance - clear_from)
+            self.gap_start += distance
+            self.gap_end += distance
 
+        if self._lines is not None:
+            self._lines.move(position)
 
 
-    def delete(self, count: int = 1) -> None:
+    def _delete_text(self, count: int) -> None:
         """
-        Delete a number of characters after the cursor (i.e. from the right side of the gap).
+        Remove characters after the cursor without touching the undo history,
+        shrinking the buffer if that leaves the gap far too large.
 
         Args:
-            count (int): Number of characters to delete. Default is 1.
-
-        Raises:
-            ValueError: If trying to delete more characters than available
+            count (int): Number of characters to delete (assumed to be available).
         """
-        self.record_state()
-        
-        available = len(self.buffer) - self.gap_end
-        if count < 0 or count > available:
-            raise ValueError("Invalid delete count")
-        
-        for _ in range(count):
-            self.buffer[self.gap_end] = ''
-            self.gap_end += 1
+        self._widen_gap(count)
+        self._shrink_if_sparse()
 
-    ########################## SELECTION GAPBUFFER FUNCTIONALITY ###########################
+    def _widen_gap(self, count: int) -> None:
+        """Remove characters after the cursor by widening the gap over them."""
+        if self._shared:
+            self._unshare()
+        # Clear the deleted characters and widen the gap over them in one step
+        self.buffer[self.gap_end:self.gap_end + count] = self._blank(count)
+        self.gap_end += count
+        if self._lines is not None:
+            self._lines.delete(count)
 
-    def select(self, start: int, end: int) -> None:
+    def _read(self, position: int, count: int) -> str:
         """
-        Select a range of text from start to end (non-inclusive).
+        Return `count` characters starting at `position`, reading around the gap.
 
         Args:
-            start (int): Starting index of selection.
-            end (int): Ending index (exclusive).
-
-        Raises:
-            ValueError: If selection range is invalid.
-        """
-        self.record_state()
-
-        if not (0 <= start <= end <= self.size):
-            raise ValueError("Invalid selection range")
-        
-        self.selection_start = start
-        self.selection_end = end
-
-    def get_selection(self) -> str:
-        """
-        Return the currently selected text.
-
-        Returns:
-            str: The selected substring, or an empty string if none selected.
-        """
-        if self.selection_start is None or self.selection_end is None:
-            return ''
-        
-        text = self.get_text()
-        return text[self.selection_start:self.selection_end]
-    
-    def delete_selection(self) -> None:
-        """
-        Delete the currently selected text.
-
-        Returns:
-            None
-        """
-         # If no selection is active, do nothing and return
-        if self.selection_start is None or self.selection_end is None:
-            return
-        
-        # Recording the state assuming something has been selected for deletion
-        self.record_state()
-
-        # Move the gap to the beginning of the selection range
-        self.move_cursor(self.selection_start)
-
-        # Calculate how many characters are in the selection
-        count = self.selection_end - self.selection_start
-
-        # For each character in the selection, move the gap_end pointer forward,
-        # and overwrite characters with empty strings (effectively deleting them)
-        for _ in range(count):
-            if self.gap_end < self.size:
-                self.buffer[self.gap_end] = ''  # Clear the character after the gap
-                self.gap_end += 1              # Expand the gap forward
-
-        # Clear the selection markers since it's been deleted
-        self.selection_start = None
-        self.selection_end = None
+            position (int): Text offset to start reading from.
+            count (int): Number of characters to read (assumed to be available).
+        """
+        return self._read_around(self.buffer, self.gap_start, self.gap_end, position, count)
+
+    def _read_around(self, buffer, gap_start: int, gap_end: int, position: int, count: int) -> str:
+        """Read a span of `buffer` as _read does, given where its gap is."""
+        end = position + count
+        if end <= gap_start:
+            return self._to_text(buffer[position:end])
+        gap_length = gap_end - gap_start
+        if position >= gap_start:
+            return self._to_text(buffer[position + gap_length:end + gap_length])
+        # The span straddles the gap
+        return (self._to_text(buffer[position:gap_start])
+                + self._to_text(buffer[gap_end:end + gap_length]))
+
+    def _snapshot_reader(self):
+        """
+        Share the storage with the snapshot instead of copying it. Inserts only write
+        into the gap, which the snapshot does not read; anything else that would
+        overwrite text it can see copies the storage first (see _unshare).
+        """
+        if not self._shared:
+            self._shared = True
+            self._sharers = weakref.WeakSet()
+        reader = partial(self._read_around, self.buffer, self.gap_start, self.gap_end)
+        self._sharers.add(reader)
+        return reader
+
+    def _unshare(self) -> None:
+        """Copy the storage shared with snapshots before changing text they can see."""
+        self._shared = False
+        if len(self._sharers):
+            if self._stats is not None:
+                self._count_copy("snapshot_copies", len(self.buffer))
+            self.buffer = self.buffer[:]
+
+    def _apply_batch(self, edits) -> None:
+        """
+        Apply several edits either in one forward sweep of the gap or, when they are
+        dense enough that per-edit steps would cost more than copying the text, by
+        rebuilding the buffer in one pass.
 
+        Args:
+            edits (list): (position, removed, inserted) tuples in increasing, non-overlapping
+                position order, with positions in the document as it is before the batch.
+        """
+        self._notify_batch(edits)
+        self._lines = None # Rebuilt on demand for the new text
+        if len(edits) * SWEEP_EDIT_COST < self.get_cursor_limit():
+            self._sweep_batch(edits)
+        else:
+            self._rebuild_batch(edits)
+
+    def _sweep_batch(self, edits) -> None:
+        """
+        Grow the buffer once for the whole batch, then move the gap through the edits in
+        position order, so the text between the first and last edit crosses the gap only
+        once. Finally the gap returns to just after the first edit's inserted text.
+        """
+        # Room for the most the text grows at any point of the sweep
+        growth = peak = 0
+        for _, removed, inserted in edits:
+            growth += len(inserted) - len(removed)
+            peak = max(peak, growth)
+        if peak > self.gap_end - self.gap_start:
+            self._grow(peak)
+
+        # Deletions only widen the gap during the sweep: later inserts may need the room
+        shift = 0
+        for position, removed, inserted in edits:
+            self._move_to(position + shift)
+            self._widen_gap(len(removed))
+            self._insert_text(inserted)
+            shift += len(inserted) - len(removed)
+        self._move_to(edits[0][0] + len(edits[0][2]))
+        self._shrink_if_sparse()
+
+    def _rebuild_batch(self, edits) -> None:
+        """
+        Rebuild the buffer from the edited text in one pass, with the gap after the first edit.
+        """
+        chunks = self._batch_chunks(edits)
+        self._rebuild(''.join(chunks[:2]), ''.join(chunks[2:]))
+
+    def _rewrite(self, text: str, cursor: int) -> None:
+        """
+        Rebuild the buffer from the new text in one pass, with the gap at the cursor.
+        """
+        self._notify_edit(None, "", "")
+        self._lines = None # Rebuilt on demand for the new text
+        self._rebuild(text[:cursor], text[cursor:])
+
+    def _rebuild(self, head: str, tail: str) -> None:
+        """
+        Replace the storage with `head` and `tail` on either side of the gap.
+        """
+        if self._stats is not None:
+            self._count_copy("rebuilds", len(head) + len(tail))
+
+        # The buffer is rebuilt anyway, so it only keeps its size if that still fits the policy
+        length = len(head) + len(tail)
+        new_size = len(self.buffer)
+        shrink = self.growth_config["shrink"]
+        if length > new_size or (shrink is not None and new_size - length > shrink * self._slack(length)):
+            new_size = length + self._slack(length)
+        # Concatenating is about twice as fast as slice-assigning into a blank buffer
+        buffer = list(head) if self.storage == "list" else self._to_storage(head)
+        buffer += self._blank(new_size - length)
+        buffer += self._to_storage(tail)
+        self.buffer = buffer
+        self.size = new_size
+        self._shared = False
+        self.gap_start = len(head)
+        self.gap_end = new_size - len(tail)
+
+    def _storage_bytes(self) -> int:
+        """The storage is one slot per character, gap included."""
+        return sys.getsizeof(self.buffer)
 
     ########################## UNDO/REDO GAPBUFFER FUNCTIONALITY ###########################
 
@@ -218,8 +415,11 @@ class GapBuffer:
         Creates a snapshot (deep copy) of the current buffer state.
         This includes the buffer content, gap positions, and selection.
         """
+        if self._stats is not None:
+            self._count_copy("snapshots", len(self.buffer))
         return {
-            "buffer": self.buffer[:], # Copy the list to avoid shared reference
+            "type": "snapshot",
+            "buffer": self.buffer[:], # Copy the storage to avoid shared reference
             "gap_start": self.gap_start,
             "gap_end": self.gap_end,
             "size": self.size,
@@ -233,90 +433,44 @@ class GapBuffer:
         Restore the buffer to a previously recorded state.
         All fields are overwritten to match the saved snapshot.
         """
+        if self._stats is not None:
+            self._count_copy("snapshot_restores", len(state["buffer"]))
         self.buffer = state["buffer"][:] # Copy to avoid shared reference
+        self._shared = False
         self.gap_start = state["gap_start"]
         self.gap_end = state["gap_end"]
         self.size = state["size"]
         self.selection_start = state["selection_start"]
         self.selection_end = state["selection_end"]
+        self._lines = None # Rebuilt on demand for the restored text
 
 
-    def record_state(self):
-        """
-        Record the current state of the buffer before making a change.
-        This is used to support undo operations.
-        """
-        state = self._get_state_snapshot()
-        self.undo_stack.append(state)
-        self.redo_stack.clear() # Once a new change is made, redo history is no longer valid
-
-
-    def undo(self):
-        """
-        Undo the last recorded operation by restoring the most recent state
-        from the undo stack. The current state is saved in the redo stack
-        so it can be reapplied later.
-        """
-        if not self.undo_stack:
-            return # No previous state to revert to
-        
-        # Save current state in redo stack before restoring
-        self.redo_stack.append(self._get_state_snapshot())
-
-        # Pop and restore the last state from undo stack
-        previous_state = self.undo_stack.pop()
-        self._restore_state(previous_state)
-        
-
-    def redo(self):
-        """
-        Redo the last undone operation by restoring the most recent state
-        from the redo stack. The current state is saved in the undo stack.
-        """
-        if not self.redo_stack:
-            return # No state to redo
-        
-        # Save the current state in undo stack before restoring
-        self.undo_stack.append(self._get_state_snapshot())
-
-        # Pop and restore the last state from redo stack
-        next_state = self.redo_stack.pop()
-        self._restore_state(next_state)
-
     ########################## SAVE/LOAD GAPBUFFER FUNCTIONALITY ###########################
 
-    def save_to_file(self, filename: str) -> None:
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE):
         """
-        Save the buffer contents to a file.
+        Yield the text before the gap and then the text after it, one chunk at a time.
 
         Args:
-            filename (str): The file path to save to.
+            chunk_size (int): Maximum number of characters per chunk.
 
-        Raises:
-            Exception: If the file cannot be saved.
+        Yields:
+            str: Consecutive pieces of the document text.
         """
-        try:
-            FileManager.save_to_file(self.get_text(), filename)
-        except Exception as e:
-            print(f"Failed to save file: {e}")
+        for start, end in ((0, self.gap_start), (self.gap_end, len(self.buffer))):
+            for position in range(start, end, chunk_size):
+                yield self._to_text(self.buffer[position:min(position + chunk_size, end)])
 
-
-    def load_from_file(self, filename: str) -> None:
+    def _load_text(self, content: str) -> None:
         """
-        Load text from a file and replace the buffer contents.
+        Reset the buffer to fit the loaded content and write it in with one copy.
 
-        Args:
-            filename (str): The file path to load from.
+        Loading is not an edit, so nothing is recorded in the undo history.
 
-        Raises:
-            Exception: If the file cannot be loaded.
+        Args:
+            content (str): The text read from disk.
         """
-        try:
-            content = FileManager.load_from_file(filename)
-            print(f"Loaded content: {repr(content)} (len: {len(content)})")
-            new_size = max(len(content) * 2, 100)
-            self.__init__(new_size)
-            self.insert(content)
-        except Exception as e:
-            print(f"Failed to load file: {e}")
-
+        growth = self.growth_config
+        self.__init__(0, self.storage)
+        self.growth_config = growth
+        self._insert_text(content)
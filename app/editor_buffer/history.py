@@ -0,0 +1,257 @@
+import json
+import sys
+import tempfile
+import zlib
+from array import array
+
+# What happens to the oldest undo entries once the history is over its byte budget
+OVERFLOW_MODES = ("evict", "compress", "spill")
+
+
+def entry_size(entry) -> int:
+    """
+    Estimate the memory held by an undo history entry, in bytes.
+
+    Text shared between the edits of a batch (e.g. the pattern and replacement of a
+    replace_all) is only counted once. Snapshots count their top-level containers.
+
+    Args:
+        entry (dict): The history entry.
+
+    Returns:
+        int: The approximate size of the entry and the data it references.
+    """
+    size = sys.getsizeof(entry)
+    kind = entry["type"]
+    if kind in ("insert", "delete"):
+        size += sys.getsizeof(entry["text"])
+    elif kind == "batch":
+        edits = entry["edits"]
+        texts = {}
+        for _, removed, inserted in edits:
+            texts[id(removed)] = removed
+            texts[id(inserted)] = inserted
+        size += sys.getsizeof(edits) + sum(sys.getsizeof(edit) for edit in edits)
+        size += sum(sys.getsizeof(text) for text in texts.values())
+    elif kind == "replace":
+        size += sys.getsizeof(entry["positions"])
+        size += sys.getsizeof(entry["pattern"]) + sys.getsizeof(entry["replacement"])
+    elif kind == "group":
+        size += sum(entry_size(sub_entry) for sub_entry in entry["entries"])
+    elif kind == "compressed":
+        size += sys.getsizeof(entry["data"])
+    elif kind == "snapshot":
+        size += sum(sys.getsizeof(value) for value in entry.values())
+    return size
+
+
+def holds_snapshot(entry) -> bool:
+    """
+    Tell whether an entry is, or groups, a record_state() snapshot.
+
+    Snapshots hold engine storage (e.g. rope nodes, or piece table offsets into an add
+    buffer that does not outlive the session), so they are never serialised.
+    """
+    if entry["type"] == "group":
+        return any(holds_snapshot(sub_entry) for sub_entry in entry["entries"])
+    return entry["type"] == "snapshot"
+
+
+def _plain(value):
+    """Turn the arrays held by "replace" entries into lists for JSON."""
+    if isinstance(value, array):
+        return value.tolist()
+    raise TypeError(f"Cannot serialise {type(value).__name__} in a history entry")
+
+
+def entry_to_json(entry) -> bytes:
+    """
+    Serialise a history entry (not holding a snapshot) as UTF-8 JSON.
+
+    Args:
+        entry (dict): The history entry.
+
+    Returns:
+        bytes: The entry as plain data, restored with entry_from_data().
+    """
+    return json.dumps(entry, default=_plain, separators=(",", ":")).encode("utf-8")
+
+
+def _check(condition: bool) -> None:
+    """Raise ValueError unless a serialised entry passed a check."""
+    if not condition:
+        raise ValueError("Malformed history entry")
+
+
+def _offset(value) -> int:
+    """Check that a serialised field is a text offset."""
+    _check(type(value) is int and 0 <= value < 2 ** 63)
+    return value
+
+
+def _text(value) -> str:
+    """Check that a serialised field is a string."""
+    _check(type(value) is str)
+    return value
+
+
+def _selection(value) -> tuple:
+    """Check that a serialised field is a (start, end) selection of offsets or None."""
+    _check(type(value) is list and len(value) == 2)
+    return tuple(None if bound is None else _offset(bound) for bound in value)
+
+
+def _edit(value) -> tuple:
+    """Check that a serialised field is a (position, removed, inserted) batch edit."""
+    _check(type(value) is list and len(value) == 3)
+    return _offset(value[0]), _text(value[1]), _text(value[2])
+
+
+def entry_from_data(data) -> dict:
+    """
+    Rebuild a history entry from decoded JSON, checking every field.
+
+    Args:
+        data: The decoded JSON of an entry serialised by entry_to_json().
+
+    Returns:
+        dict: The history entry.
+
+    Raises:
+        ValueError: If the data is not a well-formed entry.
+    """
+    _check(type(data) is dict)
+    kind = data.get("type")
+    if kind == "group":
+        entries = data.get("entries")
+        _check(type(entries) is list and len(entries) > 0)
+        return {"type": "group", "entries": [entry_from_data(sub_entry) for sub_entry in entries]}
+
+    entry = {"type": kind}
+    if kind in ("insert", "delete"):
+        entry["position"] = _offset(data.get("position"))
+        entry["text"] = _text(data.get("text"))
+    elif kind == "batch":
+        edits = data.get("edits")
+        _check(type(edits) is list and len(edits) > 0)
+        entry["edits"] = [_edit(edit) for edit in edits]
+    elif kind == "replace":
+        positions = data.get("positions")
+        _check(type(positions) is list and len(positions) > 0)
+        entry["positions"] = array("q", [_offset(position) for position in positions])
+        entry["pattern"] = _text(data.get("pattern"))
+        entry["replacement"] = _text(data.get("replacement"))
+        _check(len(entry["pattern"]) > 0)
+    else:
+        raise ValueError(f"Unknown history entry type: {kind!r}")
+    entry["cursor"] = _offset(data.get("cursor"))
+    entry["selection"] = _selection(data.get("selection"))
+    return entry
+
+
+def pack_entry(entry) -> bytes:
+    """
+    Serialise and zlib-compress a history entry (not holding a snapshot).
+
+    Args:
+        entry (dict): The history entry.
+
+    Returns:
+        bytes: The compressed entry, restored with unpack_entry().
+    """
+    return zlib.compress(entry_to_json(entry))
+
+
+def unpack_entry(data: bytes):
+    """
+    Restore a history entry compressed by pack_entry().
+
+    Args:
+        data (bytes): The compressed entry.
+
+    Returns:
+        dict: The history entry.
+    """
+    return entry_from_data(json.loads(zlib.decompress(data)))
+
+
+# SpillFile Class
+class SpillFile:
+    """
+    An anonymous temporary file that old undo entries are moved out to.
+
+    Entries are appended and read back by (offset, length). The owner reports the
+    entries it no longer needs with discard(), and compacts the file with compact()
+    once most of it is unused. The file is deleted when the buffer that owns it goes away.
+    """
+    def __init__(self):
+        self.file = tempfile.TemporaryFile()
+        self.size = 0
+        # Bytes still referenced by the history (the rest of the file is dead space)
+        self.live = 0
+
+    def write(self, data: bytes):
+        """
+        Append data to the file.
+
+        Args:
+            data (bytes): The data to store.
+
+        Returns:
+            tuple: (offset, length) to read it back with.
+        """
+        self.file.seek(self.size)
+        self.file.write(data)
+        offset = self.size
+        self.size += len(data)
+        self.live += len(data)
+        return offset, len(data)
+
+    def read(self, offset: int, length: int) -> bytes:
+        """
+        Read back data stored by write().
+
+        Args:
+            offset (int): Where the data starts.
+            length (int): Number of bytes stored.
+        """
+        self.file.seek(offset)
+        return self.file.read(length)
+
+    def discard(self, length: int) -> None:
+        """
+        Record that data stored by write() is no longer needed.
+
+        Args:
+            length (int): Number of bytes that were stored.
+        """
+        self.live -= length
+
+    def compact(self, spans) -> list:
+        """
+        Move the data still needed to the start of the file and truncate the rest.
+
+        Blocks are copied one at a time towards the start, so peak memory is one entry.
+
+        Args:
+            spans (list): (offset, length) of every piece of data still needed.
+
+        Returns:
+            list: The new (offset, length) of each span, in the same order.
+        """
+        moved = {}
+        position = 0
+        for offset, length in sorted(spans):
+            if offset != position:
+                data = self.read(offset, length)
+                self.file.seek(position)
+                self.file.write(data)
+            moved[offset] = position
+            position += length
+        self.file.truncate(position)
+        self.size = self.live = position
+        return [(moved[offset], length) for offset, length in spans]
+
+    def close(self) -> None:
+        """Close (and so delete) the file."""
+        self.file.close()
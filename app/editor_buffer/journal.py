@@ -0,0 +1,396 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+
+from app.editor_buffer.history import entry_from_data, entry_to_json, holds_snapshot
+
+# Record kinds. Every record is a kind byte, a payload length and the payload.
+CHECKPOINT = b"C"  # Both history stacks in full (zlib-compressed)
+PUSH = b"P"        # A new entry was pushed onto the undo stack (the redo stack was cleared)
+EXTEND = b"E"      # A keystroke was merged into the top undo entry (payload: UTF-8 text)
+UNDO = b"U"        # An entry moved from undo to redo (payload: the redo entry)
+REDO = b"R"        # An entry moved from redo to undo (payload: the undo entry)
+SAVE = b"S"        # The document was saved (payload: the saved file's size and mtime)
+RESET = b"X"       # A snapshot entry was pushed or moved: history before it is not kept
+
+HEADER = struct.Struct("<cI")
+MAGIC = b"UNDOJ2\n"
+# Records appended between checkpoints, which bounds how much has to be replayed
+CHECKPOINT_INTERVAL = 1000
+
+# Payload of a SAVE record: the saved file's size and modification time in ns
+_SAVE = struct.Struct("<qq")
+# Compact encoding of insert/delete entries: kind, position, cursor, selection (-1 for None)
+_EDIT = struct.Struct("<cqqqq")
+_EDIT_KINDS = {"insert": b"i", "delete": b"d"}
+# Entry counts and lengths in a CHECKPOINT payload
+_LENGTH = struct.Struct("<I")
+
+
+def journal_path(filename: str) -> str:
+    """
+    Return the path of the undo journal kept beside a file (".<name>.undo").
+
+    Args:
+        filename (str): The document's path.
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, "." + name + ".undo")
+
+
+def file_fingerprint(filename: str):
+    """
+    Return (size, modification time in ns) of a file, used to tell whether a journal
+    still describes the file on disk.
+
+    Args:
+        filename (str): The file's path.
+    """
+    info = os.stat(filename)
+    return info.st_size, info.st_mtime_ns
+
+
+def encode_entry(entry) -> bytes:
+    """
+    Encode a history entry: plain inserts and deletes as a fixed header plus UTF-8
+    text, anything else as JSON.
+
+    Args:
+        entry (dict): The history entry.
+    """
+    if entry["type"] in _EDIT_KINDS:
+        start, end = entry["selection"]
+        return _EDIT.pack(_EDIT_KINDS[entry["type"]], entry["position"], entry["cursor"],
+                          -1 if start is None else start, -1 if end is None else end) \
+            + entry["text"].encode("utf-8")
+    return b"j" + entry_to_json(entry)
+
+
+def decode_entry(data: bytes):
+    """
+    Decode a history entry encoded by encode_entry().
+
+    Args:
+        data (bytes): The encoded entry.
+
+    Raises:
+        ValueError: If the data is not a well-formed entry.
+    """
+    if data[:1] == b"j":
+        return entry_from_data(json.loads(data[1:]))
+    if len(data) < _EDIT.size or data[:1] not in (b"i", b"d"):
+        raise ValueError("Malformed journal entry")
+    kind, position, cursor, start, end = _EDIT.unpack_from(data)
+    if min(position, cursor) < 0 or min(start, end) < -1:
+        raise ValueError("Malformed journal entry")
+    return {
+        "type": "insert" if kind == b"i" else "delete",
+        "position": position,
+        "text": data[_EDIT.size:].decode("utf-8"),
+        "cursor": cursor,
+        "selection": (None if start == -1 else start, None if end == -1 else end),
+    }
+
+
+def _encode_stack(stack) -> bytes:
+    """Encode the entries of a stack above its last snapshot, which are all that can be journaled."""
+    parts = []
+    for entry in stack:
+        if holds_snapshot(entry):
+            parts = []
+        else:
+            data = encode_entry(entry)
+            parts.append(_LENGTH.pack(len(data)) + data)
+    return _LENGTH.pack(len(parts)) + b"".join(parts)
+
+
+def encode_state(undo_stack, redo_stack) -> bytes:
+    """
+    Encode the payload of a CHECKPOINT record: the entries of both stacks above their
+    last snapshot, each as encode_entry() does, zlib-compressed.
+
+    Args:
+        undo_stack (Iterable[dict]): The undo entries, oldest first (not compressed or spilled).
+        redo_stack (Iterable[dict]): The redo entries.
+    """
+    return zlib.compress(_encode_stack(undo_stack) + _encode_stack(redo_stack), 1)
+
+
+def decode_state(data: bytes):
+    """
+    Decode the payload of a CHECKPOINT record.
+
+    Args:
+        data (bytes): The payload written by encode_state().
+
+    Returns:
+        tuple: (undo stack, redo stack).
+
+    Raises:
+        ValueError: If the payload is not a well-formed checkpoint.
+    """
+    try:
+        data = zlib.decompress(data)
+    except zlib.error as e:
+        raise ValueError(f"Malformed journal checkpoint: {e}")
+    stacks = []
+    offset = 0
+    for _ in range(2):
+        if offset + _LENGTH.size > len(data):
+            raise ValueError("Malformed journal checkpoint")
+        (count,), offset = _LENGTH.unpack_from(data, offset), offset + _LENGTH.size
+        stack = []
+        for _ in range(count):
+            if offset + _LENGTH.size > len(data):
+                raise ValueError("Malformed journal checkpoint")
+            (length,), offset = _LENGTH.unpack_from(data, offset), offset + _LENGTH.size
+            if offset + length > len(data):
+                raise ValueError("Malformed journal checkpoint")
+            stack.append(decode_entry(data[offset:offset + length]))
+            offset += length
+        stacks.append(stack)
+    if offset != len(data):
+        raise ValueError("Malformed journal checkpoint")
+    return stacks[0], stacks[1]
+
+
+# UndoJournal Class
+class UndoJournal:
+    """
+    An append-only binary log of undo history changes, kept beside a document.
+
+    Every change to the history stacks is appended as a small record as it happens,
+    and every CHECKPOINT_INTERVAL records the journal is rewritten as a checkpoint of
+    the full stacks. Restoring the history only replays the records after the last
+    checkpoint, so it takes bounded time however long the history is, and the file
+    stays proportional to the history. SAVE records mark the points where the history
+    matches the file on disk.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Where the journal file lives.
+        """
+        self.path = path
+        self.file = None
+        self.records_since_checkpoint = 0
+        # Offset of the last checkpoint, and the (start, end) of the records from the
+        # checkpoint before the last SAVE up to that SAVE, which a rewrite keeps
+        self._checkpoint_at = None
+        self._saved = None
+
+    def create(self, undo_stack, redo_stack) -> None:
+        """
+        Start a new journal (replacing any existing one) from the given stacks.
+
+        Args:
+            undo_stack (Iterable[dict]): The undo entries, oldest first (not compressed or spilled).
+            redo_stack (Iterable[dict]): The redo entries.
+        """
+        self.close()
+        self._saved = None
+        self.checkpoint(undo_stack, redo_stack)
+
+    def open_existing(self, fingerprint):
+        """
+        Open an existing journal and find the history matching the file on disk.
+
+        Records after the last SAVE that matches `fingerprint` describe edits that
+        were never saved, so they are cut off and new records are appended after it.
+
+        Args:
+            fingerprint (tuple): file_fingerprint() of the document just loaded.
+
+        Returns:
+            tuple: (start, end) offsets of the records to replay, from the last checkpoint
+                before that SAVE, or None if the journal is missing, damaged or stale.
+        """
+        if not os.path.exists(self.path):
+            return None
+
+        self.file = open(self.path, "r+b")
+        if self.file.read(len(MAGIC)) != MAGIC:
+            self.close()
+            return None
+
+        found = None
+        checkpoint = None
+        records = 0
+        for kind, offset, end in self._scan():
+            records += 1
+            if kind == CHECKPOINT:
+                checkpoint = offset
+                records = 0
+            elif kind == SAVE and checkpoint is not None and end - offset == HEADER.size + _SAVE.size:
+                self.file.seek(offset + HEADER.size)
+                if _SAVE.unpack(self.file.read(_SAVE.size)) == tuple(fingerprint):
+                    found = (checkpoint, end, records)
+
+        if found is None:
+            self.close()
+            return None
+
+        start, end, self.records_since_checkpoint = found
+        self.file.truncate(end)
+        self.file.seek(end)
+        self._checkpoint_at = start
+        self._saved = (start, end)
+        return start, end
+
+    def _scan(self):
+        """Yield (kind, offset, end) of every complete record, reading only the headers."""
+        offset = len(MAGIC)
+        size = os.fstat(self.file.fileno()).st_size
+        while offset + HEADER.size <= size:
+            self.file.seek(offset)
+            kind, length = HEADER.unpack(self.file.read(HEADER.size))
+            end = offset + HEADER.size + length
+            if end > size:
+                return # A record cut short by a crash: ignore it and what follows
+            yield kind, offset, end
+            offset = end
+
+    def read(self, start: int, end: int):
+        """
+        Yield (kind, payload) for the records between two offsets.
+
+        Args:
+            start (int): Offset of the first record.
+            end (int): Offset just after the last record.
+        """
+        self.file.seek(start)
+        data = self.file.read(end - start)
+        self.file.seek(0, os.SEEK_END)
+        offset = 0
+        while offset < len(data):
+            kind, length = HEADER.unpack_from(data, offset)
+            offset += HEADER.size
+            yield kind, data[offset:offset + length]
+            offset += length
+
+    def append(self, kind: bytes, payload: bytes = b"") -> None:
+        """
+        Append one record to the journal.
+
+        Args:
+            kind (bytes): One of the record kinds.
+            payload (bytes): The record's data.
+        """
+        self.file.write(HEADER.pack(kind, len(payload)) + payload)
+        self.file.flush()
+        self.records_since_checkpoint += 1
+
+    def record(self, kind: bytes, value) -> None:
+        """
+        Append a change to the history stacks.
+
+        Args:
+            kind (bytes): PUSH, UNDO or REDO with the entry pushed, or EXTEND with the
+                text merged into the top entry.
+            value (dict | str): The entry, or the text for EXTEND.
+        """
+        if kind == EXTEND:
+            self.append(kind, value.encode("utf-8"))
+        elif holds_snapshot(value):
+            self.append(RESET)
+        else:
+            self.append(kind, encode_entry(value))
+
+    def mark_saved(self, fingerprint) -> None:
+        """
+        Record that the history now matches the file on disk.
+
+        Args:
+            fingerprint (tuple): file_fingerprint() of the file just saved.
+        """
+        self.append(SAVE, _SAVE.pack(*fingerprint))
+        self._saved = (self._checkpoint_at, self.file.tell())
+
+    def checkpoint(self, undo_stack, redo_stack) -> None:
+        """
+        Rewrite the journal as the full history stacks, so earlier records never need
+        replaying again. Only the entries above the last snapshot in each stack are kept.
+
+        The records from the checkpoint before the last SAVE up to that SAVE are copied
+        ahead of the new checkpoint, so reopening the saved file still finds its history.
+        The new journal is written beside the old one and renamed over it, so a crash
+        leaves one or the other.
+
+        Args:
+            undo_stack (Iterable[dict]): The undo entries, oldest first (not compressed or spilled).
+            redo_stack (Iterable[dict]): The redo entries.
+        """
+        payload = encode_state(undo_stack, redo_stack)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                saved = None
+                if self._saved is not None:
+                    start, end = self._saved
+                    self.file.seek(start)
+                    f.write(self.file.read(end - start))
+                    saved = (len(MAGIC), len(MAGIC) + end - start)
+                checkpoint_at = f.tell()
+                f.write(HEADER.pack(CHECKPOINT, len(payload)) + payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self.close()
+        self.file = open(self.path, "r+b")
+        self.file.seek(0, os.SEEK_END)
+        self._checkpoint_at = checkpoint_at
+        self._saved = saved
+        self.records_since_checkpoint = 0
+
+    def close(self) -> None:
+        """Close the journal file (it stays on disk for the next session)."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def replay(records):
+    """
+    Rebuild the history stacks from journal records, starting at a checkpoint.
+
+    Args:
+        records (Iterable[tuple]): (kind, payload) pairs, as yielded by UndoJournal.read().
+
+    Returns:
+        tuple: (undo stack, redo stack).
+
+    Raises:
+        ValueError: If a record is malformed, so the journal cannot be trusted.
+    """
+    undo_stack, redo_stack = [], []
+    for kind, payload in records:
+        if kind == CHECKPOINT:
+            undo_stack, redo_stack = decode_state(payload)
+        elif kind == PUSH:
+            undo_stack.append(decode_entry(payload))
+            redo_stack = []
+        elif kind == EXTEND:
+            if not undo_stack or undo_stack[-1]["type"] not in _EDIT_KINDS:
+                raise ValueError("Journal extends an entry that is not an edit")
+            undo_stack[-1]["text"] += payload.decode("utf-8")
+        # Entries beyond a snapshot were never journaled: moving one only adds its counterpart
+        elif kind == UNDO:
+            if undo_stack:
+                undo_stack.pop()
+            redo_stack.append(decode_entry(payload))
+        elif kind == REDO:
+            if redo_stack:
+                redo_stack.pop()
+            undo_stack.append(decode_entry(payload))
+        elif kind == RESET:
+            undo_stack, redo_stack = [], []
+        elif kind != SAVE:
+            raise ValueError(f"Unknown journal record: {kind!r}")
+    return undo_stack, redo_stack
@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right
+
+# LineIndex Class
+class LineIndex:
+    """
+    Incrementally maintained index of newline positions, split at the edit point.
+
+    Works like a gap buffer for line starts: newlines before the edit point are kept
+    as absolute offsets, newlines after it as distances from the end of the document.
+    Inserting or deleting at the edit point therefore never renumbers existing entries
+    (only the newlines in the edited text are touched). Moving the edit point is free:
+    the split only catches up with it at the next edit, in two slices, so cursor jumps
+    that are not followed by an edit cost nothing. Every lookup is a binary search,
+    O(log n), against wherever the split currently is.
+    """
+    def __init__(self, chunks, length: int, point: int = 0):
+        """
+        Build the index by scanning the document once.
+
+        Args:
+            chunks (Iterable[str]): The document text, in order.
+            length (int): Total number of characters in the document.
+            point (int): The edit point (the engine's cursor).
+        """
+        offsets = []
+        base = 0
+        for chunk in chunks:
+            index = chunk.find("\n")
+            while index != -1:
+                offsets.append(base + index)
+                index = chunk.find("\n", index + 1)
+            base += len(chunk)
+
+        split = bisect_left(offsets, point)
+        # Newlines before the split, as ascending absolute offsets
+        self.before = offsets[:split]
+        # Newlines at or after the split, as ascending distances from the end (nearest last)
+        self.after = [length - offset for offset in reversed(offsets[split:])]
+        self.length = length
+        # The edit point, and the offset the lists are actually split at
+        self.point = point
+        self.split = point
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines (one more than the number of newlines)."""
+        return len(self.before) + len(self.after) + 1
+
+    def move(self, position: int) -> None:
+        """
+        Move the edit point. The split follows at the next insert or delete.
+
+        Args:
+            position (int): The new edit point.
+        """
+        self.point = position
+
+    def _settle(self) -> None:
+        """Move the split to the edit point, shifting the newlines in between as one slice."""
+        point = self.point
+        if point < self.split:
+            index = bisect_left(self.before, point)
+            self.after.extend([self.length - offset for offset in reversed(self.before[index:])])
+            del self.before[index:]
+        elif point > self.split:
+            # Newlines before the point have distance > length - point
+            index = bisect_right(self.after, self.length - point)
+            self.before.extend([self.length - distance for distance in reversed(self.after[index:])])
+            del self.after[index:]
+        self.split = point
+
+    def insert(self, text: str) -> None:
+        """
+        Record text inserted at the edit point, which moves past it.
+
+        Args:
+            text (str): The inserted text.
+        """
+        self._settle()
+        index = text.find("\n")
+        while index != -1:
+            self.before.append(self.point + index)
+            index = text.find("\n", index + 1)
+        self.length += len(text)
+        self.point += len(text)
+        self.split = self.point
+
+    def delete(self, count: int) -> None:
+        """
+        Record `count` characters deleted after the edit point.
+
+        Args:
+            count (int): Number of characters deleted.
+        """
+        self._settle()
+        # Deleted newlines are the ones nearest the point, at the end of `after`
+        remaining_distance = self.length - self.point - count
+        while self.after and self.after[-1] > remaining_distance:
+            self.after.pop()
+        self.length -= count
+
+    def line_start(self, line: int) -> int:
+        """
+        Return the offset of the first character of a line.
+
+        Args:
+            line (int): Zero-based line number (assumed to be in range).
+        """
+        if line == 0:
+            return 0
+        newline = line - 1
+        if newline < len(self.before):
+            return self.before[newline] + 1
+        return self.length - self.after[len(self.after) - 1 - (newline - len(self.before))] + 1
+
+    def line_of(self, offset: int) -> int:
+        """
+        Return the zero-based line containing an offset (the number of newlines before it).
+
+        Args:
+            offset (int): Text offset (assumed to be in range).
+        """
+        line = bisect_left(self.before, offset)
+        if offset > self.split:
+            # Newlines after the split that lie before offset have distance > length - offset
+            line += len(self.after) - bisect_right(self.after, self.length - offset)
+        return line
@@ -0,0 +1,348 @@
+import sys
+import weakref
+from array import array
+
+from app.editor_buffer.gap_buffer import ARRAY_TYPECODE
+from app.editor_buffer.text_buffer import CHUNK_SIZE, TextBuffer
+
+# Piece sources: which buffer a piece points into
+ORIGINAL = 0
+ADDED = 1
+
+# PieceTable Class
+class PieceTable(TextBuffer):
+    """
+    A piece table data structure used for text editing without moving existing text.
+
+    The document is described by an ordered list of pieces, each pointing at a span of
+    either the read-only original text or an append-only buffer of added text. Inserts
+    append to the add buffer and split a piece; deletes only trim or drop pieces, so
+    no existing characters are ever copied or shifted, however far apart the edits are.
+
+    Because the original text is never modified, a loaded file is kept memory-mapped
+    and only the parts that are read get decoded.
+    """
+    LAZY_LOAD = True
+
+    def __init__(self, original: str = ""):
+        """
+        Initialise the piece table.
+
+        Args:
+            original (str | MappedText): The initial (read-only) document text.
+        """
+        super().__init__()
+
+        # Basic functionality:
+        self.original = original
+        self.added = array(ARRAY_TYPECODE)
+        # Each piece is a (source, start, length) tuple
+        self.pieces = [(ORIGINAL, 0, len(original))] if original else []
+        self.length = len(original)
+        self._cursor = 0
+
+    ########################## BASIC PIECETABLE FUNCTIONALITY ###########################
+
+    @property
+    def cursor(self) -> int:
+        """The cursor is just an offset: nothing moves when it changes."""
+        return self._cursor
+
+    def _piece_text(self, piece, start: int = 0, end: int = None) -> str:
+        """
+        Return the text of a piece, optionally limited to [start, end) within it.
+
+        Args:
+            piece (tuple): The (source, start, length) piece.
+            start (int): Offset within the piece to start from.
+            end (int): Offset within the piece to stop at. Defaults to the piece length.
+        """
+        source, offset, length = piece
+        if end is None:
+            end = length
+        if source == ORIGINAL:
+            return self.original[offset + start:offset + end]
+        return self.added[offset + start:offset + end].tounicode()
+
+    def _locate(self, position: int):
+        """
+        Find the piece containing a text offset.
+
+        Args:
+            position (int): Text offset to find.
+
+        Returns:
+            tuple: (piece index, offset within that piece). A position at the end of the
+                document returns (len(self.pieces), 0).
+        """
+        piece_start = 0
+        for index, (_, _, length) in enumerate(self.pieces):
+            if position < piece_start + length:
+                return index, position - piece_start
+            piece_start += length
+        return len(self.pieces), 0
+
+    def get_text(self) -> str:
+        """
+        Retrieve the current text by concatenating every piece.
+
+        Returns:
+            str: The full visible text in the buffer.
+        """
+        return ''.join(self._piece_text(piece) for piece in self.pieces)
+
+    def get_cursor_limit(self) -> int:
+        """Returns the valid range of cursor movement (i.e., text length)."""
+        return self.length
+
+    def _move_to(self, position: int) -> None:
+        """
+        Move the cursor without touching the undo history.
+
+        Args:
+            position(int): The new cursor position (assumed to be within bounds).
+        """
+        self._cursor = position
+        if self._lines is not None:
+            self._lines.move(position)
+
+    def _insert_text(self, text: str) -> None:
+        """
+        Append text to the add buffer and splice a piece for it in at the cursor.
+
+        Args:
+            text (str): The text to insert.
+        """
+        if not text:
+            return
+
+        start = len(self.added)
+        self.added.extend(text)
+        index, offset = self._locate(self._cursor)
+
+        if offset == 0:
+            previous = self.pieces[index - 1] if index > 0 else None
+            if previous and previous[0] == ADDED and previous[1] + previous[2] == start:
+                # Typing straight after the previous insert: just grow that piece
+                self.pieces[index - 1] = (ADDED, previous[1], previous[2] + len(text))
+            else:
+                self.pieces.insert(index, (ADDED, start, len(text)))
+        else:
+            # Split the piece the cursor falls inside and put the new piece between the halves
+            source, piece_start, length = self.pieces[index]
+            self.pieces[index:index + 1] = [
+                (source, piece_start, offset),
+                (ADDED, start, len(text)),
+                (source, piece_start + offset, length - offset),
+            ]
+
+        self.length += len(text)
+        self._cursor += len(text)
+        if self._lines is not None:
+            self._lines.insert(text)
+
+    def _delete_text(self, count: int) -> None:
+        """
+        Trim or drop the pieces covering `count` characters after the cursor.
+
+        Args:
+            count (int): Number of characters to delete (assumed to be available).
+        """
+        if count <= 0:
+            return
+
+        index, offset = self._locate(self._cursor)
+        replacement = []
+        # Keep the part of the first piece that lies before the cursor
+        if offset:
+            source, piece_start, _ = self.pieces[index]
+            replacement.append((source, piece_start, offset))
+
+        remaining = count
+        last = index
+        while remaining > 0:
+            source, piece_start, length = self.pieces[last]
+            available = length - offset
+            if remaining < available:
+                # Keep the tail of the piece the deletion ends inside
+                replacement.append((source, piece_start + offset + remaining, available - remaining))
+                remaining = 0
+            else:
+                remaining -= available
+            offset = 0
+            last += 1
+
+        self.pieces[index:last] = replacement
+        self.length -= count
+        if self._lines is not None:
+            self._lines.delete(count)
+
+    def _read(self, position: int, count: int) -> str:
+        """
+        Return `count` characters starting at `position` from the pieces that cover them.
+
+        Args:
+            position (int): Text offset to start reading from.
+            count (int): Number of characters to read (assumed to be available).
+        """
+        index, offset = self._locate(position)
+        chunks = []
+        while count > 0 and index < len(self.pieces):
+            length = self.pieces[index][2]
+            take = min(count, length - offset)
+            chunks.append(self._piece_text(self.pieces[index], offset, offset + take))
+            count -= take
+            offset = 0
+            index += 1
+        return ''.join(chunks)
+
+    def _apply_batch(self, edits) -> None:
+        """
+        Apply several edits by building the new piece list in one walk over the old one.
+
+        Kept text is never copied: it becomes (trimmed) references to the existing pieces.
+        Each distinct inserted string is appended to the add buffer only once and shared
+        by every piece that inserts it.
+
+        Args:
+            edits (list): (position, removed, inserted) tuples in increasing, non-overlapping
+                position order, with positions in the document as it is before the batch.
+        """
+        self._notify_batch(edits)
+        # Spans of the old text to keep, each followed by the text inserted after it
+        spans = []
+        previous = 0
+        for position, removed, inserted in edits:
+            spans.append((previous, position, inserted))
+            previous = position + len(removed)
+        spans.append((previous, self.length, ""))
+
+        pieces = []
+        added_at = {}
+        index = piece_start = 0
+        for start, end, inserted in spans:
+            while start < end:
+                source, offset, length = self.pieces[index]
+                if piece_start + length <= start:
+                    piece_start += length
+                    index += 1
+                    continue
+                # Keep the part of this piece that lies inside [start, end)
+                take_end = min(end - piece_start, length)
+                pieces.append((source, offset + start - piece_start, take_end - (start - piece_start)))
+                start = piece_start + take_end
+            if inserted:
+                if inserted not in added_at:
+                    added_at[inserted] = len(self.added)
+                    self.added.extend(inserted)
+                pieces.append((ADDED, added_at[inserted], len(inserted)))
+
+        self.pieces = pieces
+        self.length += sum(len(inserted) - len(removed) for _, removed, inserted in edits)
+        self._cursor = edits[0][0] + len(edits[0][2])
+        self._lines = None # Rebuilt on demand for the new text
+
+    def _rewrite(self, text: str, cursor: int) -> None:
+        """
+        Append the new text to the add buffer in one go and make it the only piece.
+        """
+        self._notify_edit(None, "", "")
+        start = len(self.added)
+        self.added.fromunicode(text)
+        self.pieces = [(ADDED, start, len(text))] if text else []
+        self.length = len(text)
+        self._cursor = cursor
+        self._lines = None # Rebuilt on demand for the new text
+
+    def _snapshot_reader(self):
+        """
+        Copy only the piece list: the original text is read-only and the add buffer is
+        append-only, so the spans the copied pieces point at never change. The copy is
+        a bare PieceTable holding just what _read uses. A memory-mapped original is
+        shared too: the copy holds a claim on it, released when the snapshot goes away,
+        so loading another file or closing the table does not close it under the snapshot.
+        """
+        view = PieceTable.__new__(PieceTable)
+        view.original, view.added, view.pieces = self.original, self.added, self.pieces[:]
+        if hasattr(self.original, "retain"):
+            self.original.retain()
+            weakref.finalize(view, self.original.release)
+        return view._read
+
+    def _storage_bytes(self) -> int:
+        """
+        The add buffer and piece list, plus the original text unless it is memory-mapped
+        (mapped pages belong to the OS cache and are dropped under memory pressure).
+        """
+        size = sys.getsizeof(self.added) + sys.getsizeof(self.pieces)
+        size += len(self.pieces) * sys.getsizeof((ORIGINAL, 0, 0))
+        if isinstance(self.original, str):
+            size += sys.getsizeof(self.original)
+        return size
+
+    ########################## UNDO/REDO PIECETABLE FUNCTIONALITY ###########################
+
+    def _get_state_snapshot(self):
+        """
+        Creates a snapshot of the current piece list, cursor and selection.
+        Both text buffers are append-only, so copying the piece list is enough.
+        """
+        return {
+            "type": "snapshot",
+            "pieces": self.pieces[:],
+            "length": self.length,
+            "cursor": self._cursor,
+            "selection_start": self.selection_start,
+            "selection_end": self.selection_end,
+        }
+
+    def _restore_state(self, state):
+        """
+        Restore the piece list, cursor and selection from a snapshot.
+        """
+        self.pieces = state["pieces"][:]
+        self.length = state["length"]
+        self._cursor = state["cursor"]
+        self.selection_start = state["selection_start"]
+        self.selection_end = state["selection_end"]
+        self._lines = None # Rebuilt on demand for the restored text
+
+    ########################## SAVE/LOAD PIECETABLE FUNCTIONALITY ###########################
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE):
+        """
+        Yield the text of each piece in order, split into chunks of at most `chunk_size`.
+
+        Saving over the mapped original file is safe: the new contents are renamed
+        into place, so the mapping keeps pointing at the old file until it is closed.
+
+        Args:
+            chunk_size (int): Maximum number of characters per chunk.
+
+        Yields:
+            str: Consecutive pieces of the document text.
+        """
+        for piece in self.pieces:
+            for offset in range(0, piece[2], chunk_size):
+                yield self._piece_text(piece, offset, min(offset + chunk_size, piece[2]))
+
+    def close(self) -> None:
+        """
+        Release the buffer's files, including its claim on the memory map of the original
+        text (which stays open for snapshots still reading it).
+        """
+        super().close()
+        if hasattr(self.original, "release"):
+            self.original.release()
+
+    def _load_text(self, content) -> None:
+        """
+        Make the loaded content the new read-only original text, releasing the memory
+        map of the previous one (once no snapshot reads it).
+
+        Args:
+            content (str | MappedText): The text read from disk, or a mapped view of it.
+        """
+        if hasattr(self.original, "release"):
+            self.original.release()
+        self.__init__(content)
@@ -0,0 +1,363 @@
+import sys
+from functools import partial
+
+from app.editor_buffer.text_buffer import TextBuffer
+
+# Leaves hold at most this many characters; neighbouring small leaves are merged up to it
+LEAF_SIZE = 1024
+
+
+class _Node:
+    """
+    An immutable rope node: either a leaf holding a chunk of text, or a branch
+    joining two subtrees. Lengths, newline counts and heights are cached so
+    they never need to be recomputed by walking the tree.
+    """
+    __slots__ = ("text", "left", "right", "length", "newlines", "height")
+
+    def __init__(self, text: str = None, left=None, right=None):
+        self.text = text
+        self.left = left
+        self.right = right
+        if text is not None:
+            self.length = len(text)
+            self.newlines = text.count("\n")
+            self.height = 0
+        else:
+            self.length = left.length + right.length
+            self.newlines = left.newlines + right.newlines
+            self.height = 1 + max(left.height, right.height)
+
+    @property
+    def is_leaf(self) -> bool:
+        return self.text is not None
+
+
+def _height(node) -> int:
+    return node.height if node else -1
+
+
+def _rotate_left(node: _Node) -> _Node:
+    right = node.right
+    return _Node(left=_Node(left=node.left, right=right.left), right=right.right)
+
+
+def _rotate_right(node: _Node) -> _Node:
+    left = node.left
+    return _Node(left=left.left, right=_Node(left=left.right, right=node.right))
+
+
+def _balance(left: _Node, right: _Node) -> _Node:
+    """
+    Build a branch from two subtrees whose heights differ by at most two,
+    rotating (AVL style) if needed to keep it balanced.
+    """
+    node = _Node(left=left, right=right)
+    if left.height > right.height + 1:
+        if _height(left.left) < _height(left.right):
+            node = _Node(left=_rotate_left(left), right=right)
+        return _rotate_right(node)
+    if right.height > left.height + 1:
+        if _height(right.right) < _height(right.left):
+            node = _Node(left=left, right=_rotate_right(right))
+        return _rotate_left(node)
+    return node
+
+
+def concat(left, right):
+    """
+    Concatenate two ropes in O(log n), keeping the result balanced.
+
+    Args:
+        left (_Node): The first rope (or None for empty).
+        right (_Node): The second rope (or None for empty).
+
+    Returns:
+        _Node: The joined rope, or None if both are empty.
+    """
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.is_leaf and right.is_leaf and left.length + right.length <= LEAF_SIZE:
+        return _Node(text=left.text + right.text)
+    if left.height > right.height + 1:
+        return _balance(left.left, concat(left.right, right))
+    if right.height > left.height + 1:
+        return _balance(concat(left, right.left), right.right)
+    return _Node(left=left, right=right)
+
+
+def split(node, index: int):
+    """
+    Split a rope into the text before and after `index` in O(log n).
+
+    Args:
+        node (_Node): The rope to split (or None for empty).
+        index (int): Text offset to split at.
+
+    Returns:
+        tuple: (left rope, right rope), either of which may be None.
+    """
+    if node is None:
+        return None, None
+    if index <= 0:
+        return None, node
+    if index >= node.length:
+        return node, None
+    if node.is_leaf:
+        return _Node(text=node.text[:index]), _Node(text=node.text[index:])
+    if index < node.left.length:
+        left, right = split(node.left, index)
+        return left, concat(right, node.right)
+    left, right = split(node.right, index - node.left.length)
+    return concat(node.left, left), right
+
+
+def build(text: str):
+    """
+    Build a perfectly balanced rope from a string.
+
+    Args:
+        text (str): The text to store.
+
+    Returns:
+        _Node: The rope, or None for empty text.
+    """
+    leaves = [_Node(text=text[i:i + LEAF_SIZE]) for i in range(0, len(text), LEAF_SIZE)]
+    if not leaves:
+        return None
+    # Pair neighbouring subtrees level by level until one root is left
+    while len(leaves) > 1:
+        paired = [_Node(left=leaves[i], right=leaves[i + 1]) for i in range(0, len(leaves) - 1, 2)]
+        if len(leaves) % 2:
+            paired[-1] = concat(paired[-1], leaves[-1])
+        leaves = paired
+    return leaves[0]
+
+
+def _collect(node, start: int, end: int, chunks: list) -> None:
+    """Append the text in [start, end) of `node` to `chunks`, visiting only overlapping subtrees."""
+    if node is None or start >= end:
+        return
+    if node.is_leaf:
+        chunks.append(node.text[start:end])
+        return
+    left_length = node.left.length
+    if start < left_length:
+        _collect(node.left, start, min(end, left_length), chunks)
+    if end > left_length:
+        _collect(node.right, max(start - left_length, 0), end - left_length, chunks)
+
+
+def read(node, position: int, count: int) -> str:
+    """
+    Return `count` characters of a rope starting at `position`.
+
+    Args:
+        node (_Node): The rope (or None for empty).
+        position (int): Text offset to start reading from.
+        count (int): Number of characters to read.
+    """
+    chunks = []
+    _collect(node, position, position + count, chunks)
+    return ''.join(chunks)
+
+
+def _newline_offset(node, newline: int) -> int:
+    """Offset of the given (zero-based) newline, descending by the cached newline counts."""
+    offset = 0
+    while not node.is_leaf:
+        if newline < node.left.newlines:
+            node = node.left
+        else:
+            newline -= node.left.newlines
+            offset += node.left.length
+            node = node.right
+    index = -1
+    for _ in range(newline + 1):
+        index = node.text.find("\n", index + 1)
+    return offset + index
+
+
+def _newlines_before(node, offset: int) -> int:
+    """Number of newlines in the first `offset` characters, descending by the cached counts."""
+    count = 0
+    while node is not None and not node.is_leaf:
+        if offset <= node.left.length:
+            node = node.left
+        else:
+            count += node.left.newlines
+            offset -= node.left.length
+            node = node.right
+    if node is not None:
+        count += node.text.count("\n", 0, offset)
+    return count
+
+
+# Rope Class
+class Rope(TextBuffer):
+    """
+    A rope data structure used for editing very large documents.
+
+    The text is held in a balanced binary tree whose leaves are short chunks of text
+    and whose nodes cache their total length and newline count. Inserts, deletes and
+    substring reads anywhere in the document cost O(log n) rather than O(distance),
+    and because nodes are never mutated, snapshots are just a reference to the root.
+    """
+    def __init__(self, text: str = ""):
+        """
+        Initialise the rope.
+
+        Args:
+            text (str): The initial document text.
+        """
+        super().__init__()
+
+        # Basic functionality:
+        self.root = build(text)
+        self._cursor = 0
+
+    ########################## BASIC ROPE FUNCTIONALITY ###########################
+
+    @property
+    def cursor(self) -> int:
+        """The cursor is just an offset: nothing moves when it changes."""
+        return self._cursor
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines in the document, read from the cached newline counts."""
+        return (self.root.newlines if self.root else 0) + 1
+
+    def _line_start(self, line: int) -> int:
+        """Offset of the first character of a line, found in O(log n) through the tree."""
+        if line == 0:
+            return 0
+        return _newline_offset(self.root, line - 1) + 1
+
+    def _line_of(self, offset: int) -> int:
+        """Zero-based line containing an offset, found in O(log n) through the tree."""
+        return _newlines_before(self.root, offset)
+
+    def get_text(self) -> str:
+        """
+        Retrieve the current text by concatenating every leaf.
+
+        Returns:
+            str: The full visible text in the buffer.
+        """
+        return self._read(0, self.get_cursor_limit())
+
+    def get_cursor_limit(self) -> int:
+        """Returns the valid range of cursor movement (i.e., text length)."""
+        return self.root.length if self.root else 0
+
+    def _move_to(self, position: int) -> None:
+        """
+        Move the cursor without touching the undo history.
+
+        Args:
+            position(int): The new cursor position (assumed to be within bounds).
+        """
+        self._cursor = position
+
+    def _insert_text(self, text: str) -> None:
+        """
+        Split the rope at the cursor and join the new text in between.
+
+        Args:
+            text (str): The text to insert.
+        """
+        left, right = split(self.root, self._cursor)
+        self.root = concat(concat(left, build(text)), right)
+        self._cursor += len(text)
+
+    def _delete_text(self, count: int) -> None:
+        """
+        Cut `count` characters after the cursor out of the rope.
+
+        Args:
+            count (int): Number of characters to delete (assumed to be available).
+        """
+        left, rest = split(self.root, self._cursor)
+        _, right = split(rest, count)
+        self.root = concat(left, right)
+
+    def _read(self, position: int, count: int) -> str:
+        """
+        Return `count` characters starting at `position`, visiting only the leaves that hold them.
+
+        Args:
+            position (int): Text offset to start reading from.
+            count (int): Number of characters to read (assumed to be available).
+        """
+        return read(self.root, position, count)
+
+    def _apply_batch(self, edits) -> None:
+        """
+        Apply several edits by building a fresh balanced rope from the edited text in one pass.
+
+        Args:
+            edits (list): (position, removed, inserted) tuples in increasing, non-overlapping
+                position order, with positions in the document as it is before the batch.
+        """
+        self._notify_batch(edits)
+        chunks = self._batch_chunks(edits)
+        self.root = build(''.join(chunks))
+        self._cursor = len(chunks[0]) + len(chunks[1])
+
+    def _rewrite(self, text: str, cursor: int) -> None:
+        """
+        Build a fresh balanced rope from the new text.
+        """
+        self._notify_edit(None, "", "")
+        self.root = build(text)
+        self._cursor = cursor
+
+    def _snapshot_reader(self):
+        """Nodes are immutable, so a snapshot just keeps the current root."""
+        return partial(read, self.root)
+
+    def _storage_bytes(self) -> int:
+        """
+        The leaf text plus the tree nodes, assuming leaves are on average half full.
+        """
+        length = self.get_cursor_limit()
+        leaves = length // (LEAF_SIZE // 2) + 1
+        return length + leaves * (sys.getsizeof("") + 2 * sys.getsizeof(self.root))
+
+    ########################## UNDO/REDO ROPE FUNCTIONALITY ###########################
+
+    def _get_state_snapshot(self):
+        """
+        Creates a snapshot of the current rope, cursor and selection.
+        Nodes are immutable, so keeping a reference to the root is enough.
+        """
+        return {
+            "type": "snapshot",
+            "root": self.root,
+            "cursor": self._cursor,
+            "selection_start": self.selection_start,
+            "selection_end": self.selection_end,
+        }
+
+    def _restore_state(self, state):
+        """
+        Restore the rope, cursor and selection from a snapshot.
+        """
+        self.root = state["root"]
+        self._cursor = state["cursor"]
+        self.selection_start = state["selection_start"]
+        self.selection_end = state["selection_end"]
+
+    ########################## SAVE/LOAD ROPE FUNCTIONALITY ###########################
+
+    def _load_text(self, content: str) -> None:
+        """
+        Build a fresh balanced rope from the loaded content.
+
+        Args:
+            content (str): The text read from disk.
+        """
+        self.__init__(content)
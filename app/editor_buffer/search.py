@@ -0,0 +1,94 @@
+import re
+
+# Characters read from the buffer per search window
+SEARCH_CHUNK_SIZE = 64 * 1024
+# Longest regex match guaranteed to be found whole (matches are scanned in windows)
+MAX_REGEX_MATCH = 4096
+
+
+def _windows(buffer, start: int, overlap: int, before: int = 0):
+    """
+    Yield overlapping windows of the buffer text, reading one chunk at a time.
+
+    Each window covers its own region of SEARCH_CHUNK_SIZE characters plus `overlap`
+    characters of the next region (so matches that straddle a region boundary, or the
+    gap, are still seen whole) and `before` characters of the previous one (context
+    for anchors and lookbehinds).
+
+    Yields:
+        tuple: (offset of the window text, window text, region start, region end).
+    """
+    length = buffer.get_cursor_limit()
+    region = min(start, length)
+    # Always yield at least one window, so empty matches at the very end are seen
+    while True:
+        window_start = max(0, region - before)
+        window_end = min(region + SEARCH_CHUNK_SIZE + overlap, length)
+        text = buffer._read(window_start, window_end - window_start)
+        yield window_start, text, region, min(region + SEARCH_CHUNK_SIZE, length)
+        region += SEARCH_CHUNK_SIZE
+        if region >= length:
+            break
+
+
+def find_iter(buffer, pattern: str, start: int = 0):
+    """
+    Lazily yield the offsets of non-overlapping occurrences of a substring.
+
+    The buffer is scanned a chunk at a time with str.find, never as a whole string.
+    The buffer must not be edited while the generator is in use.
+
+    Args:
+        buffer (TextBuffer): The buffer to search.
+        pattern (str): The substring to look for.
+        start (int): Offset to start searching from.
+
+    Yields:
+        int: Offset of each match, in increasing order.
+
+    Raises:
+        ValueError: If the pattern is empty.
+    """
+    if not pattern:
+        raise ValueError("Search pattern cannot be empty")
+
+    next_allowed = start
+    for offset, text, _, region_end in _windows(buffer, start, len(pattern) - 1):
+        index = text.find(pattern, max(next_allowed - offset, 0))
+        # Matches starting past this region are found again by the next window
+        while index != -1 and offset + index < region_end:
+            yield offset + index
+            next_allowed = offset + index + len(pattern)
+            index = text.find(pattern, index + len(pattern))
+
+
+def regex_iter(buffer, pattern, start: int = 0):
+    """
+    Lazily yield (start, end) spans of non-overlapping regular expression matches.
+
+    Matches longer than MAX_REGEX_MATCH characters may be cut short, because the
+    buffer is scanned in windows rather than as one string. The buffer must not be
+    edited while the generator is in use.
+
+    Args:
+        buffer (TextBuffer): The buffer to search.
+        pattern (str | re.Pattern): The regular expression.
+        start (int): Offset to start searching from.
+
+    Yields:
+        tuple: (start, end) of each match, in increasing order.
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression.
+    """
+    regex = re.compile(pattern) if isinstance(pattern, str) else pattern
+    next_allowed = start
+    for offset, text, region_start, region_end in _windows(buffer, start, MAX_REGEX_MATCH, MAX_REGEX_MATCH):
+        for match in regex.finditer(text, max(next_allowed, region_start) - offset):
+            match_start, match_end = offset + match.start(), offset + match.end()
+            # Matches starting past this region are found again by the next window
+            if match_start >= region_end and region_end < buffer.get_cursor_limit():
+                break
+            yield match_start, match_end
+            # A match running into the next region must not be searched inside again
+            next_allowed = match_end
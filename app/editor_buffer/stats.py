@@ -0,0 +1,143 @@
+import threading
+import time
+from functools import wraps
+
+# Public operations timed while stats are enabled (see TextBuffer.configure_stats)
+TIMED_OPERATIONS = (
+    "insert", "delete", "move_cursor", "delete_selection", "delete_range", "replace_range",
+    "replace_all", "insert_at_cursors", "delete_at_cursors", "undo", "redo",
+    "get_text", "get_range", "find", "save_to_file", "load_from_file",
+)
+# Latency histogram buckets: bucket 0 holds calls under 1 microsecond, bucket n those
+# under 2**n microseconds, and the last one everything slower
+HISTOGRAM_BUCKETS = 24
+
+
+def bucket_label(bucket: int) -> str:
+    """
+    Return the upper bound of a latency histogram bucket, e.g. "<64us" or "<2ms".
+
+    Args:
+        bucket (int): Index of the bucket.
+    """
+    if bucket == HISTOGRAM_BUCKETS - 1:
+        return ">=%dms" % (2 ** (bucket - 1) // 1000)
+    bound = 2 ** bucket
+    return "<%dus" % bound if bound < 1000 else "<%dms" % (bound // 1000)
+
+
+# Stats Class
+class Stats:
+    """
+    Counters and latency histograms for one buffer, collected only while enabled.
+
+    Operations are timed by wrappers installed on the buffer instance itself, and the
+    engine's hot paths bump counters behind a single `is not None` check, so a buffer
+    without stats pays nothing for the timing and next to nothing for the counters.
+    Only the outermost operation is timed: the insert made inside a replace_range
+    counts towards replace_range, not insert. Nesting is tracked per thread, and
+    updates take a lock, so readers running at once under configure_locking are all
+    recorded.
+    """
+    def __init__(self):
+        # Per operation: [calls, total nanoseconds, slowest call, histogram]
+        self.operations = {}
+        # Engine events, e.g. gap moves and the characters they copied
+        self.counters = {}
+        # Per thread: depth of nested timed operations, so only the outermost is recorded
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Add to a counter.
+
+        Args:
+            name (str): The counter.
+            amount (int): How much to add.
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def peak(self, name: str, value: int) -> None:
+        """
+        Raise a counter that tracks the largest value seen.
+
+        Args:
+            name (str): The counter.
+            value (int): The value just seen.
+        """
+        with self._lock:
+            if value > self.counters.get(name, 0):
+                self.counters[name] = value
+
+    def record(self, name: str, elapsed_ns: int) -> None:
+        """
+        Record one call of an operation.
+
+        Args:
+            name (str): The operation.
+            elapsed_ns (int): How long the call took, in nanoseconds.
+        """
+        with self._lock:
+            timing = self.operations.get(name)
+            if timing is None:
+                timing = self.operations[name] = [0, 0, 0, [0] * HISTOGRAM_BUCKETS]
+            timing[0] += 1
+            timing[1] += elapsed_ns
+            timing[2] = max(timing[2], elapsed_ns)
+            timing[3][min((elapsed_ns // 1000).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def timed(self, name: str, method):
+        """
+        Wrap a bound method so that its calls are recorded under `name`.
+
+        Args:
+            name (str): The operation.
+            method (Callable): The bound method to time.
+
+        Returns:
+            Callable: The wrapper, to be set on the buffer instance.
+        """
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            local = self._local
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                local.depth = depth
+                if depth == 0:
+                    self.record(name, time.perf_counter_ns() - start)
+        return wrapper
+
+    def reset(self) -> None:
+        """Forget everything recorded so far."""
+        with self._lock:
+            self.operations = {}
+            self.counters = {}
+
+    def report(self) -> dict:
+        """
+        Summarise what has been recorded.
+
+        Returns:
+            dict: "operations" maps every operation called to its calls, total, mean and
+                slowest time (in microseconds) and its non-empty histogram buckets;
+                "counters" holds the engine's counters.
+        """
+        with self._lock:
+            recorded = [(name, timing[:3] + [timing[3][:]]) for name, timing in self.operations.items()]
+            counters = dict(self.counters)
+        operations = {}
+        for name, (calls, total, slowest, histogram) in recorded:
+            operations[name] = {
+                "calls": calls,
+                "total_us": total / 1000,
+                "mean_us": total / calls / 1000,
+                "max_us": slowest / 1000,
+                "histogram": {bucket_label(bucket): n for bucket, n in enumerate(histogram) if n},
+            }
+        return {"operations": operations, "counters": counters}
@@ -0,0 +1,1664 @@
+import threading
+import weakref
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from contextlib import contextmanager
+from itertools import accumulate, chain, islice, repeat
+from operator import add
+
+from app.editor_buffer.autosave import Autosave
+from app.editor_buffer.concurrency import READ_OPERATIONS, WRITE_OPERATIONS, ReadWriteLock, Snapshot
+from app.editor_buffer.history import (OVERFLOW_MODES, SpillFile, entry_size, holds_snapshot, pack_entry,
+                                       unpack_entry)
+from app.editor_buffer.journal import (CHECKPOINT_INTERVAL, EXTEND, PUSH, REDO, UNDO, UndoJournal,
+                                       decode_state, encode_state, file_fingerprint, journal_path, replay)
+from app.editor_buffer.line_index import LineIndex
+from app.editor_buffer.search import find_iter, regex_iter
+from app.editor_buffer.stats import TIMED_OPERATIONS, Stats
+from app.utils.file_manager import FileManager
+
+# Characters handed to the file writer at a time when streaming a save
+CHUNK_SIZE = 64 * 1024
+# Batches with more edits than this are reported to edit listeners as one whole-document change
+NOTIFY_BATCH_LIMIT = 256
+
+# TextBuffer Class: common interface for every document engine
+class TextBuffer(ABC):
+    """
+    Abstract base class for the text storage engines (gap buffer, piece table, ...).
+
+    Subclasses only provide a handful of storage primitives (move the cursor, insert
+    and delete text at the cursor, read a span). Everything the editor uses on top of
+    that - selection, undo/redo and save/load - is implemented here once, so every
+    engine exposes exactly the same public surface.
+    """
+    # Engines that can work directly on a memory-mapped file set this to True
+    LAZY_LOAD = False
+
+    def __init__(self):
+        """
+        Initialise the state shared by every engine.
+        """
+        # Selection functionality
+        self.selection_start = None
+        self.selection_end = None
+        # Secondary cursors for multi-cursor editing (the primary one is the engine's cursor)
+        self._cursors = []
+        # Unde/Redo functionality (the oldest undo entries are dropped from the left):
+        self._undo_stack = deque()
+        self._redo_stack = []
+        # Entries recorded while a group is open (None when no group is open)
+        self._group_entries = None
+        self._group_depth = 0
+        # Last keystroke entry, which the next adjacent keystroke extends
+        self._open_entry = None
+        # Limits on the undo history (see configure_history) and its estimated size in bytes
+        self.history_config = {"max_entries": None, "max_bytes": None, "overflow": "evict", "journal": False}
+        self._undo_bytes = 0
+        # The oldest undo entries may be compressed or spilled: how many, and the spill file
+        self._cold_entries = 0
+        self._spill = None
+        # Undo journal beside the file, and the range of its records not yet replayed
+        self._journal = None
+        self._journal_pending = None
+        # Write-ahead log of unsaved edits beside the file (see configure_autosave)
+        self.autosave_config = {"enabled": False, "fsync": False}
+        self._autosave = None
+        # Line functionality (built on first use, then kept up to date by the engine):
+        self._lines = None
+        # Column the cursor returns to when moving up/down through shorter lines
+        self.goal_column = None
+        # Callbacks told about every text change (e.g. layout caches)
+        self._edit_listeners = []
+        # Counters and latencies, collected only once configure_stats() turns them on
+        self._stats = None
+        # Bumped by every change to the text, so readers can tell which text they saw
+        self.version = 0
+        # Reader/writer lock (see configure_locking) and the latest snapshot, if still alive
+        self._lock = None
+        self._last_snapshot = None
+        # snapshot() runs under the read lock, so concurrent calls take turns on its state
+        self._snapshot_lock = threading.Lock()
+
+    ########################## STORAGE PRIMITIVES ###########################
+
+    @property
+    @abstractmethod
+    def cursor(self) -> int:
+        """The current cursor position as a text offset."""
+
+    @abstractmethod
+    def get_text(self) -> str:
+        """
+        Retrieve the current text in the buffer.
+
+        Returns:
+            str: The full visible text in the buffer.
+        """
+
+    @abstractmethod
+    def get_cursor_limit(self) -> int:
+        """Returns the valid range of cursor movement (i.e., text length)."""
+
+    @abstractmethod
+    def _move_to(self, position: int) -> None:
+        """
+        Move the cursor without touching the undo history.
+
+        Args:
+            position(int): The new cursor position (assumed to be within bounds).
+        """
+
+    @abstractmethod
+    def _insert_text(self, text: str) -> None:
+        """
+        Insert text at the cursor and move the cursor past it without touching the undo history.
+
+        Args:
+            text (str): The text to insert.
+        """
+
+    @abstractmethod
+    def _delete_text(self, count: int) -> None:
+        """
+        Remove characters after the cursor without touching the undo history.
+
+        Args:
+            count (int): Number of characters to delete (assumed to be available).
+        """
+
+    @abstractmethod
+    def _read(self, position: int, count: int) -> str:
+        """
+        Return `count` characters starting at `position` without building the whole text.
+
+        Args:
+            position (int): Text offset to start reading from.
+            count (int): Number of characters to read (assumed to be available).
+        """
+
+    @abstractmethod
+    def _get_state_snapshot(self):
+        """
+        Creates a snapshot of the current buffer state for record_state().
+        The returned dict must have "type": "snapshot".
+        """
+
+    @abstractmethod
+    def _restore_state(self, state):
+        """
+        Restore the buffer to a snapshot returned by _get_state_snapshot().
+        """
+
+    @abstractmethod
+    def _load_text(self, content: str) -> None:
+        """
+        Replace the whole document with freshly loaded content.
+
+        Args:
+            content (str | MappedText): The text read from disk, or a memory-mapped
+                view of it when the engine sets LAZY_LOAD.
+        """
+
+    ########################## BASIC EDITING FUNCTIONALITY ###########################
+
+    def insert(self, text: str) -> None:
+        """
+        Insert a string of text at the current cursor position.
+
+        Args:
+            text (str): The text to insert.
+
+        Returns:
+            None
+        """
+        self._record_edit("insert", self.cursor, text)
+        self._notify_edit(self.cursor, "", text)
+        self._insert_text(text)
+
+    def move_cursor(self, position: int) -> None:
+        """
+        Move the cursor to the specified position in the text.
+
+        Args:
+            position(int): The new cursor position.
+
+        Raises:
+            ValueError: If position is out of bounds.
+        """
+        # Ensure the new cursor position is within valid bounds (0 to size inclusive)
+        if not 0 <= position <= self.get_cursor_limit():
+            raise ValueError("Cursor position out of bounds")
+
+        # Cursor moves are not undo steps, but they do end the current run of typing
+        self._open_entry = None
+        self.goal_column = None
+        self._move_to(position)
+
+    def delete(self, count: int = 1) -> None:
+        """
+        Delete a number of characters after the cursor.
+
+        Args:
+            count (int): Number of characters to delete. Default is 1.
+
+        Raises:
+            ValueError: If trying to delete more characters than available
+        """
+        available = self.get_cursor_limit() - self.cursor
+        if count < 0 or count > available:
+            raise ValueError("Invalid delete count")
+
+        deleted = self._read(self.cursor, count)
+        self._record_edit("delete", self.cursor, deleted)
+        self._notify_edit(self.cursor, deleted, "")
+        self._delete_text(count)
+
+    def _apply_batch(self, edits) -> None:
+        """
+        Apply several edits in one sweep without touching the undo history.
+
+        Edits are applied from the last to the first, so earlier positions stay valid
+        and the cursor only ever travels towards the start. Engines override this to
+        rebuild their storage in a single pass instead. Either way the cursor ends up
+        after the first edit's inserted text.
+
+        Args:
+            edits (list): (position, removed, inserted) tuples in increasing, non-overlapping
+                position order, with positions in the document as it is before the batch.
+        """
+        for position, removed, inserted in reversed(edits):
+            self._notify_edit(position, removed, inserted)
+            self._move_to(position)
+            self._delete_text(len(removed))
+            self._insert_text(inserted)
+
+    def _rewrite(self, text: str, cursor: int) -> None:
+        """
+        Replace the whole text without touching the undo history, reported to edit
+        listeners as one whole-document change. Engines override this to build their
+        storage straight from the new text.
+
+        Args:
+            text (str): The new text.
+            cursor (int): Where the cursor ends up.
+        """
+        self._notify_edit(None, "", "")
+        self._lines = None # Rebuilt on demand for the new text
+        self._move_to(0)
+        self._delete_text(self.get_cursor_limit())
+        self._insert_text(text)
+        self._move_to(cursor)
+
+    def _replace_at(self, positions, pattern: str, replacement: str) -> str:
+        """
+        Return the text with `replacement` put in place of `pattern` at each of `positions`.
+
+        The kept spans are sliced out and joined at C speed, without a Python step per match.
+
+        Args:
+            positions (Iterable[int]): Increasing offsets of the occurrences of `pattern`.
+            pattern (str): The text at each position.
+            replacement (str): The text to put in its place.
+        """
+        text = self.get_text()
+        positions = list(positions)
+        starts = chain((0,), map(add, positions, repeat(len(pattern))))
+        ends = chain(positions, (len(text),))
+        return replacement.join(map(text.__getitem__, map(slice, starts, ends)))
+
+    def _batch_chunks(self, edits) -> list:
+        """
+        Return the text after a batch of edits as a list of chunks, reading the document once.
+
+        Args:
+            edits (list): (position, removed, inserted) tuples, as for _apply_batch.
+
+        Returns:
+            list: Kept text and inserted text, alternating, starting and ending with kept text.
+        """
+        chunks, kept = [], []
+        index = 0
+        position = chunk_start = 0
+        # Stream the document once, cutting the kept spans out of each storage chunk
+        for chunk in self.iter_chunks():
+            chunk_end = chunk_start + len(chunk)
+            while position < chunk_end:
+                keep_end = edits[index][0] if index < len(edits) else chunk_end
+                if position < keep_end:
+                    stop = min(keep_end, chunk_end)
+                    kept.append(chunk[position - chunk_start:stop - chunk_start])
+                    position = stop
+                else:
+                    _, removed, inserted = edits[index]
+                    chunks.append(''.join(kept))
+                    chunks.append(inserted)
+                    kept = []
+                    position += len(removed)
+                    index += 1
+            chunk_start = chunk_end
+
+        # Edits at the very end of the document
+        for _, _, inserted in edits[index:]:
+            chunks.append(''.join(kept))
+            chunks.append(inserted)
+            kept = []
+        chunks.append(''.join(kept))
+        return chunks
+
+    def replace_all(self, pattern: str, replacement: str) -> int:
+        """
+        Replace every non-overlapping occurrence of a substring as a single undoable edit.
+
+        The matches are collected with one scan and applied in one sweep, so the cost
+        is linear in the document size however many matches there are. Beyond
+        NOTIFY_BATCH_LIMIT matches the text is rebuilt with str.split and str.join, and
+        the undo entry holds just the match offsets. Afterwards the selection is
+        cleared and the cursor sits after the first replacement.
+
+        Args:
+            pattern (str): The substring to replace.
+            replacement (str): The text to put in its place.
+
+        Returns:
+            int: The number of replacements made.
+
+        Raises:
+            ValueError: If the pattern is empty.
+        """
+        # A few matches are applied as a batch of edits, which engines apply in place
+        positions = list(islice(self.find_all(pattern), NOTIFY_BATCH_LIMIT + 1))
+        if not positions:
+            return 0
+        cursor, selection = self.cursor, (self.selection_start, self.selection_end)
+        if len(positions) <= NOTIFY_BATCH_LIMIT:
+            edits = [(position, pattern, replacement) for position in positions]
+            self._push_undo({"type": "batch", "edits": edits, "cursor": cursor, "selection": selection})
+            self._apply_batch(edits)
+        else:
+            # Many matches: split the whole text on the pattern and rejoin it with the
+            # replacement, recording only where the matches were
+            pieces = self.get_text().split(pattern)
+            size = len(pattern)
+            positions = array("q", map(add, accumulate(map(len, pieces[:-1])), range(0, size * len(pieces), size)))
+            self._push_undo({
+                "type": "replace",
+                "positions": positions,
+                "pattern": pattern,
+                "replacement": replacement,
+                "cursor": cursor,
+                "selection": selection,
+            })
+            self._rewrite(replacement.join(pieces), positions[0] + len(replacement))
+        self.selection_start = None
+        self.selection_end = None
+        return len(positions)
+
+    ########################## SELECTION FUNCTIONALITY ###########################
+
+    def select(self, start: int, end: int) -> None:
+        """
+        Select a range of text from start to end (non-inclusive).
+
+        Args:
+            start (int): Starting index of selection.
+            end (int): Ending index (exclusive).
+
+        Raises:
+            ValueError: If selection range is invalid.
+        """
+        if not (0 <= start <= end <= self.get_cursor_limit()):
+            raise ValueError("Invalid selection range")
+
+        self._open_entry = None
+        self.selection_start = start
+        self.selection_end = end
+
+    def get_selection(self) -> str:
+        """
+        Return the currently selected text.
+
+        Returns:
+            str: The selected substring, or an empty string if none selected.
+        """
+        if self.selection_start is None or self.selection_end is None:
+            return ''
+
+        return self.get_range(*self._selection_span())
+
+    def delete_selection(self) -> None:
+        """
+        Delete the currently selected text.
+
+        Returns:
+            None
+        """
+        # If no selection is active, do nothing and return
+        if self.selection_start is None or self.selection_end is None:
+            return
+
+        self.delete_range(*self._selection_span())
+
+    def _selection_span(self):
+        """The selection as (start, end), clamped to the text that edits since select() may have shortened."""
+        end = min(self.selection_end, self.get_cursor_limit())
+        return min(self.selection_start, end), end
+
+    ########################## RANGE FUNCTIONALITY ###########################
+
+    def _check_range(self, start: int, end: int) -> None:
+        """Raise ValueError unless 0 <= start <= end <= text length."""
+        if not (0 <= start <= end <= self.get_cursor_limit()):
+            raise ValueError("Invalid range")
+
+    def get_range(self, start: int, end: int) -> str:
+        """
+        Return the text between two offsets, reading only that span.
+
+        Args:
+            start (int): Starting index of the range.
+            end (int): Ending index (exclusive).
+
+        Raises:
+            ValueError: If the range is invalid.
+        """
+        self._check_range(start, end)
+        return self._read(start, end - start)
+
+    def delete_range(self, start: int, end: int) -> None:
+        """
+        Delete the text between two offsets as one undoable edit, leaving the cursor
+        at `start` and clearing the selection.
+
+        Args:
+            start (int): Starting index of the range.
+            end (int): Ending index (exclusive).
+
+        Raises:
+            ValueError: If the range is invalid.
+        """
+        self._check_range(start, end)
+        # Record the deleted span (and the cursor/selection it came from) as one edit
+        deleted = self._read(start, end - start)
+        self._record_edit("delete", start, deleted)
+        self._notify_edit(start, deleted, "")
+
+        self._move_to(start)
+        self._delete_text(len(deleted))
+        self.selection_start = None
+        self.selection_end = None
+
+    def replace_range(self, start: int, end: int, text: str) -> None:
+        """
+        Replace the text between two offsets, as a single undo step, leaving the cursor
+        after the new text.
+
+        Args:
+            start (int): Starting index of the range.
+            end (int): Ending index (exclusive).
+            text (str): The text to put in its place.
+
+        Raises:
+            ValueError: If the range is invalid.
+        """
+        self._check_range(start, end)
+        with self.group():
+            if end > start:
+                self.delete_range(start, end)
+            else:
+                self.move_cursor(start)
+            if text:
+                self.insert(text)
+        self.selection_start = None
+        self.selection_end = None
+
+    ########################## MULTI-CURSOR FUNCTIONALITY ###########################
+
+    def add_cursor(self, position: int) -> None:
+        """
+        Add a secondary cursor. insert_at_cursors() and delete_at_cursors() then edit at
+        every cursor at once; any other edit drops the secondary cursors.
+
+        Args:
+            position (int): Where the new cursor goes.
+
+        Raises:
+            ValueError: If position is out of bounds.
+        """
+        if not 0 <= position <= self.get_cursor_limit():
+            raise ValueError("Cursor position out of bounds")
+
+        if position != self.cursor and position not in self._cursors:
+            self._cursors.append(position)
+
+    def get_cursors(self) -> list:
+        """
+        Return every cursor position, the primary cursor included, in increasing order.
+        """
+        return sorted(set(self._cursors + [self.cursor]))
+
+    def clear_cursors(self) -> None:
+        """Remove every secondary cursor, keeping only the primary one."""
+        self._cursors = []
+
+    def insert_at_cursors(self, text: str) -> None:
+        """
+        Insert the same text at every cursor, as a single undoable edit.
+
+        Every cursor ends up after the text it inserted.
+
+        Args:
+            text (str): The text to insert.
+        """
+        self._edit_at_cursors(0, text)
+
+    def delete_at_cursors(self, count: int = 1) -> None:
+        """
+        Delete characters after every cursor, as a single undoable edit.
+
+        Deletions that would overlap are merged, and the cursors they started from end
+        up at the same position. A cursor at the end of the document deletes nothing.
+
+        Args:
+            count (int): Number of characters to delete after each cursor. Default is 1.
+
+        Raises:
+            ValueError: If count is negative.
+        """
+        if count < 0:
+            raise ValueError("Invalid delete count")
+        self._edit_at_cursors(count, "")
+
+    def _edit_at_cursors(self, count: int, text: str) -> None:
+        """
+        Replace `count` characters after every cursor with `text` in one batch, then
+        move every cursor past its edit, shifted by the edits before it.
+
+        Args:
+            count (int): Number of characters to remove after each cursor.
+            text (str): The text to insert at each cursor.
+        """
+        primary = self.cursor
+        new_primary = primary
+        limit = self.get_cursor_limit()
+        # [start, end) spans to replace, with the cursors that fall in each
+        spans = []
+        for position in self.get_cursors():
+            end = min(position + count, limit)
+            if spans and position < spans[-1][1]:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([position, end])
+
+        edits, cursors = [], []
+        shift = 0
+        for start, end in spans:
+            if end > start or text:
+                edits.append((start, self._read(start, end - start), text))
+            if start <= primary < max(end, start + 1):
+                new_primary = start + shift + len(text)
+            cursors.append(start + shift + len(text))
+            shift += len(text) - (end - start)
+
+        if edits:
+            self._push_undo({
+                "type": "batch",
+                "edits": edits,
+                "cursor": self.cursor,
+                "selection": (self.selection_start, self.selection_end),
+            })
+            self._apply_batch(edits)
+            self.selection_start = None
+            self.selection_end = None
+        self._move_to(new_primary)
+        self._cursors = [cursor for cursor in cursors if cursor != new_primary]
+
+    ########################## EDIT NOTIFICATIONS ###########################
+
+    def add_edit_listener(self, listener) -> None:
+        """
+        Register a callback to be told about every change to the text.
+
+        The callback is called just before the change is applied, as
+        listener(position, removed, inserted), where `removed` is the text being
+        deleted at `position` and `inserted` the text being inserted there.
+        A position of None means the whole document is being replaced.
+
+        Args:
+            listener (Callable): The callback.
+        """
+        self._edit_listeners.append(listener)
+
+    def remove_edit_listener(self, listener) -> None:
+        """
+        Stop calling a callback registered with add_edit_listener.
+
+        Args:
+            listener (Callable): The callback.
+        """
+        self._edit_listeners.remove(listener)
+
+    def _notify_edit(self, position, removed: str, inserted: str) -> None:
+        """Tell every edit listener about a change that is about to be applied."""
+        self._before_change()
+        for listener in self._edit_listeners:
+            listener(position, removed, inserted)
+
+    def _notify_batch(self, edits) -> None:
+        """
+        Tell every edit listener about a batch of edits that is about to be applied.
+
+        Small batches are reported edit by edit, last first, so every position is still
+        valid when it is reported. Larger ones are reported as one whole-document change.
+
+        Args:
+            edits (list): (position, removed, inserted) tuples, as for _apply_batch.
+        """
+        if len(edits) > NOTIFY_BATCH_LIMIT:
+            self._notify_edit(None, "", "")
+            return
+        self._before_change()
+        for position, removed, inserted in reversed(edits):
+            for listener in self._edit_listeners:
+                listener(position, removed, inserted)
+
+    def _before_change(self) -> None:
+        """
+        Housekeeping done once before every change (or batch of changes), while the
+        text still matches what the listeners have been told.
+        """
+        self.version += 1
+        # Secondary cursors are not moved by the edit, so they would point at the wrong text
+        self._cursors = []
+        if self._autosave is not None:
+            self._autosave.compact_if_due()
+
+    ########################## SEARCH FUNCTIONALITY ###########################
+
+    def find(self, pattern: str, start: int = 0) -> int:
+        """
+        Return the offset of the first occurrence of a substring at or after `start`.
+
+        Args:
+            pattern (str): The substring to look for.
+            start (int): Offset to start searching from.
+
+        Returns:
+            int: The offset of the match, or -1 if there is none.
+
+        Raises:
+            ValueError: If the pattern is empty.
+        """
+        return next(find_iter(self, pattern, start), -1)
+
+    def find_all(self, pattern: str, start: int = 0):
+        """
+        Lazily yield the offsets of every non-overlapping occurrence of a substring.
+
+        Args:
+            pattern (str): The substring to look for.
+            start (int): Offset to start searching from.
+
+        Returns:
+            Iterator[int]: Match offsets, in increasing order.
+
+        Raises:
+            ValueError: If the pattern is empty.
+        """
+        return find_iter(self, pattern, start)
+
+    def find_regex(self, pattern, start: int = 0):
+        """
+        Lazily yield the (start, end) spans of regular expression matches.
+
+        Args:
+            pattern (str | re.Pattern): The regular expression.
+            start (int): Offset to start searching from.
+
+        Returns:
+            Iterator[tuple]: (start, end) spans, in increasing order.
+        """
+        return regex_iter(self, pattern, start)
+
+    def find_next(self, pattern: str) -> int:
+        """
+        Select the next occurrence of a substring after the cursor, wrapping around
+        to the start of the document, and leave the cursor at the end of the match.
+
+        Args:
+            pattern (str): The substring to look for.
+
+        Returns:
+            int: The offset of the match, or -1 if there is none.
+
+        Raises:
+            ValueError: If the pattern is empty.
+        """
+        found = self.find(pattern, self.cursor)
+        if found == -1:
+            found = self.find(pattern, 0)
+        if found != -1:
+            self.select(found, found + len(pattern))
+            self.move_cursor(found + len(pattern))
+        return found
+
+    ########################## LINE FUNCTIONALITY ###########################
+
+    def _line_index(self) -> LineIndex:
+        """
+        Return the newline index, building it with one scan the first time it is needed.
+        Engines keep it in step with their edits once it exists.
+        """
+        if self._lines is None:
+            self._lines = LineIndex(self.iter_chunks(), self.get_cursor_limit(), self.cursor)
+        return self._lines
+
+    def _line_start(self, line: int) -> int:
+        """Offset of the first character of a (valid, zero-based) line."""
+        return self._line_index().line_start(line)
+
+    def _line_of(self, offset: int) -> int:
+        """Zero-based line containing a (valid) offset."""
+        return self._line_index().line_of(offset)
+
+    @property
+    def line_count(self) -> int:
+        """Number of lines in the document (an empty document has one)."""
+        return self._line_index().line_count
+
+    def _line_end(self, line: int) -> int:
+        """Offset just past the last character of a line, excluding its newline."""
+        if line + 1 < self.line_count:
+            return self._line_start(line + 1) - 1
+        return self.get_cursor_limit()
+
+    def offset_to_line_col(self, offset: int):
+        """
+        Convert a text offset into a zero-based (line, column) pair.
+
+        Args:
+            offset (int): Text offset, from 0 to the text length inclusive.
+
+        Returns:
+            tuple: (line, column).
+
+        Raises:
+            ValueError: If offset is out of bounds.
+        """
+        if not 0 <= offset <= self.get_cursor_limit():
+            raise ValueError("Offset out of bounds")
+
+        line = self._line_of(offset)
+        return line, offset - self._line_start(line)
+
+    def line_col_to_offset(self, line: int, column: int) -> int:
+        """
+        Convert a zero-based (line, column) pair into a text offset.
+
+        Args:
+            line (int): Zero-based line number.
+            column (int): Zero-based column, up to the line length inclusive.
+
+        Returns:
+            int: The text offset.
+
+        Raises:
+            ValueError: If the line or column is out of bounds.
+        """
+        if not 0 <= line < self.line_count:
+            raise ValueError("Line out of bounds")
+
+        start = self._line_start(line)
+        if not 0 <= column <= self._line_end(line) - start:
+            raise ValueError("Column out of bounds")
+        return start + column
+
+    def get_line(self, line: int) -> str:
+        """
+        Return the text of one line, without its trailing newline.
+
+        Args:
+            line (int): Zero-based line number.
+
+        Returns:
+            str: The line text.
+
+        Raises:
+            ValueError: If the line is out of bounds.
+        """
+        if not 0 <= line < self.line_count:
+            raise ValueError("Line out of bounds")
+
+        start = self._line_start(line)
+        return self._read(start, self._line_end(line) - start)
+
+    ########################## LINE CURSOR FUNCTIONALITY ###########################
+
+    def _move_vertically(self, delta: int) -> None:
+        """
+        Move the cursor `delta` lines up (negative) or down (positive), keeping the goal column.
+
+        Args:
+            delta (int): Number of lines to move.
+        """
+        line, column = self.offset_to_line_col(self.cursor)
+        goal = column if self.goal_column is None else self.goal_column
+        target = line + delta
+        if not 0 <= target < self.line_count:
+            return # Already on the first/last line
+
+        start = self._line_start(target)
+        self.move_cursor(start + min(goal, self._line_end(target) - start))
+        # move_cursor forgets the goal column, so put it back for the next vertical move
+        self.goal_column = goal
+
+    def move_up(self) -> None:
+        """
+        Move the cursor to the previous line, as close to the remembered column as it fits.
+        """
+        self._move_vertically(-1)
+
+    def move_down(self) -> None:
+        """
+        Move the cursor to the next line, as close to the remembered column as it fits.
+        """
+        self._move_vertically(1)
+
+    def move_line_start(self) -> None:
+        """
+        Move the cursor to the start of the current line.
+        """
+        self.move_cursor(self._line_start(self._line_of(self.cursor)))
+
+    def move_line_end(self) -> None:
+        """
+        Move the cursor to the end of the current line (before its newline).
+        """
+        self.move_cursor(self._line_end(self._line_of(self.cursor)))
+
+    ########################## UNDO/REDO FUNCTIONALITY ###########################
+
+    # History entries follow the Command pattern: rather than copying the whole buffer,
+    # each entry stores only the span of text an edit inserted or deleted, plus the
+    # cursor/selection to put back. Undo and redo therefore cost O(edit), not O(document).
+    #
+    #   {"type": "insert", "position", "text", "cursor", "selection"}  text was inserted
+    #   {"type": "delete", "position", "text", "cursor", "selection"}  text was deleted
+    #   {"type": "batch", "edits", "cursor", "selection"}              several edits at once
+    #   {"type": "replace", "positions", "pattern", "replacement",     a large replace_all
+    #    "cursor", "selection"}
+    #   {"type": "group", "entries"}                                   begin_group()/end_group()
+    #   {"type": "snapshot", ...}                                      explicit record_state()
+    #   {"type": "compressed", "data"}                                 old entry, zlib-compressed
+    #   {"type": "spilled", "offset", "length"}                        old entry, in the spill file
+    #
+    # "cursor" and "selection" always hold the state to restore when the entry is popped.
+    # Cursor and selection changes on their own are not recorded: every edit entry
+    # already restores the cursor and selection it was made with. Consecutive
+    # single-character inserts (typing) and forward deletes are merged into one entry,
+    # up to and including a typed newline.
+
+    @property
+    def undo_stack(self) -> deque:
+        """Undo history, oldest first (replaying the undo journal first if it is pending)."""
+        self._restore_journal()
+        return self._undo_stack
+
+    @undo_stack.setter
+    def undo_stack(self, stack) -> None:
+        self._undo_stack = deque(stack)
+
+    @property
+    def redo_stack(self) -> list:
+        """Redo history, next entry to redo last (replaying the undo journal first if it is pending)."""
+        self._restore_journal()
+        return self._redo_stack
+
+    @redo_stack.setter
+    def redo_stack(self, stack: list) -> None:
+        self._redo_stack = stack
+
+    def _push_undo(self, entry):
+        """
+        Push a new history entry onto the undo stack (or the open group).
+        Once a new change is made, redo history is no longer valid,
+        and neither is the goal column of a previous vertical move.
+        """
+        self._redo_stack.clear()
+        self.goal_column = None
+        self._open_entry = None
+        if self._group_entries is not None:
+            self._group_entries.append(entry)
+        else:
+            self._add_undo(entry)
+            self._journal_record(PUSH, entry)
+
+
+    def _record_edit(self, kind: str, position: int, text: str) -> None:
+        """
+        Record an insert or delete of `text` at `position` before it is applied.
+
+        A single-character edit that continues the previous keystroke (typing straight
+        after it, or deleting forward from the same place) extends that entry instead.
+
+        Args:
+            kind (str): Either "insert" or "delete".
+            position (int): Text offset the edit starts at.
+            text (str): The text being inserted or deleted.
+        """
+        entry = self._open_entry
+        if len(text) == 1 and entry is not None and entry["type"] == kind and position == (
+                entry["position"] + len(entry["text"]) if kind == "insert" else entry["position"]):
+            size = entry_size(entry)
+            entry["text"] += text
+            self.goal_column = None
+            if self._group_entries is None:
+                self._undo_bytes += entry_size(entry) - size
+                self._enforce_history_limits()
+                self._journal_record(EXTEND, text)
+        else:
+            entry = {
+                "type": kind,
+                "position": position,
+                "text": text,
+                "cursor": self.cursor,
+                "selection": (self.selection_start, self.selection_end),
+            }
+            self._push_undo(entry)
+
+        # Only keystrokes can be extended, and a newline ends the run
+        self._open_entry = entry if len(text) == 1 and text != "\n" else None
+
+
+    def begin_group(self) -> None:
+        """
+        Start collecting edits into one undo step, until the matching end_group().
+
+        Groups may be nested: only the outermost end_group() closes the step.
+        """
+        if self._group_depth == 0:
+            self._group_entries = []
+        self._group_depth += 1
+        self._open_entry = None
+
+
+    def end_group(self) -> None:
+        """
+        Close the group started by begin_group(), recording its edits as a single undo step.
+
+        Raises:
+            ValueError: If no group is open.
+        """
+        if self._group_depth == 0:
+            raise ValueError("No undo group is open")
+
+        self._group_depth -= 1
+        self._open_entry = None
+        if self._group_depth == 0:
+            self._flush_group()
+            self._group_entries = None
+
+
+    def _flush_group(self) -> None:
+        """Record the edits collected so far in the open group as one undo step."""
+        entries = self._group_entries
+        self._group_entries = []
+        if len(entries) == 1:
+            entry = entries[0]
+        elif entries:
+            entry = {"type": "group", "entries": entries}
+        else:
+            return
+        self._add_undo(entry)
+        self._journal_record(PUSH, entry)
+
+
+    def _add_undo(self, entry) -> None:
+        """Append an entry to the undo stack, then bring the history back within its limits."""
+        self._undo_stack.append(entry)
+        size = entry_size(entry)
+        self._undo_bytes += size
+        if self._stats is not None:
+            self._stats.count("undo_entries")
+            self._stats.count("undo_entry_bytes", size)
+            self._stats.peak("largest_undo_entry", size)
+        self._enforce_history_limits()
+
+
+    def configure_history(self, max_entries: int = None, max_bytes: int = None,
+                          overflow: str = "evict", journal: bool = None) -> None:
+        """
+        Bound the undo history by number of entries and/or estimated bytes.
+
+        When there are more than `max_entries` undo steps the oldest are dropped. When
+        the history is over `max_bytes`, the oldest entries are first compressed with
+        zlib ("compress") or moved out to a temporary file ("spill"), and only dropped
+        if that is not enough ("evict" drops them straight away). The most recent
+        undo step is always kept, however large it is.
+
+        With `journal`, the history is also written to an append-only journal beside
+        the file (from the next load or save), so it survives restarting the editor.
+
+        Args:
+            max_entries (int): Maximum number of undo steps, or None for no limit.
+            max_bytes (int): Memory budget for the undo history, or None for no limit.
+            overflow (str): "evict", "compress" or "spill".
+            journal (bool): Keep the history in an undo journal beside the file, or None
+                to leave the journal as it is.
+
+        Raises:
+            ValueError: If a limit is negative or the overflow mode is not recognised.
+        """
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f"Unknown overflow mode: {overflow}")
+        if (max_entries is not None and max_entries < 0) or (max_bytes is not None and max_bytes < 0):
+            raise ValueError("History limits cannot be negative")
+
+        if journal is None:
+            journal = self.history_config["journal"]
+        self.history_config = {"max_entries": max_entries, "max_bytes": max_bytes,
+                               "overflow": overflow, "journal": journal}
+        if not journal:
+            self._restore_journal()
+            self._close_journal()
+        self._enforce_history_limits()
+
+
+    def history_usage(self) -> dict:
+        """
+        Report how much memory the undo/redo history is using.
+
+        Returns:
+            dict: Entry counts, estimated bytes held in memory by each stack, the number
+                of compressed/spilled undo entries and the size of the spill file.
+        """
+        self._restore_journal()
+        return {
+            "undo_entries": len(self._undo_stack),
+            "redo_entries": len(self._redo_stack),
+            "undo_bytes": self._undo_bytes,
+            "redo_bytes": sum(entry_size(entry) for entry in self._redo_stack),
+            "cold_entries": self._cold_entries,
+            "spilled_bytes": self._spill.size if self._spill else 0,
+        }
+
+
+    def memory_usage(self) -> int:
+        """
+        Estimate the memory held by the document and its undo/redo history, in bytes.
+
+        Returns:
+            int: The approximate size of the engine's storage plus the history.
+        """
+        return self._storage_bytes() + self._undo_bytes \
+            + sum(entry_size(entry) for entry in self._redo_stack)
+
+
+    def _storage_bytes(self) -> int:
+        """Estimate the memory held by the engine's storage (engines refine this)."""
+        return 4 * self.get_cursor_limit()
+
+
+    def _enforce_history_limits(self) -> None:
+        """Compress, spill or drop the oldest undo entries until the history is within its limits."""
+        max_entries = self.history_config["max_entries"]
+        max_bytes = self.history_config["max_bytes"]
+        if max_entries is not None:
+            while len(self._undo_stack) > max(max_entries, 1):
+                self._evict_oldest()
+        if max_bytes is None:
+            return
+
+        if self.history_config["overflow"] != "evict":
+            while self._undo_bytes > max_bytes and self._cold_entries < len(self._undo_stack) - 1:
+                self._freeze(self._cold_entries)
+                self._cold_entries += 1
+        while self._undo_bytes > max_bytes and len(self._undo_stack) > 1:
+            self._evict_oldest()
+
+
+    def _evict_oldest(self) -> None:
+        """Drop the oldest undo entry."""
+        entry = self._undo_stack.popleft()
+        self._undo_bytes -= entry_size(entry)
+        self._cold_entries = max(self._cold_entries - 1, 0)
+        self._discard_spilled(entry)
+
+
+    def _freeze(self, index: int) -> None:
+        """
+        Replace an undo entry with a compressed copy, or with a reference into the spill
+        file. Snapshots hold live engine storage, so they stay as they are.
+        """
+        entry = self._undo_stack[index]
+        if holds_snapshot(entry):
+            return
+        data = pack_entry(entry)
+        if self.history_config["overflow"] == "spill":
+            if self._spill is None:
+                self._spill = SpillFile()
+            offset, length = self._spill.write(data)
+            frozen = {"type": "spilled", "offset": offset, "length": length}
+        else:
+            frozen = {"type": "compressed", "data": data}
+        self._undo_bytes += entry_size(frozen) - entry_size(entry)
+        self._undo_stack[index] = frozen
+
+
+    def _discard_spilled(self, entry) -> None:
+        """
+        Release the spill file space of an entry that has left the undo stack, compacting
+        the file once more than half of it is no longer needed.
+        """
+        if entry["type"] != "spilled":
+            return
+        self._spill.discard(entry["length"])
+        if self._spill.size > 2 * self._spill.live:
+            # Spilled entries are always among the oldest (cold) ones
+            cold = [(index, frozen) for index, frozen in enumerate(islice(self._undo_stack, self._cold_entries))
+                    if frozen["type"] == "spilled"]
+            spans = self._spill.compact([(frozen["offset"], frozen["length"]) for _, frozen in cold])
+            for (index, _), (offset, length) in zip(cold, spans):
+                self._undo_stack[index] = {"type": "spilled", "offset": offset, "length": length}
+
+    def _close_spill(self) -> None:
+        """Delete the spill file, once the entries it holds are gone with the history."""
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def _thaw(self, entry):
+        """Return the original form of an entry that may have been compressed or spilled."""
+        if entry["type"] == "compressed":
+            return unpack_entry(entry["data"])
+        if entry["type"] == "spilled":
+            return unpack_entry(self._spill.read(entry["offset"], entry["length"]))
+        return entry
+
+
+    def _journal_record(self, kind: bytes, value) -> None:
+        """Append a history change to the undo journal, if there is one, checkpointing periodically."""
+        if self._journal is None:
+            return
+
+        self._journal.record(kind, value)
+        if self._journal.records_since_checkpoint >= CHECKPOINT_INTERVAL:
+            self._restore_journal()
+            self._journal.checkpoint(map(self._thaw, self._undo_stack), self._redo_stack)
+
+
+    def _restore_journal(self) -> None:
+        """
+        Replay the journal records found at load time, putting the restored history
+        beneath any edits made since. Done lazily, the first time the history is needed.
+        A journal with a malformed record is replaced rather than partly restored.
+        """
+        if self._journal_pending is None:
+            return
+
+        start, end = self._journal_pending
+        self._journal_pending = None
+        try:
+            undo_stack, redo_stack = replay(self._journal.read(start, end))
+        except (ValueError, RecursionError):
+            # A damaged journal is dropped: restart it from the history made since loading
+            self._journal.create(map(self._thaw, self._undo_stack), self._redo_stack)
+            return
+        # Anything recorded since loading has made the restored redo history obsolete
+        if not (self._undo_stack or self._group_entries):
+            self._redo_stack = redo_stack
+        restored = deque(undo_stack)
+        restored.extend(self._thaw(entry) for entry in self._undo_stack)
+        self._undo_stack = restored
+        self._cold_entries = 0
+        if self._spill is not None:
+            self._spill.compact([])
+        self._undo_bytes = sum(entry_size(entry) for entry in self._undo_stack)
+        self._enforce_history_limits()
+
+
+    def _attach_journal(self, filename: str, saved: bool, copy: bool = False) -> None:
+        """
+        Connect the history to the undo journal beside a file that was just loaded or saved.
+
+        After a load, a journal whose last save matches the file is reopened (and replayed
+        later); otherwise a fresh one is started. After a save, the save is recorded,
+        starting a journal from the current history if the file is a new one.
+
+        Args:
+            filename (str): The file loaded or saved.
+            saved (bool): True after a save, False after a load.
+            copy (bool): The text was loaded from a copy of the file (see load_from_file),
+                which the saved history does not apply to.
+        """
+        if not self.history_config["journal"]:
+            return
+
+        path = journal_path(filename)
+        if saved and self._journal is not None and self._journal.path == path:
+            self._journal.mark_saved(file_fingerprint(filename))
+            return
+
+        self._restore_journal()
+        self._close_journal()
+        self._journal = UndoJournal(path)
+        if not saved:
+            self._journal_pending = self._journal.open_existing(file_fingerprint(filename))
+            if self._journal_pending is not None:
+                if copy:
+                    # Keep the saved history on disk, but carry on from an empty one
+                    self._journal_pending = None
+                    self._journal.checkpoint([], [])
+                return
+        self._journal.create(map(self._thaw, self._undo_stack), self._redo_stack)
+        self._journal.mark_saved(file_fingerprint(filename))
+
+
+    def _close_journal(self) -> None:
+        """Stop writing to the undo journal (its file is kept for the next session)."""
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = None
+        self._journal_pending = None
+
+
+    def configure_autosave(self, enabled: bool = True, fsync: bool = False) -> None:
+        """
+        Keep unsaved edits safe from a crash in a write-ahead log beside the file.
+
+        From the next load or save, every edit is appended to the log as it happens,
+        and loading a file whose log still holds edits that were never saved replays
+        them (as one undo step). Turning autosave off deletes the log.
+
+        Args:
+            enabled (bool): Log edits to the autosave file.
+            fsync (bool): Force each edit to disk, not just to the OS.
+        """
+        self.autosave_config = {"enabled": enabled, "fsync": fsync}
+        if self._autosave is not None:
+            self._autosave.fsync = fsync
+        if not enabled:
+            self._close_autosave(discard=True)
+
+
+    def flush_autosave(self) -> None:
+        """
+        Write a pending whole-document change (e.g. replace_all) to the autosave log now
+        instead of just before the next edit.
+        """
+        if self._autosave is not None:
+            self._autosave.flush()
+
+
+    def _attach_autosave(self, filename: str, saved: bool, copy: bool = False) -> None:
+        """
+        Start logging edits to the autosave file beside a file that was just loaded or saved.
+
+        After a save the log is emptied, since everything in it is now on disk. After a
+        load, edits left in the log by a session that crashed are replayed first.
+
+        Args:
+            filename (str): The file loaded or saved.
+            saved (bool): True after a save, False after a load.
+            copy (bool): The text was loaded from a copy of the file (see load_from_file),
+                so the log restarts from that text instead of being replayed.
+        """
+        if not self.autosave_config["enabled"]:
+            return
+
+        if saved and self._autosave is not None and self._autosave.filename != filename:
+            # Saved under a new name: the old file's log is not needed any more
+            self._close_autosave(discard=True)
+        if self._autosave is None:
+            self._autosave = Autosave(self, filename, self.autosave_config["fsync"])
+
+        if saved or copy:
+            self._autosave.start(snapshot=copy)
+            return
+        recovered = self._autosave.recover()
+        if recovered:
+            print(f"Recovered {recovered} unsaved edits from {self._autosave.path}")
+
+
+    def _close_autosave(self, discard: bool = False) -> None:
+        """Stop logging edits to the autosave file, optionally deleting it."""
+        if self._autosave is not None:
+            self._autosave.close(discard)
+        self._autosave = None
+
+
+    @contextmanager
+    def group(self):
+        """
+        Context manager form of begin_group()/end_group():
+
+            with buffer.group():
+                buffer.insert("a")
+                buffer.delete(1)
+        """
+        self.begin_group()
+        try:
+            yield self
+        finally:
+            self.end_group()
+
+
+    def _apply_entry(self, entry, reverse: bool):
+        """
+        Apply a history entry in either direction and return its counterpart.
+
+        Args:
+            entry (dict): The entry popped from the undo or redo stack.
+            reverse (bool): True when undoing (revert the edit), False when redoing.
+
+        Returns:
+            dict: The entry to push onto the opposite stack.
+        """
+        if entry["type"] == "snapshot":
+            counterpart = self._get_state_snapshot()
+            self._notify_edit(None, "", "")
+            self._restore_state(entry)
+            return counterpart
+
+        if entry["type"] == "group":
+            # Undo the entries last to first, redo them first to last
+            entries = entry["entries"][::-1] if reverse else entry["entries"]
+            counterparts = [self._apply_entry(sub_entry, reverse) for sub_entry in entries]
+            if reverse:
+                counterparts.reverse()
+            return {"type": "group", "entries": counterparts}
+
+        counterpart = dict(entry)
+        counterpart["cursor"] = self.cursor
+        counterpart["selection"] = (self.selection_start, self.selection_end)
+
+        if entry["type"] == "replace":
+            positions, pattern, replacement = entry["positions"], entry["pattern"], entry["replacement"]
+            if reverse:
+                # The replacements sit where the matches were, shifted by the earlier ones
+                shift = len(replacement) - len(pattern)
+                if shift:
+                    positions = map(add, positions, range(0, shift * len(positions), shift))
+                pattern, replacement = replacement, pattern
+            self._rewrite(self._replace_at(positions, pattern, replacement), entry["cursor"])
+        elif entry["type"] == "batch":
+            edits = entry["edits"]
+            if reverse:
+                # Swap removed/inserted text and shift each position by the earlier edits
+                inverse, shift = [], 0
+                for position, removed, inserted in edits:
+                    inverse.append((position + shift, inserted, removed))
+                    shift += len(inserted) - len(removed)
+                edits = inverse
+            self._apply_batch(edits)
+        else:
+            self._move_to(entry["position"])
+            # Undoing an insert or redoing a delete removes the text, otherwise it goes back in
+            if (entry["type"] == "insert") == reverse:
+                self._notify_edit(entry["position"], entry["text"], "")
+                self._delete_text(len(entry["text"]))
+            else:
+                self._notify_edit(entry["position"], "", entry["text"])
+                self._insert_text(entry["text"])
+
+        self._move_to(entry["cursor"])
+        self.selection_start, self.selection_end = entry["selection"]
+        return counterpart
+
+
+    def record_state(self):
+        """
+        Record a full snapshot of the current buffer as an explicit undo checkpoint.
+
+        Edits record their own (much smaller) history entries, so this is only
+        needed by callers that mutate the buffer directly.
+        """
+        self._push_undo(self._get_state_snapshot())
+
+
+    def undo(self):
+        """
+        Undo the last recorded operation by reverting the most recent entry
+        on the undo stack. Its counterpart is saved in the redo stack
+        so it can be reapplied later.
+        """
+        if self._group_entries is not None:
+            # Undoing inside a group ends the step so far: later edits start a new one
+            self._flush_group()
+        self._restore_journal()
+        if not self._undo_stack:
+            return # No previous state to revert to
+
+        entry = self._undo_stack.pop()
+        self._undo_bytes -= entry_size(entry)
+        self._cold_entries = min(self._cold_entries, len(self._undo_stack))
+        thawed = self._thaw(entry)
+        self._discard_spilled(entry)
+        counterpart = self._apply_entry(thawed, reverse=True)
+        self._redo_stack.append(counterpart)
+        self._journal_record(UNDO, counterpart)
+        self.goal_column = None
+        self._open_entry = None
+
+
+    def redo(self):
+        """
+        Redo the last undone operation by reapplying the most recent entry
+        on the redo stack. Its counterpart is saved in the undo stack.
+        """
+        self._restore_journal()
+        if not self._redo_stack:
+            return # No state to redo
+
+        entry = self._redo_stack.pop()
+        counterpart = self._apply_entry(entry, reverse=False)
+        self._add_undo(counterpart)
+        self._journal_record(REDO, counterpart)
+        self.goal_column = None
+        self._open_entry = None
+
+    ########################## INSTRUMENTATION ###########################
+
+    def configure_stats(self, enabled: bool = True) -> None:
+        """
+        Turn collecting performance statistics on or off.
+
+        While on, every public editing, reading and file operation is timed into a
+        latency histogram, and the engine counts events such as gap moves, resizes,
+        characters copied and undo entries recorded. While off nothing is collected,
+        and the operations run exactly as if stats did not exist. Turning stats off
+        discards what was collected.
+
+        Args:
+            enabled (bool): Collect statistics.
+        """
+        if enabled != (self._stats is not None):
+            self._stats = Stats() if enabled else None
+            self._wrap_operations()
+
+
+    def _wrap_operations(self) -> None:
+        """
+        Set the wrappers for stats and locking on the instance, shadowing the methods
+        only while they are enabled. The lock is taken outside the timing, so time
+        spent waiting for it is not counted as the operation's.
+        """
+        for name in TIMED_OPERATIONS + READ_OPERATIONS + WRITE_OPERATIONS:
+            vars(self).pop(name, None)
+        if self._stats is not None:
+            for name in TIMED_OPERATIONS:
+                setattr(self, name, self._stats.timed(name, getattr(self, name)))
+        if self._lock is not None:
+            for name in READ_OPERATIONS:
+                setattr(self, name, self._lock.reading(getattr(self, name)))
+            for name in WRITE_OPERATIONS:
+                setattr(self, name, self._lock.writing(getattr(self, name)))
+
+
+    def get_stats(self) -> dict:
+        """
+        Report the statistics collected since they were turned on or last reset.
+
+        Returns:
+            dict: Per-operation calls and latencies ("operations"), the engine's counters
+                ("counters"), the current history_usage() ("history") and memory_usage()
+                ("memory_bytes"), or None if stats are off.
+        """
+        if self._stats is None:
+            return None
+        report = self._stats.report()
+        report["history"] = self.history_usage()
+        report["memory_bytes"] = self.memory_usage()
+        return report
+
+
+    def reset_stats(self) -> None:
+        """Start collecting statistics afresh, if they are on."""
+        if self._stats is not None:
+            self._stats.reset()
+
+    ########################## CONCURRENCY ###########################
+
+    def configure_locking(self, enabled: bool = True) -> None:
+        """
+        Turn the reader/writer lock on or off, so the buffer can be shared between threads.
+
+        While on, reading operations (get_text, get_range, find, ...) run under a shared
+        read lock and everything else under an exclusive write lock, so background
+        threads can read while the editing thread writes between their reads. Edits
+        stay single-writer: a begin_group()/end_group() pair is two separate writes.
+        Generators (find_all, find_regex, iter_chunks) and the cursor and line_count
+        properties are not covered; use a snapshot() for those, or for any read that
+        must see one consistent text across several calls.
+
+        Args:
+            enabled (bool): Lock the buffer's operations.
+        """
+        if enabled != (self._lock is not None):
+            self._lock = ReadWriteLock() if enabled else None
+            self._wrap_operations()
+
+
+    @property
+    def lock(self) -> ReadWriteLock:
+        """The reader/writer lock while locking is on (see configure_locking), else None."""
+        return self._lock
+
+
+    def snapshot(self) -> Snapshot:
+        """
+        Return an immutable view of the text as it is now.
+
+        The snapshot can be read from any thread while the buffer keeps being edited,
+        and no engine copies the document to take one: a rope shares its immutable
+        tree, a piece table copies only its list of pieces, and a gap buffer shares
+        its storage until an edit would change text the snapshot can see (typing into
+        the gap does not). Snapshots taken at the same version are the same object.
+
+        It is a read operation, so background threads can take snapshots while others
+        read; they take turns on the engine's bookkeeping of what is shared.
+
+        Returns:
+            Snapshot: The view, stamped with the buffer's current version.
+        """
+        with self._snapshot_lock:
+            snapshot = self._last_snapshot() if self._last_snapshot is not None else None
+            if snapshot is None or snapshot.version != self.version:
+                snapshot = Snapshot(self.version, self.get_cursor_limit(), self._snapshot_reader())
+                self._last_snapshot = weakref.ref(snapshot)
+            return snapshot
+
+
+    def _snapshot_reader(self):
+        """
+        Return read(position, count) over the text as it is now, unaffected by later
+        edits. Engines override this to share their storage instead of copying the text.
+        """
+        text = self.get_text()
+        return lambda position, count: text[position:position + count]
+
+    ########################## SAVE/LOAD FUNCTIONALITY ###########################
+
+    def iter_chunks(self, chunk_size: int = CHUNK_SIZE):
+        """
+        Yield the document text in order, at most `chunk_size` characters at a time.
+
+        Engines override this to walk their own storage directly.
+
+        Args:
+            chunk_size (int): Maximum number of characters per chunk.
+
+        Yields:
+            str: Consecutive pieces of the document text.
+        """
+        length = self.get_cursor_limit()
+        for position in range(0, length, chunk_size):
+            yield self._read(position, min(chunk_size, length - position))
+
+
+    def save_to_file(self, filename: str) -> bool:
+        """
+        Save the buffer contents to a file, streaming it without building the whole text.
+
+        Args:
+            filename (str): The file path to save to.
+
+        Returns:
+            bool: True if the file was saved, False if it could not be (the error is
+                printed, and the journal and autosave log are left as they were).
+        """
+        try:
+            FileManager.save_chunks(self.iter_chunks(), filename)
+        except Exception as e:
+            print(f"Failed to save file: {e}")
+            return False
+        self._attach_journal(filename, saved=True)
+        self._attach_autosave(filename, saved=True)
+        return True
+
+
+    def load_from_file(self, filename: str, source: str = None) -> bool:
+        """
+        Load text from a file and replace the buffer contents.
+
+        Args:
+            filename (str): The file path to load from.
+            source (str): Read the text from this file instead: a copy of `filename` with
+                unsaved changes, such as a BufferManager swap file. The journal and the
+                autosave log stay with `filename`, and start again from the copy's text.
+
+        Returns:
+            bool: True if the file was loaded, False if it could not be read (the error
+                is printed, and the buffer is left as it was).
+        """
+        try:
+            if self.LAZY_LOAD:
+                content = FileManager.map_file(source or filename)
+            else:
+                content = FileManager.load_from_file(source or filename)
+        except Exception as e:
+            print(f"Failed to load file: {e}")
+            return False
+
+        print(f"Loaded {filename} (len: {len(content)})")
+        self._close_autosave()
+        self._notify_edit(None, "", "")
+        # Loading re-initialises the engine, so carry the listeners and settings over
+        listeners, limits, autosave = self._edit_listeners, self.history_config, self.autosave_config
+        stats, lock, version = self._stats, self._lock, self.version
+        self._close_journal()
+        self._close_spill()
+        self._load_text(content)
+        self._edit_listeners, self.history_config, self.autosave_config = listeners, limits, autosave
+        self._stats, self._lock, self.version = stats, lock, version
+        self._attach_journal(filename, saved=False, copy=source is not None)
+        self._attach_autosave(filename, saved=False, copy=source is not None)
+        return True
+
+
+    def export_history(self) -> bytes:
+        """
+        Encode the undo and redo history, to be restored with import_history() into a
+        buffer holding the same text (e.g. when BufferManager unloads a document). As
+        in the journal, entries below a record_state() snapshot are left out.
+
+        Returns:
+            bytes: The encoded (compressed) history.
+        """
+        return encode_state(map(self._thaw, self.undo_stack), self.redo_stack)
+
+
+    def import_history(self, data: bytes) -> None:
+        """
+        Replace the undo and redo history with one encoded by export_history().
+
+        Args:
+            data (bytes): The encoded history, exported from a buffer with the same text.
+
+        Raises:
+            ValueError: If the data is not an encoded history.
+        """
+        undo_stack, redo_stack = decode_state(data)
+        self._journal_pending = None
+        self._open_entry = None
+        self._undo_stack, self._redo_stack = deque(undo_stack), redo_stack
+        self._cold_entries = 0
+        if self._spill is not None:
+            self._spill.compact([])
+        self._undo_bytes = sum(entry_size(entry) for entry in self._undo_stack)
+        self._enforce_history_limits()
+        if self._journal is not None:
+            self._journal.checkpoint(map(self._thaw, self._undo_stack), self._redo_stack)
+
+
+    def close(self) -> None:
+        """
+        Release the files the buffer holds open: the undo journal, the autosave log and
+        the spill file. The journal and autosave log stay on disk, so the history and any
+        unsaved edits come back when the file is next loaded. The buffer should not be
+        used afterwards.
+        """
+        self._close_journal()
+        self._close_autosave()
+        self._close_spill()
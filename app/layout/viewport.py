@@ -0,0 +1,135 @@
+# Viewport Class
+class Viewport:
+    """
+    The window of lines currently shown to the user.
+
+    A viewport only ever reads the lines between its top line and its height, so
+    rendering costs the same whether the document is 1 KB or 1 GB. It remembers the
+    last frame it produced and the text of the lines it has fetched: an edit only
+    forgets the lines it touched, and render() returns just the rows that differ
+    from the previous frame.
+    """
+    def __init__(self, buffer, height: int = 20, layout=None):
+        """
+        Attach a viewport to a buffer.
+
+        Args:
+            buffer (TextBuffer): The buffer to display.
+            height (int): Number of screen rows.
+            layout (WordWrapLayout): Optional layout used to wrap long lines.
+
+        Raises:
+            ValueError: If height is not positive.
+        """
+        if height <= 0:
+            raise ValueError("Height must be positive")
+
+        self.buffer = buffer
+        self.height = height
+        self.layout = layout
+        self.top_line = 0
+        # Text of fetched lines, by line number, and the rows shown by the last render()
+        self._line_cache = {}
+        self._frame = []
+        buffer.add_edit_listener(self._on_edit)
+
+    def _on_edit(self, position, removed: str, inserted: str) -> None:
+        """
+        Forget the fetched text of lines an edit is about to change.
+
+        If the edit adds or removes lines, every line after it shifts, so those
+        are forgotten too.
+
+        Args:
+            position (int | None): Where the edit happens, or None if everything changes.
+            removed (str): Text about to be deleted at position.
+            inserted (str): Text about to be inserted at position.
+        """
+        if position is None:
+            self._line_cache.clear()
+            return
+
+        line = self.buffer.offset_to_line_col(position)[0]
+        removed_lines = removed.count("\n")
+        if removed_lines == inserted.count("\n"):
+            stale = range(line, line + removed_lines + 1)
+        else:
+            stale = [cached for cached in self._line_cache if cached >= line]
+        for cached in stale:
+            self._line_cache.pop(cached, None)
+
+    def _line_text(self, line: int) -> str:
+        """Return the text of a line, fetching it from the buffer only if it is not cached."""
+        if line not in self._line_cache:
+            self._line_cache[line] = self.buffer.get_line(line)
+        return self._line_cache[line]
+
+    def scroll_to(self, top_line: int) -> None:
+        """
+        Make `top_line` the first line shown, clamped to the document.
+
+        Args:
+            top_line (int): Zero-based logical line number.
+        """
+        self.top_line = max(0, min(top_line, self.buffer.line_count - 1))
+        # Cached lines outside the window will not be shown again soon
+        for line in [line for line in self._line_cache
+                     if not self.top_line <= line < self.top_line + self.height]:
+            del self._line_cache[line]
+
+    def follow_cursor(self) -> None:
+        """
+        Scroll the minimum amount needed for the cursor's line to be visible.
+        """
+        line = self.buffer.offset_to_line_col(self.buffer.cursor)[0]
+        if line < self.top_line:
+            self.scroll_to(line)
+        elif line >= self.top_line + self.height:
+            self.scroll_to(line - self.height + 1)
+
+    def frame(self):
+        """
+        Build the rows currently visible, reading only the lines in the window.
+
+        Returns:
+            list: (logical line, row text) pairs, at most `height` of them.
+        """
+        rows = []
+        line = self.top_line
+        while len(rows) < self.height and line < self.buffer.line_count:
+            text = self._line_text(line)
+            spans = self.layout.rows_for_line(line) if self.layout else [(0, len(text))]
+            for start, end in spans[:self.height - len(rows)]:
+                rows.append((line, text[start:end]))
+            line += 1
+        return rows
+
+    def render(self):
+        """
+        Work out which screen rows changed since the previous render.
+
+        Returns:
+            list: (screen row, logical line, row text) for every row that must be
+                redrawn. A row that is no longer used has a logical line of None.
+        """
+        frame = self.frame()
+        changed = []
+        for row in range(max(len(frame), len(self._frame))):
+            current = frame[row] if row < len(frame) else (None, "")
+            previous = self._frame[row] if row < len(self._frame) else None
+            if current != previous:
+                changed.append((row, current[0], current[1]))
+        self._frame = frame
+        return changed
+
+    def invalidate(self) -> None:
+        """
+        Forget the previous frame so the next render() redraws every row.
+        """
+        self._frame = []
+
+    def detach(self) -> None:
+        """
+        Stop listening to the buffer's edits.
+        """
+        self.buffer.remove_edit_listener(self._on_edit)
@@ -0,0 +1,152 @@
+def wrap_line(text: str, width: int):
+    """
+    Greedily word-wrap one logical line into visual rows of at most `width` characters.
+
+    Rows break at the last space that fits (the space itself is not shown); a word
+    longer than the width is broken mid-word.
+
+    Args:
+        text (str): The logical line, without its newline.
+        width (int): Maximum number of characters per visual row.
+
+    Returns:
+        list: (start, end) column ranges, one per visual row. An empty line is one empty row.
+    """
+    rows = []
+    start = 0
+    while len(text) - start > width:
+        space = text.rfind(" ", start, start + width + 1)
+        if space <= start:
+            # No space to break at: hard-break the word
+            rows.append((start, start + width))
+            start += width
+        else:
+            rows.append((start, space))
+            start = space + 1
+    rows.append((start, len(text)))
+    return rows
+
+
+# WordWrapLayout Class
+class WordWrapLayout:
+    """
+    Computes word-wrapped visual lines for a buffer without touching its storage.
+
+    The wrap result of every logical line is cached. The layout listens to the
+    buffer's edits and only forgets the lines an edit touched, so typing in a huge
+    document re-wraps one line rather than the whole file. Lines are wrapped lazily,
+    the first time they are asked for, so changing the width only costs the lines
+    that are actually displayed afterwards.
+    """
+    def __init__(self, buffer, width: int = 80):
+        """
+        Attach a layout to a buffer.
+
+        Args:
+            buffer (TextBuffer): The buffer to lay out.
+            width (int): Maximum number of characters per visual row.
+
+        Raises:
+            ValueError: If width is not positive.
+        """
+        if width <= 0:
+            raise ValueError("Width must be positive")
+
+        self.buffer = buffer
+        self.width = width
+        # Wrap result per logical line, None where it has not been computed (yet)
+        self._rows = [None] * buffer.line_count
+        buffer.add_edit_listener(self._on_edit)
+
+    def _on_edit(self, position, removed: str, inserted: str) -> None:
+        """
+        Forget the cached rows of the lines an edit is about to change.
+
+        Args:
+            position (int | None): Where the edit happens, or None if everything changes.
+            removed (str): Text about to be deleted at position.
+            inserted (str): Text about to be inserted at position.
+        """
+        if position is None:
+            self._rows = None
+            return
+        if self._rows is None:
+            return
+
+        line = self.buffer.offset_to_line_col(position)[0]
+        changed = removed.count("\n") + 1
+        self._rows[line:line + changed] = [None] * (inserted.count("\n") + 1)
+
+    def _ensure_rows(self) -> list:
+        """Return the per-line cache, recreating it after a whole-document change."""
+        if self._rows is None:
+            self._rows = [None] * self.buffer.line_count
+        return self._rows
+
+    def set_width(self, width: int) -> None:
+        """
+        Change the wrap width. Lines are re-wrapped lazily as they are next requested.
+
+        Args:
+            width (int): Maximum number of characters per visual row.
+
+        Raises:
+            ValueError: If width is not positive.
+        """
+        if width <= 0:
+            raise ValueError("Width must be positive")
+
+        if width != self.width:
+            self.width = width
+            self._rows = None
+
+    def rows_for_line(self, line: int):
+        """
+        Return the visual rows of one logical line, wrapping it if it is not cached.
+
+        Args:
+            line (int): Zero-based logical line number.
+
+        Returns:
+            list: (start, end) column ranges, one per visual row.
+        """
+        return self._wrap(line, None)
+
+    def _wrap(self, line: int, text):
+        """Return the cached rows of a line, wrapping `text` (read if None) on a miss."""
+        rows = self._ensure_rows()
+        if rows[line] is None:
+            if text is None:
+                text = self.buffer.get_line(line)
+            rows[line] = wrap_line(text, self.width)
+        return rows[line]
+
+    def visual_lines(self, top_line: int, height: int):
+        """
+        Return up to `height` visual rows, starting at the first row of `top_line`.
+
+        Only the logical lines needed to fill the rows are read and wrapped.
+
+        Args:
+            top_line (int): Zero-based logical line to start from.
+            height (int): Maximum number of visual rows to return.
+
+        Returns:
+            list: (logical line, row text) pairs.
+        """
+        result = []
+        line = top_line
+        while len(result) < height and line < self.buffer.line_count:
+            text = self.buffer.get_line(line)
+            for start, end in self._wrap(line, text):
+                if len(result) == height:
+                    break
+                result.append((line, text[start:end]))
+            line += 1
+        return result
+
+    def detach(self) -> None:
+        """
+        Stop listening to the buffer's edits.
+        """
+        self.buffer.remove_edit_listener(self._on_edit)
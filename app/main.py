@@ -1,116 +1,422 @@
-from editor_buffer.gap_buffer import GapBuffer
+import argparse
+import sys
+import time
+from functools import partial
 
-def print_state(editor: GapBuffer) -> None:
+from editor_buffer.buffer_manager import BufferManager
+from editor_buffer.engines import ENGINES, create_buffer
+from editor_buffer.text_buffer import TextBuffer
+from layout.viewport import Viewport
+
+# Memory budget shared by every open document: the least recently used are unloaded beyond it
+MEMORY_LIMIT = 512 * 1024 * 1024
+
+def print_state(editor: TextBuffer, view: Viewport) -> None:
     """
-    Prints the current state of the text editor buffer.
+    Prints the rows of the viewport that changed, and the cursor position.
+
+    Only the visible lines are read from the buffer, so this costs the same
+    however large the document is.
 
     Args:
-        editor (GapBuffer): The gap buffer instance.
+        editor (TextBuffer): The buffer instance (any engine).
+        view (Viewport): The viewport showing the buffer.
     """
-    print("\nCurrent text:", repr(editor.get_text()))
-    print("Cursor at:", editor.gap_start)
+    view.follow_cursor()
+    print()
+    for row, line, text in view.render():
+        print(f"{row:>3} {'~' if line is None else line:>6} | {text}")
+    print("Cursor at:", editor.cursor, "(line %d, col %d)" % editor.offset_to_line_col(editor.cursor))
     print("-" * 40)
 
-def main() -> None:
+def new_editor(engine: str = "gap_buffer", durable: bool = True) -> TextBuffer:
     """
-    Starts an interactive command-line REPL for the gap buffer text editor.
+    Create an empty buffer whose undo history is kept in a journal beside the file,
+    so it survives restarting the editor, and whose unsaved edits are autosaved so
+    they survive a crash.
 
-    Allows users to insert, delete, move the cursor, select text, and perform undo/redo functionality.
+    Args:
+        engine (str): A key of ENGINES.
+        durable (bool): Whether to keep the journal and autosave log. Scripts turn
+            them off: they write a record per edit, and a script can simply be run again.
+
+    Returns:
+        TextBuffer: The new, empty buffer.
+    """
+    editor = create_buffer(engine)
+    if durable:
+        editor.configure_history(journal=True)
+        editor.configure_autosave()
+    return editor
+
+def open_view(editor: TextBuffer, view: Viewport = None) -> Viewport:
+    """
+    Create a viewport for a buffer, detaching the previous one if given.
+
+    Args:
+        editor (TextBuffer): The buffer to show.
+        view (Viewport): The viewport being replaced, if any.
+
+    Returns:
+        Viewport: A viewport of the same height over the new buffer.
+    """
+    height = view.height if view else 20
+    if view:
+        view.detach()
+    return Viewport(editor, height)
+
+# Session Class: the state the commands work on
+class Session:
+    """
+    The open documents, the one being edited and its viewport, shared by every command.
+    """
+    def __init__(self, interactive: bool = True):
+        """
+        Args:
+            interactive (bool): Whether a user is typing the commands (rather than a script).
+        """
+        self.interactive = interactive
+        self.documents = BufferManager(partial(new_editor, durable=interactive), MEMORY_LIMIT)
+        self.editor = self.documents.new()
+        # Pattern of the last find, reused by next
+        self.last_pattern = None
+        self.running = True
+        # Commands that failed: unknown, missing their argument, or raising an error
+        # the dispatcher reports (see run_command)
+        self.failures = 0
+        self._view = None
+
+    @property
+    def view(self) -> Viewport:
+        """The viewport over the current document, created when it is first needed."""
+        if self._view is None:
+            self._view = open_view(self.editor)
+        return self._view
+
+    def show(self, editor: TextBuffer) -> None:
+        """Make a buffer the one being edited, moving the viewport over to it."""
+        self.editor = editor
+        if self._view is not None:
+            self._view = open_view(editor, self._view)
+
+    def ask(self, argument: str, prompt: str) -> str:
+        """Return the command's argument, prompting for it if it was left out (interactive only)."""
+        if argument or not self.interactive:
+            return argument
+        return input(prompt).strip()
+
+########################## COMMANDS ###########################
+
+def cmd_insert(session: Session, argument: str) -> None:
+    session.editor.insert(argument)
+
+def cmd_move(session: Session, argument: str) -> None:
+    try:
+        session.editor.move_cursor(int(argument))
+    except ValueError:
+        raise ValueError("Invalid position") from None
+
+def cmd_goto(session: Session, argument: str) -> None:
+    line, column = (argument.split() + ["0"])[:2]
+    editor = session.editor
+    editor.move_cursor(editor.line_col_to_offset(int(line), int(column)))
+
+def cmd_up(session: Session, argument: str) -> None:
+    session.editor.move_up()
+
+def cmd_down(session: Session, argument: str) -> None:
+    session.editor.move_down()
+
+def cmd_home(session: Session, argument: str) -> None:
+    session.editor.move_line_start()
+
+def cmd_end(session: Session, argument: str) -> None:
+    session.editor.move_line_end()
+
+def cmd_line(session: Session, argument: str) -> None:
+    print("Line:", repr(session.editor.get_line(int(argument))))
+
+def cmd_delete(session: Session, argument: str) -> None:
+    session.editor.delete(int(argument))
+
+def cmd_cursor(session: Session, argument: str) -> None:
+    try:
+        session.editor.add_cursor(int(argument))
+    except ValueError:
+        raise ValueError("Invalid position") from None
+
+def cmd_cursors(session: Session, argument: str) -> None:
+    print("Cursors:", session.editor.get_cursors())
+
+def cmd_minsert(session: Session, argument: str) -> None:
+    session.editor.insert_at_cursors(argument)
+
+def cmd_mdelete(session: Session, argument: str) -> None:
+    session.editor.delete_at_cursors(int(argument))
+
+def cmd_select(session: Session, argument: str) -> None:
+    try:
+        start, end = argument.split()
+        session.editor.select(int(start), int(end))
+    except ValueError:
+        raise ValueError("Usage: select <start> <end>") from None
+
+def cmd_delete_selection(session: Session, argument: str) -> None:
+    session.editor.delete_selection()
+
+def cmd_get(session: Session, argument: str) -> None:
+    print("Full Text: ", repr(session.editor.get_text()))
+
+def cmd_find(session: Session, argument: str) -> None:
+    # With no pattern (the next command), the last pattern is searched for again
+    if argument:
+        session.last_pattern = argument
+    if not session.last_pattern:
+        raise ValueError("Usage: find <pattern>")
+
+    editor = session.editor
+    found = editor.find_next(session.last_pattern)
+    if found == -1:
+        print("Not found:", repr(session.last_pattern))
+    else:
+        print("Found at: %d (line %d, col %d)" % ((found,) + editor.offset_to_line_col(found)))
+
+def cmd_replace(session: Session, argument: str) -> None:
+    parts = argument.split(" ", 1)
+    if len(parts) != 2 or not parts[0]:
+        raise ValueError("Usage: replace <pattern> <replacement>")
+    print("Replaced: %d" % session.editor.replace_all(parts[0], parts[1]))
+
+def cmd_view(session: Session, argument: str) -> None:
+    session.view.invalidate()
+
+def cmd_scroll(session: Session, argument: str) -> None:
+    try:
+        session.view.scroll_to(int(argument))
+    except ValueError:
+        raise ValueError("Usage: scroll <line>") from None
+
+def cmd_selection(session: Session, argument: str) -> None:
+    print("Selected:", repr(session.editor.get_selection()))
+
+def cmd_undo(session: Session, argument: str) -> None:
+    session.editor.undo()
+
+def cmd_redo(session: Session, argument: str) -> None:
+    session.editor.redo()
+
+def cmd_history(session: Session, argument: str) -> None:
+    for key, value in session.editor.history_usage().items():
+        print("%s: %d" % (key, value))
+
+def cmd_stats(session: Session, argument: str) -> None:
+    editor = session.editor
+    if argument in ("on", "off"):
+        editor.configure_stats(argument == "on")
+        print("Stats:", argument)
+        return
+    if argument == "reset":
+        editor.reset_stats()
+        return
+    if argument:
+        raise ValueError("Usage: stats [on|off|reset]")
+
+    stats = editor.get_stats()
+    if stats is None:
+        print("Stats are off: 'stats on' starts collecting them for this document")
+        return
+    print("%-18s %8s %12s %12s %12s" % ("operation", "calls", "total us", "mean us", "max us"))
+    for name, timing in sorted(stats["operations"].items()):
+        print("%-18s %8d %12.1f %12.1f %12.1f" % (
+            name, timing["calls"], timing["total_us"], timing["mean_us"], timing["max_us"]))
+        print("    " + "  ".join("%s: %d" % bucket for bucket in timing["histogram"].items()))
+    for key, value in sorted(stats["counters"].items()):
+        print("%s: %d" % (key, value))
+    print("undo_bytes: %d" % stats["history"]["undo_bytes"])
+    print("memory_bytes: %d" % stats["memory_bytes"])
+
+def cmd_save(session: Session, argument: str) -> None:
+    filename = session.ask(argument, "Enter filename to save (blank for the document's own): ")
+    if not session.documents.save(filename or None):
+        raise ValueError("The document was not saved")
+
+def cmd_load(session: Session, argument: str) -> None:
+    # The file is opened as another document, in the engine that suits its size
+    filename = session.ask(argument, "Enter filename to load: ")
+    if not filename:
+        raise ValueError("Usage: load <filename>")
+    session.show(session.documents.open(filename))
+
+def cmd_buffers(session: Session, argument: str) -> None:
+    for document in session.documents.list_documents():
+        print("%s %-40s %-12s %s %10d bytes" % (
+            "*" if document["current"] else " ", document["name"], document["engine"],
+            "modified" if document["dirty"] else "        ",
+            document["bytes"]) + ("" if document["loaded"] else " (unloaded)"))
+
+def cmd_switch(session: Session, argument: str) -> None:
+    session.show(session.documents.switch(argument.strip()))
+
+def cmd_close(session: Session, argument: str) -> None:
+    # Unsaved changes are lost; an empty document replaces the last one closed
+    session.documents.close()
+    session.show(session.documents.buffer or session.documents.new())
+
+def cmd_engine(session: Session, argument: str) -> None:
+    print("Engine:", type(session.editor).__name__)
+
+def cmd_new(session: Session, argument: str) -> None:
+    session.show(session.documents.new(argument.strip()))
+
+def cmd_help(session: Session, argument: str) -> None:
+    print()
+    print("Available commands:")
+    for name, (_, usage, description) in COMMANDS.items():
+        print("    %-22s %s" % ((name + " " + usage).strip(), description))
+
+def cmd_exit(session: Session, argument: str) -> None:
+    print("Exiting...")
+    # Leaving on purpose gives up unsaved edits: only a crash leaves them to recover
+    session.documents.close_all()
+    session.running = False
+
+# Every command by name: (handler, argument usage, description). An argument usage in
+# square brackets is optional, one without is required, and "" means no argument.
+COMMANDS = {
+    "insert": (cmd_insert, "<text>", "Insert text at cursor"),
+    "move": (cmd_move, "<pos>", "Move cursor to position"),
+    "goto": (cmd_goto, "<line> [col]", "Move cursor to a line and column (from 0)"),
+    "line": (cmd_line, "<n>", "Show line n (from 0)"),
+    "up": (cmd_up, "", "Move to the previous line, remembering the column"),
+    "down": (cmd_down, "", "Move to the next line, remembering the column"),
+    "home": (cmd_home, "", "Move to the start of the current line"),
+    "end": (cmd_end, "", "Move to the end of the current line"),
+    "delete": (cmd_delete, "<count>", "Delete characters after cursor"),
+    "cursor": (cmd_cursor, "<pos>", "Add another cursor"),
+    "cursors": (cmd_cursors, "", "Show every cursor"),
+    "minsert": (cmd_minsert, "<text>", "Insert text at every cursor (undone in one step)"),
+    "mdelete": (cmd_mdelete, "<n>", "Delete n characters at every cursor"),
+    "select": (cmd_select, "<start> <end>", "Select a range of text"),
+    "selection": (cmd_selection, "", "Show current selection"),
+    "delete_selection": (cmd_delete_selection, "", "Delete selected text"),
+    "get": (cmd_get, "", "Show full text"),
+    "find": (cmd_find, "<pattern>", "Select the next match after the cursor"),
+    "next": (cmd_find, "", "Select the next match of the last pattern"),
+    "replace": (cmd_replace, "<pat> <text>", "Replace every match (undone in one step)"),
+    "view": (cmd_view, "", "Redraw every row of the viewport"),
+    "scroll": (cmd_scroll, "<line>", "Show the document from this line (from 0)"),
+    "undo": (cmd_undo, "", "Undo last change"),
+    "redo": (cmd_redo, "", "Redo last undone change"),
+    "history": (cmd_history, "", "Show how much memory the undo history uses"),
+    "stats": (cmd_stats, "[on|off|reset]", "Show, start, stop or reset performance statistics"),
+    "save": (cmd_save, "[file]", "Save the document (to its own file, or a new one)"),
+    "load": (cmd_load, "[file]", "Open a file as another document"),
+    "buffers": (cmd_buffers, "", "List the open documents"),
+    "switch": (cmd_switch, "<name>", "Switch to another open document"),
+    "close": (cmd_close, "", "Close the document, discarding unsaved changes"),
+    "engine": (cmd_engine, "", "Show which engine holds the document"),
+    "new": (cmd_new, "<engine>", "Start another, empty document (%s)" % ", ".join(ENGINES)),
+    "help": (cmd_help, "", "Show this list"),
+    "exit": (cmd_exit, "", "Quit editor"),
+}
+
+def run_command(session: Session, command: str) -> None:
     """
-    editor = GapBuffer()
+    Run one command line through the COMMANDS table.
 
-    while True:
-        # The command being input
-        command = input(">> ").strip()
+    A command that fails with a ValueError (bad input), IndexError (out of range) or
+    OSError (a file problem) is reported and counted in session.failures, and the
+    session carries on.
 
-        # If exit
-        if command == "exit":
-            print("Exiting...")
+    Args:
+        session (Session): The state the command works on.
+        command (str): The command name, optionally followed by a space and its argument.
+    """
+    name, _, argument = command.partition(" ")
+    entry = COMMANDS.get(name)
+    if entry is None or (argument and not entry[1]):
+        print("Unknown command. Type 'help' for a list of commands.")
+        session.failures += 1
+        return
+
+    handler, usage, _ = entry
+    if not argument and usage and not usage.startswith("["):
+        print("Usage: %s %s" % (name, usage))
+        session.failures += 1
+        return
+    try:
+        handler(session, argument)
+    except (ValueError, IndexError, OSError) as e:
+        print(e)
+        session.failures += 1
+    session.editor.flush_autosave()
+
+def run_script(session: Session, lines) -> tuple:
+    """
+    Run commands from a script without printing the state after each one.
+
+    Blank lines and lines starting with # are skipped. If the script does not end
+    with exit, the session is closed as if it did.
+
+    Args:
+        session (Session): The state the commands work on.
+        lines (Iterable[str]): The script, one command per line.
+
+    Returns:
+        tuple: (number of commands run, seconds taken).
+    """
+    count = 0
+    started = time.perf_counter()
+    for line in lines:
+        command = line.strip()
+        if not command or command.startswith("#"):
+            continue
+        count += 1
+        run_command(session, command)
+        if not session.running:
             break
-        
-        # If something is inserted
-        elif command.startswith("insert "):
-            text = command[len("insert "):]
-            editor.insert(text)
-
-        # If cursor move
-        elif command.startswith("move "):
-            try:
-                pos = int(command[len("move "):])
-                editor.move_cursor(pos)
-            except ValueError:
-                print("Invalid position")
-
-        # If delete
-        elif command.startswith("delete "):
-            try:
-                count = int(command[len("delete "):])
-                editor.delete(count)
-            except ValueError as e:
-                print(e)
-
-        # If select
-        elif command.startswith("select "):
-            try:
-                _, start, end=command.split()
-                editor.select(int(start), int(end))
-            except Exception:
-                print("Usage: select <start> <end>")
-
-        # If get
-        elif command == "get":
-            print("Full Text: ", repr(editor.get_text()))
-        
-        # If selection
-        elif command == "selection":
-            print("Selected:", repr(editor.get_selection()))
-
-        # If delete selection
-        elif command == "delete_selection":
-            editor.delete_selection()
-
-        # If undo
-        elif command == "undo":
-            editor.undo()
-
-        # If redo
-        elif command == "redo":
-            editor.redo()
-
-        # If save
-        elif command == "save":
-            filename = input("Enter filename to save: ").strip()
-            editor.save_to_file(filename)
-
-        # If load
-        elif command == "load":
-            filename = input("Enter filename to load: ").strip()
-            editor.load_from_file(filename)
-
-        # If help
-        elif command == "help":
-            print("""
-Available commands:
-    insert <text>          Insert text at cursor
-    move <pos>             Move cursor to position
-    delete <count>         Delete characters after cursor
-    select <start> <end>   Select a range of text
-    selection              Show current selection
-    delete_selection       Delete selected text
-    get                    Show full text
-    undo                   Undo last change
-    redo                   Redo last undone change
-    save                   Save the text in a file
-    load                   Load a file from a file
-    exit                   Quit editor      
-                  """)
-            
+    if session.running:
+        session.documents.close_all()
+    return count, time.perf_counter() - started
+
+def main(argv: list = None) -> int:
+    """
+    Starts the text editor: an interactive command-line REPL, or with a script argument,
+    a batch run of the script's commands followed by a throughput report.
+
+    Allows users to insert, delete, move the cursor, select text, and perform undo/redo functionality.
+
+    Args:
+        argv (list): Command-line arguments (defaults to sys.argv[1:]).
+
+    Returns:
+        int: The exit status: 1 if any command of a script failed, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description="Command-line text editor.")
+    parser.add_argument("script", nargs="?",
+                        help="file of commands to run without printing the state after each ('-' for stdin)")
+    args = parser.parse_args(argv)
+
+    if args.script:
+        session = Session(interactive=False)
+        if args.script == "-":
+            count, elapsed = run_script(session, sys.stdin)
         else:
-            print("Unknown command. Type 'help' for a list of commands.")
+            with open(args.script, encoding="utf-8") as script:
+                count, elapsed = run_script(session, script)
+        rate = count / elapsed if elapsed else 0
+        print("Ran %d commands in %.3f s (%.0f commands/s)" % (count, elapsed, rate), file=sys.stderr)
+        if session.failures:
+            print("%d commands failed" % session.failures, file=sys.stderr)
+            return 1
+        return 0
 
-        print_state(editor)
+    session = Session()
+    while session.running:
+        run_command(session, input(">> ").strip())
+        if session.running:
+            print_state(session.editor, session.view)
+    return 0
 
 if __name__ == "__main__":
-    main()
-
-    
+    sys.exit(main())
@@ -1,10 +1,35 @@
 import os
+import stat
+from typing import Iterable
+
+from app.utils.mapped_file import MappedText
 
 class FileManager:
     """
     Helper class for reading from and writing to files.
     """
 
+    # Files at least this large open in a piece table instead of a gap buffer
+    PIECE_TABLE_THRESHOLD = 1024 * 1024
+
+    @staticmethod
+    def recommended_engine(filename: str) -> str:
+        """
+        Pick the document engine best suited to a file, based on its size.
+
+        Small files suit the gap buffer (fast local typing); large files suit the
+        piece table, which never copies or moves the original text.
+
+        Args:
+            filename (str): The name or path of the file about to be opened.
+
+        Returns:
+            str: "gap_buffer" or "piece_table".
+        """
+        if os.path.exists(filename) and os.path.getsize(filename) >= FileManager.PIECE_TABLE_THRESHOLD:
+            return "piece_table"
+        return "gap_buffer"
+
     @staticmethod
     def save_to_file(file_contents: str, filename: str) -> None:
         """
@@ -14,18 +39,76 @@ class FileManager:
             file_contents (str): The contents of the file.
             filename (str): The name or path of the file to save to.
 
+        Raises:
+            ValueError: If the filename is empty.
+            IOError: If there is an error during file writing.
+        """
+        FileManager.save_chunks([file_contents], filename)
+
+
+    @staticmethod
+    def save_chunks(chunks: Iterable[str], filename: str) -> None:
+        """
+        Stream text to a file chunk by chunk, replacing the file atomically.
+
+        The chunks are encoded and written to a temporary file in the same directory,
+        which is fsynced and then renamed over the target with os.replace. Peak memory
+        is one chunk, and a crash mid-save leaves the original file untouched. A symlink
+        is followed, so the file it points at is replaced rather than the link, and the
+        file keeps its permissions (a new one gets the usual 0o666 less the umask).
+
+        Args:
+            chunks (Iterable[str]): The contents of the file, in order.
+            filename (str): The name or path of the file to save to.
+
         Raises:
             ValueError: If the filename is empty.
             IOError: If there is an error during file writing.
         """
         if not filename:
             raise ValueError("Filename cannot be empty.")
-        
+
+        filename = os.path.realpath(filename)
+        directory = os.path.dirname(filename)
+        temp_path = None
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(file_contents)
+            fd, temp_path = FileManager._create_temp(directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+            # A new file keeps the umask-applied mode it was created with; one that
+            # replaces a file takes that file's permissions
+            if os.path.exists(filename):
+                os.chmod(temp_path, stat.S_IMODE(os.stat(filename).st_mode))
+            os.replace(temp_path, filename)
+            temp_path = None
         except IOError as e:
             raise IOError(f"Error saving file: {e}")
+        finally:
+            if temp_path is not None and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+
+    @staticmethod
+    def _create_temp(directory: str):
+        """
+        Create a new, uniquely named temporary file in a directory, opened for writing.
+
+        It is created with mode 0o666 so the kernel applies the umask, giving it the
+        permissions open() gives a new file without changing the process-wide umask.
+
+        Returns:
+            tuple: (file descriptor, path).
+        """
+        while True:
+            path = os.path.join(directory, ".%s.tmp" % os.urandom(8).hex())
+            try:
+                return os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666), path
+            except FileExistsError:
+                continue
 
 
     @staticmethod
@@ -58,3 +141,41 @@ class FileManager:
             raise IOError(f"Error loading file: {e}")
         
         return file_contents
+
+
+    @staticmethod
+    def map_file(filename: str):
+        """
+        Open a UTF-8 file as a read-only, memory-mapped text view.
+
+        Unlike load_from_file, nothing is kept in memory up front: the file is decoded
+        once, a block at a time, to validate it and count its characters, and only the
+        regions later sliced out of the returned view are decoded again. A file that
+        cannot be mapped as-is - one with carriage returns, which text mode turns into
+        newlines, or one that is not valid UTF-8 - is read with load_from_file instead,
+        so every engine sees the same text.
+
+        Args:
+            filename (str): The name or path of the file to map.
+
+        Returns:
+            MappedText | str: A lazily decoded view of the file contents, or the
+                contents themselves when the file cannot be mapped.
+
+        Raises:
+            ValueError: If the filename is empty, or the file is not valid UTF-8.
+            FileNotFoundError: If the specified file does not exist.
+            IOError: If the file cannot be opened or mapped.
+        """
+        if not filename:
+            raise ValueError("Filename cannot be empty.")
+
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f"File '{filename}' not found.")
+
+        try:
+            return MappedText(filename)
+        except ValueError:
+            return FileManager.load_from_file(filename)
+        except IOError as e:
+            raise IOError(f"Error mapping file: {e}")
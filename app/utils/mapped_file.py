@@ -0,0 +1,158 @@
+import mmap
+import os
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+# UTF-8 continuation bytes (0b10xxxxxx): every other byte starts a new character
+CONTINUATION_BYTES = bytes(range(0x80, 0xC0))
+
+class MappedText:
+    """
+    Read-only, lazily decoded view of a UTF-8 file backed by a memory map.
+
+    The file is never read into memory as a whole. Opening it records where each
+    fixed-size block starts (in bytes and in characters); slicing decodes just the
+    blocks that overlap the requested range and keeps the most recently used ones cached.
+    Opening is still one pass over the file: slicing by character offset needs the
+    character count of every block, and decoding a block (then dropping it) is the
+    fastest way to count them, validating the block at the same time. What the map
+    saves is memory, not that pass.
+    Snapshots of a piece table share the view, so it can be sliced from several threads,
+    and each holder takes a claim on it (see retain/release) so it stays open until the
+    last one is done.
+
+    Only files that read the same raw as in text mode can be mapped: indexing checks
+    that every block is valid UTF-8 and holds no carriage return (which text mode would
+    translate), and raises ValueError otherwise, so the caller can read the file the
+    ordinary way instead (see FileManager.map_file).
+    """
+    BLOCK_SIZE = 64 * 1024
+    CACHED_BLOCKS = 16
+
+    def __init__(self, filename: str):
+        """
+        Map a file and index its blocks.
+
+        Args:
+            filename (str): The name or path of the file to map.
+
+        Raises:
+            ValueError: If the file is not valid UTF-8 or contains a carriage return.
+        """
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._map = b''
+        self._byte_starts = []
+        self._char_starts = []
+        self._length = 0
+        # Decoded blocks by index, least recently used first
+        self._cache = OrderedDict()
+        # Whoever opened the view holds it; retain() adds more holders
+        self._holders = 1
+        # Guards the cache and the holders: blocks are decoded outside it, so readers do not queue
+        self._lock = threading.Lock()
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            # mmap cannot map an empty file, and an empty bytes object behaves the same
+            if size:
+                self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._build_index(size)
+        except Exception:
+            self.close()
+            raise
+
+    def _build_index(self, size: int) -> None:
+        """
+        Record the byte and character offset of every block start.
+
+        Each block is decoded once and dropped, which validates the file and counts
+        its characters without holding more than one block in memory.
+
+        Raises:
+            ValueError: If a block is not valid UTF-8 or contains a carriage return.
+        """
+        start = 0
+        while start < size:
+            end = min(start + self.BLOCK_SIZE, size)
+            # Never split a multi-byte character between two blocks
+            while end < size and self._map[end] in CONTINUATION_BYTES:
+                end += 1
+            block = self._map[start:end]
+            if b'\r' in block:
+                raise ValueError("File has carriage returns")
+            self._byte_starts.append(start)
+            self._char_starts.append(self._length)
+            self._length += len(block.decode('utf-8'))
+            start = end
+        self._byte_starts.append(size)
+
+    def _block(self, index: int) -> str:
+        """Decode one block, reusing it if it was used recently."""
+        with self._lock:
+            block = self._cache.get(index)
+            if block is not None:
+                self._cache.move_to_end(index)
+        if block is None:
+            start, end = self._byte_starts[index], self._byte_starts[index + 1]
+            block = self._map[start:end].decode('utf-8')
+            with self._lock:
+                if index not in self._cache and len(self._cache) >= self.CACHED_BLOCKS:
+                    self._cache.popitem(last=False)
+                self._cache[index] = block
+        return block
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key) -> str:
+        """
+        Return the characters in a slice, decoding only the blocks it touches.
+
+        Args:
+            key (slice): A slice with a step of 1 (or None).
+
+        Raises:
+            TypeError: If key is not a slice.
+        """
+        if not isinstance(key, slice):
+            raise TypeError("MappedText only supports slicing")
+        start, stop, step = key.indices(self._length)
+        if step != 1:
+            raise TypeError("MappedText only supports contiguous slices")
+        if start >= stop:
+            return ''
+
+        first = bisect_right(self._char_starts, start) - 1
+        last = bisect_right(self._char_starts, stop - 1) - 1
+        text = ''.join(self._block(index) for index in range(first, last + 1))
+        offset = self._char_starts[first]
+        return text[start - offset:stop - offset]
+
+    def retain(self) -> None:
+        """
+        Add a holder of the view (e.g. a snapshot of the piece table reading it), which
+        must call release() once it no longer needs it.
+        """
+        with self._lock:
+            self._holders += 1
+
+    def release(self) -> None:
+        """
+        Give up one holder's claim on the view, closing it when no holder is left.
+        """
+        with self._lock:
+            if self._holders == 0:
+                return
+            self._holders -= 1
+            if self._holders:
+                return
+        self.close()
+
+    def close(self) -> None:
+        """
+        Release the memory map and the underlying file handle, whoever still holds them.
+        """
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
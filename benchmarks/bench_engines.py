@@ -0,0 +1,79 @@
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Allow running as `python benchmarks/bench_engines.py` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.editor_buffer.engines import ENGINES
+
+
+def time_it(func) -> float:
+    """Run func once and return the elapsed wall-clock time in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def random_edits(buf, positions) -> None:
+    """Insert a short string and delete a few characters at each random position."""
+    for position in positions:
+        buf.move_cursor(position)
+        buf.insert("edit")
+        buf.delete(4)
+
+
+def substrings(buf, positions) -> None:
+    """Read a 100-character selection at each random position."""
+    for position in positions:
+        buf.select(position, position + 100)
+        buf.get_selection()
+
+
+def run(engine: str, size: int, operations: int, seed: int) -> dict:
+    """
+    Time the workloads for one engine.
+
+    Args:
+        engine (str): A key of ENGINES.
+        size (int): Number of characters in the synthetic document.
+        operations (int): Number of random positions used by each workload.
+        seed (int): Random seed, so every engine sees the same positions.
+
+    Returns:
+        dict: Seconds taken by each workload.
+    """
+    rng = random.Random(seed)
+    positions = [rng.randrange(size - 100) for _ in range(operations)]
+    text = ("lorem ipsum dolor sit amet\n" * (size // 27 + 1))[:size]
+
+    buf = ENGINES[engine]()
+    results = {"load": time_it(lambda: buf._load_text(text))}
+    results["random_edits"] = time_it(lambda: random_edits(buf, positions))
+    results["substrings"] = time_it(lambda: substrings(buf, positions))
+    buf.move_cursor(buf.get_cursor_limit())
+    results["append"] = time_it(lambda: buf.insert(text[:size // 10]))
+    results["get_text"] = time_it(buf.get_text)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare document engines on the same workloads.")
+    parser.add_argument("--size", type=int, default=1_000_000, help="document size in characters")
+    parser.add_argument("--operations", type=int, default=1000, help="random positions per workload")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"Document size: {args.size:,} characters, {args.operations:,} operations per workload")
+    results = {engine: run(engine, args.size, args.operations, args.seed) for engine in args.engines}
+    workloads = next(iter(results.values())).keys()
+    print(f"{'workload (s)':<15}" + "".join(f"{engine:>14}" for engine in args.engines))
+    for workload in workloads:
+        print(f"{workload:<15}" + "".join(f"{results[engine][workload]:>14.4f}" for engine in args.engines))
+
+
+if __name__ == "__main__":
+    main()
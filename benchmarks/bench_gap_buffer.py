@@ -0,0 +1,106 @@
+import sys
+import time
+from pathlib import Path
+
+# Allow running as `python benchmarks/bench_gap_buffer.py` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.editor_buffer.gap_buffer import GapBuffer
+
+
+class PerCharGapBuffer(GapBuffer):
+    """
+    GapBuffer with the original one-character-at-a-time gap movement, insertion
+    and deletion loops, kept only as a baseline for comparison.
+    """
+    def _insert_text(self, text: str) -> None:
+        for char in text:
+            if self.gap_start == self.gap_end:
+                self.resize(len(self.buffer) * 2)
+            self.buffer[self.gap_start] = char
+            self.gap_start += 1
+
+    def _move_to(self, position: int) -> None:
+        while self.gap_start > position:
+            self.gap_start -= 1
+            self.gap_end -= 1
+            self.buffer[self.gap_end] = self.buffer[self.gap_start]
+            self.buffer[self.gap_start] = ''
+        while self.gap_start < position:
+            self.buffer[self.gap_start] = self.buffer[self.gap_end]
+            self.buffer[self.gap_end] = ''
+            self.gap_start += 1
+            self.gap_end += 1
+
+    def _delete_text(self, count: int) -> None:
+        for _ in range(count):
+            self.buffer[self.gap_end] = ''
+            self.gap_end += 1
+
+
+def time_it(func) -> float:
+    """Run func once and return the elapsed wall-clock time in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run(buffer_class, size: int) -> dict:
+    """
+    Time a large insert, a full-length cursor jump each way, and a large delete.
+
+    Args:
+        buffer_class (type): The GapBuffer class to benchmark.
+        size (int): Number of characters in the synthetic document.
+
+    Returns:
+        dict: Seconds taken by each operation.
+    """
+    text = "x" * size
+    gb = buffer_class()
+    results = {"insert": time_it(lambda: gb.insert(text))}
+    results["move_to_start"] = time_it(lambda: gb.move_cursor(0))
+    results["move_to_end"] = time_it(lambda: gb.move_cursor(size))
+    gb.move_cursor(0)
+    results["delete"] = time_it(lambda: gb.delete(size // 2))
+    return results
+
+
+def storage_bytes(gb: GapBuffer) -> int:
+    """
+    Approximate memory held by the buffer storage, including the character objects
+    a list refers to (each distinct one-character string is only counted once).
+    """
+    total = sys.getsizeof(gb.buffer)
+    if gb.storage == "list":
+        total += sum(sys.getsizeof(c) for c in set(gb.buffer))
+    return total
+
+
+def compare_storage(size: int) -> None:
+    """Print memory use and get_text() time for list versus array storage."""
+    text = "".join(chr(ord("a") + i % 26) for i in range(size))
+    print(f"{'storage':<15}{'bytes/char':>14}{'get_text (s)':>14}")
+    for storage in ("list", "array"):
+        gb = GapBuffer(storage=storage)
+        gb.insert(text)
+        gb.move_cursor(size // 2)
+        elapsed = time_it(gb.get_text)
+        print(f"{storage:<15}{storage_bytes(gb) / len(gb.buffer):>14.2f}{elapsed:>14.4f}")
+
+
+def main() -> None:
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Document size: {size:,} characters")
+    old = run(PerCharGapBuffer, size)
+    new = run(GapBuffer, size)
+    print(f"{'operation':<15}{'per-char (s)':>14}{'slice (s)':>12}{'speedup':>10}")
+    for name in old:
+        speedup = old[name] / new[name] if new[name] else float("inf")
+        print(f"{name:<15}{old[name]:>14.4f}{new[name]:>12.4f}{speedup:>9.1f}x")
+    print()
+    compare_storage(size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Allow running as `python benchmarks/bench_suite.py` from the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.editor_buffer.engines import ENGINES
+
+# Document sizes measured by default; anything from 1K up to 100M can be given with --sizes
+DEFAULT_SIZES = ["1K", "100K", "1M", "10M"]
+UNITS = {"K": 1024, "M": 1024 * 1024}
+# A workload only counts as regressed if it is slower by more than the threshold and
+# also by at least this many seconds, so timer noise on tiny workloads is ignored
+MIN_REGRESSION_SECONDS = 0.001
+# Run settings stored with a baseline that change what the workloads time: results
+# are only compared when they match
+COMPARED_SETTINGS = ("operations", "repeat", "seed")
+
+
+def parse_size(size: str) -> int:
+    """
+    Convert a size such as "1K", "10M" or "4096" to a number of characters.
+
+    Raises:
+        argparse.ArgumentTypeError: If the size cannot be read.
+    """
+    multiplier = UNITS.get(size[-1:].upper(), 1)
+    digits = size[:-1] if multiplier > 1 else size
+    if not digits.isdigit():
+        raise argparse.ArgumentTypeError(f"Invalid size: {size}")
+    return int(digits) * multiplier
+
+
+def time_it(func, repeat: int) -> float:
+    """
+    Run a workload `repeat` times and return its fastest time in seconds.
+
+    Each call of func sets the workload up afresh and returns the time taken by the
+    measured part only (see Workloads).
+    """
+    best = None
+    for _ in range(repeat):
+        elapsed = func()
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def timed(func) -> float:
+    """Run func once and return the elapsed wall-clock time in seconds."""
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def quietly(func):
+    """Run func with its printed output (e.g. "Loaded ...") discarded, returning its result."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func()
+
+
+# Workloads Class
+class Workloads:
+    """
+    The synthetic workloads, run against one engine at one document size.
+
+    Every workload builds its own buffer, so they can run in any order and be repeated,
+    and only the operations being measured are timed.
+    """
+    def __init__(self, engine: str, size: int, operations: int, seed: int, directory: str):
+        """
+        Args:
+            engine (str): A key of ENGINES.
+            size (int): Number of characters in the synthetic document.
+            operations (int): Number of operations in the editing workloads.
+            seed (int): Random seed, so every engine sees the same positions. Each
+                workload draws from its own generator, so its positions do not depend
+                on which workloads ran before it, or how many times.
+            directory (str): Where the open/save workloads write their files.
+        """
+        self.engine = engine
+        self.size = size
+        self.operations = operations
+        self.seed = seed
+        self.text = ("lorem ipsum dolor sit amet\n" * (size // 27 + 1))[:size]
+        self.path = os.path.join(directory, f"{engine}-{size}.txt")
+
+    def _buffer(self):
+        """Return a buffer of the engine holding the synthetic document."""
+        buf = ENGINES[self.engine]()
+        buf._load_text(self.text)
+        return buf
+
+    def typing_at_end(self) -> float:
+        """Type `operations` characters one at a time at the end of the document."""
+        buf = self._buffer()
+        buf.move_cursor(buf.get_cursor_limit())
+        def run():
+            for _ in range(self.operations):
+                buf.insert("x")
+        return timed(run)
+
+    def _positions(self) -> list:
+        """Return `operations` random positions in the document, the same on every call."""
+        rng = random.Random(self.seed)
+        return [rng.randrange(self.size - 4) for _ in range(self.operations)]
+
+    def random_edits(self) -> float:
+        """Move to a random position, insert a word and delete it again, `operations` times."""
+        buf = self._buffer()
+        positions = self._positions()
+        def run():
+            for position in positions:
+                buf.move_cursor(position)
+                buf.insert("edit")
+                buf.delete(4)
+        return timed(run)
+
+    def large_paste(self) -> float:
+        """Paste a block a tenth of the document's size into its middle."""
+        buf = self._buffer()
+        block = self.text[:max(1, self.size // 10)]
+        buf.move_cursor(self.size // 2)
+        return timed(lambda: buf.insert(block))
+
+    def undo_chain(self) -> float:
+        """Undo and then redo a chain of `operations` separate edits spread over the document."""
+        buf = self._buffer()
+        for index in range(self.operations):
+            buf.move_cursor(index * (self.size // self.operations))
+            buf.insert("y")
+        def run():
+            for _ in range(self.operations):
+                buf.undo()
+            for _ in range(self.operations):
+                buf.redo()
+        return timed(run)
+
+    def get_text(self) -> float:
+        """Build the whole text, after a few edits so it is not stored in one piece."""
+        buf = self._buffer()
+        for position in (self.size // 3, 2 * self.size // 3):
+            buf.move_cursor(position)
+            buf.insert("edit")
+        return timed(buf.get_text)
+
+    def save(self) -> float:
+        """Save the document to a file."""
+        buf = self._buffer()
+        return timed(lambda: quietly(lambda: buf.save_to_file(self.path)))
+
+    def open(self) -> float:
+        """Open a file of the document's size (the file saved by the save workload)."""
+        if not os.path.exists(self.path):
+            quietly(lambda: self._buffer().save_to_file(self.path))
+        buf = ENGINES[self.engine]()
+        elapsed = timed(lambda: quietly(lambda: buf.load_from_file(self.path)))
+        buf.close()
+        return elapsed
+
+    NAMES = ["typing_at_end", "random_edits", "large_paste", "undo_chain", "get_text", "save", "open"]
+
+
+def run_suite(engines, sizes, operations: int, repeat: int, seed: int, workloads=None) -> dict:
+    """
+    Time every workload for every engine and size.
+
+    Args:
+        engines (list): Keys of ENGINES.
+        sizes (list): Document sizes in characters.
+        operations (int): Number of operations in the editing workloads.
+        repeat (int): Runs per workload; the fastest is kept.
+        seed (int): Random seed.
+        workloads (list): Names of the workloads to run, all of them by default.
+
+    Returns:
+        dict: Seconds per workload, keyed by engine, then size (as a string), then workload.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for engine in engines:
+            results[engine] = {}
+            for size in sizes:
+                suite = Workloads(engine, size, min(operations, size // 4), seed, directory)
+                results[engine][str(size)] = {
+                    name: time_it(getattr(suite, name), repeat) for name in workloads or Workloads.NAMES
+                }
+    return results
+
+
+def settings_mismatch(stored: dict, settings: dict) -> list:
+    """
+    Find the run settings that differ between a baseline and this run.
+
+    Args:
+        stored (dict): The saved baseline, with its settings beside its results.
+        settings (dict): The settings of this run, keyed like COMPARED_SETTINGS.
+
+    Returns:
+        list: (setting, baseline value, this run's value) for every setting that differs.
+            Settings missing from an older baseline are not checked.
+    """
+    return [(name, stored[name], settings[name])
+            for name in COMPARED_SETTINGS if name in stored and stored[name] != settings[name]]
+
+
+def compare(baseline: dict, results: dict, threshold: float) -> list:
+    """
+    Find the workloads that got slower than in a baseline.
+
+    Args:
+        baseline (dict): Results of an earlier run (as stored by --save).
+        results (dict): Results of this run.
+        threshold (float): Allowed slowdown as a fraction (0.2 = 20% slower).
+
+    Returns:
+        list: (engine, size, workload, baseline seconds, new seconds) for every regression.
+    """
+    regressions = []
+    for engine, sizes in results.items():
+        for size, workloads in sizes.items():
+            for workload, seconds in workloads.items():
+                before = baseline.get(engine, {}).get(size, {}).get(workload)
+                if before is None:
+                    continue
+                if seconds > before * (1 + threshold) and seconds - before >= MIN_REGRESSION_SECONDS:
+                    regressions.append((engine, size, workload, before, seconds))
+    return regressions
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    """Print a table per engine, with the change from the baseline when there is one."""
+    for engine, sizes in results.items():
+        print(f"\n{engine}")
+        workloads = next(iter(sizes.values())).keys()
+        print(f"{'workload (s)':<15}" + "".join(f"{int(size):>16,}" for size in sizes))
+        for workload in workloads:
+            row = f"{workload:<15}"
+            for size, timings in sizes.items():
+                cell = f"{timings[workload]:.4f}"
+                before = (baseline or {}).get(engine, {}).get(size, {}).get(workload)
+                if before:
+                    cell += f" {(timings[workload] / before - 1) * 100:+.0f}%"
+                row += f"{cell:>16}"
+            print(row)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Time the document engines on synthetic workloads and track regressions.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[parse_size(size) for size in DEFAULT_SIZES],
+                        help="document sizes, e.g. 1K 100K 10M 100M")
+    parser.add_argument("--workloads", nargs="+", choices=Workloads.NAMES, help="run only these workloads")
+    parser.add_argument("--operations", type=int, default=1000, help="operations per editing workload")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per workload (the fastest is kept)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="FILE", help="store the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="flag regressions against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    settings = {"operations": args.operations, "repeat": args.repeat, "seed": args.seed}
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            stored = json.load(f)
+        mismatched = settings_mismatch(stored, settings)
+        if mismatched:
+            for name, before, now in mismatched:
+                print(f"The baseline was run with --{name} {before}, this run with {now}", file=sys.stderr)
+            print("Not comparing: rerun with the baseline's settings", file=sys.stderr)
+            return 2
+        baseline = stored["results"]
+
+    results = run_suite(args.engines, args.sizes, args.operations, args.repeat, args.seed, args.workloads)
+    print_results(results, baseline)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                **settings,
+                "results": results,
+            }, f, indent=2)
+        print(f"\nBaseline saved to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(baseline, results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for engine, size, workload, before, seconds in regressions:
+                print(f"  {engine} {int(size):,} {workload}: {before:.4f}s -> {seconds:.4f}s")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
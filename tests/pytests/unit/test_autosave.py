@@ -0,0 +1,116 @@
+import os
+
+import pytest
+
+from app.editor_buffer import autosave
+from app.editor_buffer.autosave import SNAPSHOT, wal_path
+from app.editor_buffer.engines import ENGINES, create_buffer
+
+
+def open_document(engine, path):
+    """
+    Create a buffer with autosave enabled and load `path` into it.
+    """
+    buf = create_buffer(engine)
+    buf.configure_autosave()
+    buf.load_from_file(str(path))
+    return buf
+
+@pytest.fixture
+def document(tmp_path):
+    """
+    A saved file with two lines.
+    """
+    path = tmp_path / "notes.txt"
+    path.write_text("one\ntwo\n")
+    return path
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_unsaved_edits_survive_a_crash(document, engine):
+    """
+    Test that edits never saved are replayed on the next load, as one undo step.
+    """
+    buf = open_document(engine, document)
+    buf.move_cursor(4)
+    buf.insert("and a half\n")
+    buf.move_cursor(0)
+    buf.delete(4)
+    buf.undo()
+    buf.insert("zero\n")
+    expected = buf.get_text()
+    # Crash: the buffer is abandoned without saving or closing anything
+
+    recovered = open_document(engine, document)
+    assert recovered.get_text() == expected
+    recovered.undo()
+    assert recovered.get_text() == "one\ntwo\n"
+
+def test_saving_empties_the_log(document):
+    """
+    Test that a save commits the logged edits, so nothing is replayed afterwards.
+    """
+    buf = open_document("gap_buffer", document)
+    buf.move_cursor(0)
+    buf.insert("zero\n")
+    buf.save_to_file(str(document))
+    assert os.path.getsize(wal_path(str(document))) == len(autosave.MAGIC) + autosave._BASE.size
+
+    recovered = open_document("gap_buffer", document)
+    assert recovered.get_text() == "zero\none\ntwo\n"
+    assert not recovered.undo_stack
+
+def test_whole_document_changes_are_logged_as_snapshots(document):
+    """
+    Test that a replace_all is logged once flushed, or before the next edit.
+    """
+    buf = open_document("piece_table", document)
+    buf.replace_all("o", "0")
+    buf.flush_autosave()
+    assert open_document("piece_table", document).get_text() == "0ne\ntw0\n"
+
+    buf.undo()
+    buf.insert("!")
+    assert open_document("piece_table", document).get_text() == "!one\ntwo\n"
+
+def test_log_is_compacted(document, monkeypatch):
+    """
+    Test that the log is rewritten as a snapshot once it outgrows the document.
+    """
+    monkeypatch.setattr(autosave, "COMPACT_MIN_BYTES", 100)
+    buf = open_document("rope", document)
+    for _ in range(200):
+        buf.insert("x\n")
+
+    with open(wal_path(str(document)), "rb") as f:
+        data = f.read()
+    assert len(data) < 1000
+    assert SNAPSHOT in data
+    assert open_document("rope", document).get_text() == buf.get_text()
+
+def test_stale_or_torn_logs(document):
+    """
+    Test that a log for an older version of the file is ignored, and that a record
+    cut short by the crash is dropped.
+    """
+    buf = open_document("gap_buffer", document)
+    buf.move_cursor(0)
+    buf.insert("zero\n")
+    buf.insert("half\n")
+    with open(wal_path(str(document)), "r+b") as f:
+        f.truncate(os.path.getsize(wal_path(str(document))) - 2)
+    assert open_document("gap_buffer", document).get_text() == "zero\none\ntwo\n"
+
+    buf = open_document("gap_buffer", document)
+    buf.insert("more\n")
+    document.write_text("changed elsewhere\n")
+    assert open_document("gap_buffer", document).get_text() == "changed elsewhere\n"
+
+def test_disabling_autosave_deletes_the_log(document):
+    """
+    Test that turning autosave off gives up the log.
+    """
+    buf = open_document("gap_buffer", document)
+    buf.insert("zero\n")
+    buf.configure_autosave(False)
+    assert not os.path.exists(wal_path(str(document)))
+    assert buf._edit_listeners == []
@@ -0,0 +1,66 @@
+import argparse
+
+import pytest
+
+from benchmarks.bench_suite import MIN_REGRESSION_SECONDS, Workloads, compare, parse_size, settings_mismatch
+
+
+def results(**timings):
+    """
+    Results for the gap buffer at size 1024, with the given seconds per workload.
+    """
+    return {"gap_buffer": {"1024": timings}}
+
+def test_compare_threshold_and_minimum_slowdown():
+    """
+    Test that a workload only regresses when it is slower by more than the threshold
+    and by at least MIN_REGRESSION_SECONDS.
+    """
+    baseline = results(save=1.0, open=1.0, get_text=0.0001)
+    current = results(save=1.3, open=1.1, get_text=0.0001 + MIN_REGRESSION_SECONDS / 2)
+    assert compare(baseline, current, 0.2) == [("gap_buffer", "1024", "save", 1.0, 1.3)]
+    assert compare(baseline, current, 0.5) == []
+    assert len(compare(baseline, current, 0.05)) == 2
+
+def test_compare_skips_what_the_baseline_lacks():
+    """
+    Test that engines, sizes and workloads missing from the baseline are not compared.
+    """
+    current = {"gap_buffer": {"1024": {"save": 9.0, "open": 9.0}, "2048": {"save": 9.0}},
+               "rope": {"1024": {"save": 9.0}}}
+    assert compare(results(save=1.0), current, 0.2) == [("gap_buffer", "1024", "save", 1.0, 9.0)]
+    assert compare({}, current, 0.2) == []
+
+def test_settings_mismatch():
+    """
+    Test that differing run settings are reported, and that settings missing from an
+    older baseline are not checked.
+    """
+    settings = {"operations": 1000, "repeat": 3, "seed": 0}
+    assert settings_mismatch({"operations": 1000, "repeat": 3, "seed": 0, "results": {}}, settings) == []
+    assert settings_mismatch({"operations": 1000, "repeat": 1, "seed": 0}, settings) == [("repeat", 1, 3)]
+    assert settings_mismatch({"operations": 1000, "repeat": 3}, settings) == []
+    assert settings_mismatch({"operations": 50, "repeat": 3}, dict(settings, seed=7)) == [
+        ("operations", 50, 1000)]
+
+def test_parse_size():
+    """
+    Test sizes with and without a unit, and that anything else is rejected.
+    """
+    assert parse_size("1K") == 1024
+    assert parse_size("10M") == 10 * 1024 * 1024
+    assert parse_size("4096") == 4096
+    for size in ("", "K", "1.5M", "-1", "12G", "ten"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_size(size)
+
+def test_random_positions_do_not_depend_on_earlier_workloads(tmp_path):
+    """
+    Test that the random edits hit the same positions whatever ran before them.
+    """
+    suite = Workloads("gap_buffer", 1024, 50, 0, str(tmp_path))
+    positions = suite._positions()
+    suite.random_edits()
+    suite.random_edits()
+    assert suite._positions() == positions
+    assert Workloads("rope", 1024, 50, 0, str(tmp_path))._positions() == positions
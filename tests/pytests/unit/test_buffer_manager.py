@@ -0,0 +1,217 @@
+import os
+
+import pytest
+
+from app.editor_buffer import autosave
+from app.editor_buffer.autosave import wal_path
+from app.editor_buffer.buffer_manager import BufferManager
+from app.editor_buffer.engines import create_buffer
+
+
+@pytest.fixture
+def files(tmp_path):
+    """
+    Three small files to open.
+    """
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"file{index}.txt"
+        path.write_text(f"file {index}\n" * 50)
+        paths.append(str(path))
+    return paths
+
+def test_open_switch_and_list(files):
+    """
+    Test opening several documents, switching between them and listing them.
+    """
+    manager = BufferManager()
+    first = manager.open(files[0])
+    manager.open(files[1])
+    assert manager.open(files[0]) is first
+    assert manager.buffer is first
+
+    untitled = manager.new("rope")
+    untitled.insert("scratch")
+    listing = manager.list_documents()
+    assert [document["name"] for document in listing] == [
+        os.path.abspath(files[1]), os.path.abspath(files[0]), "untitled-1"]
+    assert [document["current"] for document in listing] == [False, False, True]
+    assert [document["dirty"] for document in listing] == [False, False, True]
+
+    assert manager.switch(files[1]).get_text() == "file 1\n" * 50
+    with pytest.raises(ValueError):
+        manager.switch("missing")
+    with pytest.raises(ValueError):
+        manager.new("no_such_engine")
+    assert len(manager.documents) == 3
+
+def test_least_recently_used_are_evicted(files):
+    """
+    Test that going over the memory limit unloads the least recently used documents,
+    writing unsaved changes to a swap file that they are reloaded from.
+    """
+    manager = BufferManager(memory_limit=0)
+    manager.open(files[0]).move_cursor(0)
+    manager.buffer.insert("edited ")
+    manager.open(files[1])
+    manager.open(files[2])
+    assert [document["loaded"] for document in manager.list_documents()] == [False, False, True]
+    assert manager.memory_usage() == manager.buffer.memory_usage()
+
+    document = manager.documents[os.path.abspath(files[0])]
+    assert document["dirty"] and os.path.exists(document["swap"])
+    # The file itself is untouched until the document is saved
+    assert open(files[0]).read() == "file 0\n" * 50
+
+    reloaded = manager.switch(files[0])
+    assert reloaded.get_text() == "edited " + "file 0\n" * 50
+    assert document["dirty"]
+    swap = document["swap"]
+    manager.save()
+    assert not document["dirty"] and not os.path.exists(swap)
+    assert open(files[0]).read() == "edited " + "file 0\n" * 50
+    manager.close_all()
+
+def test_close(files):
+    """
+    Test that closing the current document makes the most recently used one current.
+    """
+    manager = BufferManager()
+    manager.open(files[0])
+    manager.open(files[1])
+    manager.buffer.insert("lost")
+    manager.close()
+    assert manager.current == os.path.abspath(files[0])
+    assert open(files[1]).read() == "file 1\n" * 50
+
+    manager.close()
+    assert manager.current is None and manager.buffer is None
+    with pytest.raises(ValueError):
+        manager.save()
+
+def test_unnamed_document_needs_a_filename(tmp_path):
+    """
+    Test saving an unnamed document.
+    """
+    manager = BufferManager()
+    manager.new().insert("text")
+    with pytest.raises(ValueError):
+        manager.save()
+    manager.save(str(tmp_path / "named.txt"))
+    assert (tmp_path / "named.txt").read_text() == "text"
+    assert not manager.list_documents()[0]["dirty"]
+
+def test_failed_save_keeps_the_document_dirty(files, tmp_path):
+    """
+    Test that a save that cannot be written is reported, and leaves the document
+    dirty, under its own name and with its swap file.
+    """
+    manager = BufferManager(memory_limit=0)
+    manager.open(files[0]).insert("edited ")
+    manager.open(files[1])
+    manager.switch(files[0])
+    document = manager.documents[os.path.abspath(files[0])]
+    swap = document["swap"]
+
+    assert not manager.save(str(tmp_path / "missing" / "file.txt"))
+    assert document["dirty"] and document["filename"] == files[0]
+    assert os.path.exists(swap)
+    assert manager.save()
+    manager.close_all()
+
+def test_eviction_keeps_the_autosave_log(files):
+    """
+    Test that evicting a dirty document leaves its autosave log in place, and that
+    edits recovered from the log on loading mark the document dirty.
+    """
+    def factory(engine):
+        buffer = create_buffer(engine)
+        buffer.configure_autosave()
+        return buffer
+
+    manager = BufferManager(factory, memory_limit=0)
+    manager.open(files[0]).move_cursor(0)
+    manager.buffer.insert("edited ")
+    manager.open(files[1])
+    assert not manager.list_documents()[0]["loaded"]
+    assert os.path.getsize(wal_path(files[0])) > len(autosave.MAGIC) + autosave._BASE.size
+    assert not [name for name in os.listdir(manager._swap_dir.name) if not name.endswith(".swap")]
+
+    # A new session after a crash: the file was never saved
+    recovered = BufferManager(factory)
+    recovered.open(files[0])
+    assert recovered.buffer.get_text() == "edited " + "file 0\n" * 50
+    assert recovered.list_documents()[0]["dirty"]
+    recovered.open(files[1])
+    assert not recovered.list_documents()[1]["dirty"]
+
+def test_unreadable_file_is_not_opened(tmp_path):
+    """
+    Test that a file that cannot be decoded is not opened as an empty document,
+    which saving would then write over.
+    """
+    path = tmp_path / "latin.txt"
+    path.write_bytes("caf\xe9\n".encode("latin-1"))
+    manager = BufferManager()
+    for engine in ("gap_buffer", "piece_table"):
+        with pytest.raises(ValueError):
+            manager.open(str(path), engine)
+    assert not manager.documents and manager.current is None
+    assert path.read_bytes() == b"caf\xe9\n"
+
+def test_eviction_keeps_history_and_closing_gives_up_the_edits(files):
+    """
+    Test that an evicted document comes back with its undo history and its autosave
+    log still beside its own file, so closing it leaves nothing to recover.
+    """
+    def factory(engine):
+        buffer = create_buffer(engine)
+        buffer.configure_history(journal=True)
+        buffer.configure_autosave()
+        return buffer
+
+    manager = BufferManager(factory, memory_limit=0)
+    manager.open(files[0]).move_cursor(0)
+    manager.buffer.insert("X")
+    manager.open(files[1]).move_cursor(0)
+    manager.buffer.insert("Y")
+    buffer = manager.switch(files[0])
+    assert buffer.get_text() == "X" + "file 0\n" * 50
+    assert len(buffer.undo_stack) == 1
+    buffer.insert("Z")
+    assert not [name for name in os.listdir(manager._swap_dir.name) if not name.endswith(".swap")]
+    manager.close_all()
+
+    # Both the reloaded and the still evicted document give up their edits
+    reopened = BufferManager(factory)
+    for index in range(2):
+        assert reopened.open(files[index]).get_text() == "file %d\n" % index * 50
+        assert not reopened.list_documents()[index]["dirty"]
+    reopened.buffer.undo()
+    assert reopened.buffer.get_text() == "file 1\n" * 50
+    reopened.close_all()
+
+def test_reloaded_swap_survives_a_crash(files):
+    """
+    Test that edits made after a document is reloaded from its swap file are logged
+    beside its own file, and undo back through the eviction.
+    """
+    def factory(engine):
+        buffer = create_buffer(engine)
+        buffer.configure_autosave()
+        return buffer
+
+    manager = BufferManager(factory, memory_limit=0)
+    manager.open(files[0]).move_cursor(0)
+    manager.buffer.insert("X")
+    manager.open(files[1])
+    manager.switch(files[0]).move_cursor(1)
+    manager.buffer.insert("Z")
+    # Crash: nothing is saved or closed
+
+    recovered = BufferManager(factory).open(files[0])
+    assert recovered.get_text() == "XZ" + "file 0\n" * 50
+    buffer = manager.buffer
+    buffer.undo()
+    buffer.undo()
+    assert buffer.get_text() == "file 0\n" * 50
@@ -0,0 +1,223 @@
+import re
+import threading
+
+import pytest
+
+from app.editor_buffer.concurrency import READ_OPERATIONS, WRITE_OPERATIONS, ReadWriteLock
+from app.editor_buffer.engines import ENGINES, create_buffer
+from app.editor_buffer.gap_buffer import GapBuffer
+
+
+TEXT = "one two\nthree four\n"
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    A buffer of every engine holding TEXT.
+    """
+    buf = create_buffer(request.param)
+    buf.insert(TEXT)
+    return buf
+
+def test_snapshot_is_isolated_from_later_edits(buffer):
+    """
+    Test that a snapshot keeps reading the text it was taken at.
+    """
+    snapshot = buffer.snapshot()
+    assert buffer.snapshot() is snapshot
+    version = buffer.version
+
+    buffer.move_cursor(4)
+    buffer.delete(3)
+    buffer.insert("2")
+    buffer.replace_all("o", "0")
+    assert buffer.version > version
+    assert buffer.snapshot() is not snapshot
+
+    assert snapshot.version == version
+    assert snapshot.get_text() == TEXT
+    assert len(snapshot) == len(TEXT)
+    assert snapshot.get_range(8, 13) == "three"
+    assert snapshot.find("four") == 14
+    assert list(snapshot.find_all("o")) == [0, 6, 15]
+    assert list(snapshot.find_regex(r"t\w+")) == [(4, 7), (8, 13)]
+    with pytest.raises(ValueError):
+        snapshot.get_range(0, len(TEXT) + 1)
+
+def test_snapshot_save_to_file(buffer, tmp_path):
+    """
+    Test writing a snapshot to a file without marking the buffer as saved.
+    """
+    snapshot = buffer.snapshot()
+    buffer.insert("unsaved")
+    path = tmp_path / "backup.txt"
+    snapshot.save_to_file(str(path))
+    assert path.read_text() == TEXT
+
+@pytest.mark.parametrize("storage", ["list", "array"])
+def test_gap_buffer_copies_only_when_visible_text_changes(storage):
+    """
+    Test that typing after a snapshot shares the gap buffer's storage, and that the
+    first edit touching text the snapshot can see copies it once.
+    """
+    gb = GapBuffer(storage=storage)
+    gb.insert(TEXT)
+    gb.configure_stats()
+    snapshot = gb.snapshot()
+    storage_before = gb.buffer
+    gb.insert("typing")
+    assert gb.buffer is storage_before
+    older = gb.snapshot()
+
+    gb.move_cursor(0)
+    gb.delete(3)
+    assert gb.get_stats()["counters"]["snapshot_copies"] == 1
+    assert snapshot.get_text() == TEXT
+    assert older.get_text() == TEXT + "typing"
+
+    # Once no snapshot is left, nothing needs copying
+    del snapshot, older
+    gb.snapshot()
+    gb.move_cursor(5)
+    assert gb.get_stats()["counters"]["snapshot_copies"] == 1
+
+def test_read_write_lock():
+    """
+    Test that readers share the lock, a writer excludes them, and both are reentrant.
+    """
+    lock = ReadWriteLock()
+    reading = threading.Event()
+    release = threading.Event()
+
+    def reader():
+        with lock.read():
+            reading.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    reading.wait(5)
+    # A second reader gets in alongside the first, a writer has to wait
+    with lock.read():
+        with lock.read():
+            pass
+    written = []
+
+    def write():
+        with lock.write():
+            written.append(True)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join(0.1)
+    assert not written
+    release.set()
+    writer.join(5)
+    thread.join(5)
+    assert written
+
+def test_lock_is_reentrant_and_cannot_be_upgraded():
+    """
+    Test nesting on one thread: the writer may read, a reader may not write.
+    """
+    lock = ReadWriteLock()
+    with lock.write():
+        with lock.write():
+            with lock.read():
+                pass
+    with lock.read():
+        with pytest.raises(RuntimeError):
+            lock.acquire_write()
+    with lock.write():
+        pass
+
+def test_locking_wrappers(buffer, tmp_path):
+    """
+    Test that locking wraps the operations only while on, alongside stats, and
+    survives loading a file.
+    """
+    buffer.configure_stats()
+    buffer.configure_locking()
+    assert buffer.lock is not None
+    assert set(READ_OPERATIONS + WRITE_OPERATIONS) <= set(vars(buffer))
+
+    buffer.configure_stats(False)
+    assert "insert" in vars(buffer)
+    buffer.insert("x")
+
+    path = tmp_path / "doc.txt"
+    path.write_text("loaded")
+    buffer.load_from_file(str(path))
+    assert buffer.lock is not None
+    assert buffer.get_text() == "loaded"
+
+    buffer.configure_locking(False)
+    assert buffer.lock is None
+    assert not set(READ_OPERATIONS + WRITE_OPERATIONS) & set(vars(buffer))
+
+def test_readers_see_consistent_text_while_editing(buffer):
+    """
+    Test background readers against an editing thread: every text they read must be a
+    state the document was actually in (always whole "ab" pairs).
+    """
+    buffer.configure_locking()
+    buffer.replace_range(0, len(TEXT), "ab" * 200)
+    whole_pairs = re.compile(r"(ab)*\Z")
+    stop = threading.Event()
+    bad = []
+
+    def reader():
+        while not stop.is_set():
+            for text in (buffer.get_text(), buffer.snapshot().get_text()):
+                if not whole_pairs.match(text):
+                    bad.append(text)
+
+    threads = [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for step in range(300):
+        buffer.move_cursor(2 * (step * 7 % (buffer.get_cursor_limit() // 2)))
+        if step % 3:
+            buffer.insert("ab")
+        else:
+            buffer.delete(2)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+    assert not bad
+
+def test_snapshots_are_taken_under_the_read_lock(buffer):
+    """
+    Test that snapshot() is a read operation, and that snapshots taken by several
+    threads at once stay intact while the document is edited.
+    """
+    buffer.configure_locking()
+    buffer.replace_range(0, len(TEXT), "ab" * 200)
+    with buffer.lock.read():
+        assert buffer.snapshot() is buffer.snapshot()
+
+    stop = threading.Event()
+    bad = []
+
+    def reader():
+        while not stop.is_set():
+            snapshots = [buffer.snapshot() for _ in range(5)]
+            texts = [snapshot.get_text() for snapshot in snapshots]
+            for snapshot, text in zip(snapshots, texts):
+                if len(text) % 2 or snapshot.get_text() != text:
+                    bad.append(text)
+
+    threads = [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for step in range(300):
+        buffer.move_cursor(2 * (step * 7 % (buffer.get_cursor_limit() // 2)))
+        if step % 3:
+            buffer.insert("ab")
+        else:
+            buffer.delete(2)
+    stop.set()
+    for thread in threads:
+        thread.join(5)
+    assert not bad
@@ -89,3 +89,40 @@ def test_move_cursor():
 
 
 
+def test_large_insert_and_block_moves():
+    """
+    Test that an insert larger than the gap and long cursor jumps keep text and gap intact.
+    """
+    gb = GapBuffer(4)
+    gb.insert("0123456789" * 10)
+    assert gb.get_text() == "0123456789" * 10, "Large insert failed"
+
+    gb.move_cursor(5)
+    gb.insert("X")
+    gb.move_cursor(95)
+    gb.delete(3)
+    expected = "01234X56789" + "0123456789" * 8 + "0123" + "789"
+    assert gb.get_text() == expected, "Block gap movement corrupted the text"
+    assert all(c == '' for c in gb.buffer[gb.gap_start:gb.gap_end]), "Gap was not cleared"
+
+def test_array_storage_matches_list_storage():
+    """
+    Test that the compact array storage mode behaves the same as the default list mode.
+    """
+    for storage in ("list", "array"):
+        gb = GapBuffer(4, storage=storage)
+        gb.insert("héllo wörld")
+        gb.move_cursor(5)
+        gb.delete(1)
+        gb.insert("_")
+        assert gb.get_text() == "héllo_wörld", f"{storage} storage produced wrong text"
+        gb.undo()
+        gb.undo()
+        assert gb.get_text() == "héllo wörld", f"{storage} storage undo failed"
+
+def test_unknown_storage_raises():
+    """
+    Test that an unsupported storage mode is rejected.
+    """
+    with pytest.raises(ValueError):
+        GapBuffer(10, storage="bytes")
@@ -0,0 +1,92 @@
+import pytest
+
+from app.editor_buffer.gap_buffer import GapBuffer
+
+
+def test_large_insert_grows_once_with_bounded_slack():
+    """
+    Test that a paste larger than the gap grows the buffer once, by the policy's slack.
+    """
+    gb = GapBuffer(10)
+    gb.configure_growth(growth=1.5, min_gap=8, max_slack=100)
+    gb.configure_stats()
+    gb.insert("a" * 50)
+    assert len(gb.buffer) == 50 + 25
+    gb.insert("b" * 1000)
+    assert len(gb.buffer) == 1050 + 100
+    assert gb.get_stats()["counters"]["resizes"] == 2
+
+    # Typing into the slack does not grow the buffer again
+    for _ in range(100):
+        gb.insert("c")
+    assert len(gb.buffer) == 1150
+
+def test_shrink_after_large_delete_with_hysteresis():
+    """
+    Test that the buffer gives memory back only once the gap is well past the policy's.
+    """
+    gb = GapBuffer(10)
+    gb.configure_growth(growth=2, min_gap=16, shrink=4)
+    gb.insert("x" * 1000)
+    assert len(gb.buffer) == 2000
+
+    # A gap of 1500 for 500 characters is within 4 times the 500 slack: kept
+    gb.move_cursor(0)
+    gb.delete(500)
+    assert len(gb.buffer) == 2000
+
+    # A gap of 1900 for 100 characters is not: shrunk to 100 plus 100 slack
+    gb.delete(400)
+    assert len(gb.buffer) == 200
+    assert gb.get_text() == "x" * 100
+
+    gb.undo()
+    gb.undo()
+    assert gb.get_text() == "x" * 1000
+
+def test_undoing_a_large_paste_frees_it():
+    """
+    Test that undoing a large paste shrinks the buffer back.
+    """
+    gb = GapBuffer()
+    gb.insert("small")
+    gb.insert("p" * 100000)
+    assert len(gb.buffer) > 100000
+    gb.undo()
+    assert gb.get_text() == "small"
+    assert len(gb.buffer) == 5 + gb.growth_config["min_gap"]
+
+def test_shrinking_can_be_turned_off():
+    """
+    Test that with no shrink factor the buffer keeps its size.
+    """
+    gb = GapBuffer()
+    gb.configure_growth(shrink=None)
+    gb.insert("p" * 10000)
+    size = len(gb.buffer)
+    gb.delete_range(0, 10000)
+    assert len(gb.buffer) == size
+
+def test_policy_survives_loading(tmp_path):
+    """
+    Test that loading a file keeps the growth policy and sizes the buffer by it.
+    """
+    path = tmp_path / "doc.txt"
+    path.write_text("y" * 300)
+    gb = GapBuffer()
+    gb.configure_growth(growth=1.1, min_gap=50)
+    gb.load_from_file(str(path))
+    assert gb.growth_config["growth"] == 1.1
+    assert len(gb.buffer) == 350
+
+def test_invalid_policy():
+    """
+    Test that out-of-range settings are rejected.
+    """
+    gb = GapBuffer()
+    with pytest.raises(ValueError):
+        gb.configure_growth(growth=0.5)
+    with pytest.raises(ValueError):
+        gb.configure_growth(min_gap=10, max_slack=5)
+    with pytest.raises(ValueError):
+        gb.configure_growth(shrink=1)
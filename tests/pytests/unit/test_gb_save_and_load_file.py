@@ -1,5 +1,9 @@
+import os
+import stat
+
 import pytest
 
+from app.editor_buffer.gap_buffer import GapBuffer
 from app.utils.file_manager import FileManager
 
 def test_save_and_load_file(tmp_path):
@@ -37,3 +41,80 @@ def test_save_to_file_overwrites_existing(tmp_path):
 
     loaded_text = FileManager.load_from_file(str(test_file))
     assert loaded_text == "Second content"
+
+def test_recommended_engine_by_size(tmp_path, monkeypatch):
+    """
+    Test that small files open in a gap buffer and large ones in a piece table.
+    """
+    test_file = tmp_path / "sized.txt"
+    FileManager.save_to_file("x" * 10, str(test_file))
+    assert FileManager.recommended_engine(str(test_file)) == "gap_buffer"
+
+    monkeypatch.setattr(FileManager, "PIECE_TABLE_THRESHOLD", 10)
+    assert FileManager.recommended_engine(str(test_file)) == "piece_table"
+
+def test_save_chunks_streams_and_leaves_no_temp_file(tmp_path):
+    """
+    Test that chunks are written in order and the temporary file is renamed away.
+    """
+    test_file = tmp_path / "chunks.txt"
+    FileManager.save_chunks(iter(["abc", "déf", "\nghi"]), str(test_file))
+
+    assert FileManager.load_from_file(str(test_file)) == "abcdéf\nghi"
+    assert [p.name for p in tmp_path.iterdir()] == ["chunks.txt"]
+
+def test_failed_save_keeps_original_file(tmp_path):
+    """
+    Test that an error part-way through a save leaves the existing file untouched.
+    """
+    test_file = tmp_path / "keep.txt"
+    FileManager.save_to_file("Original content", str(test_file))
+
+    def failing_chunks():
+        yield "Partial"
+        raise RuntimeError("crash mid-save")
+
+    with pytest.raises(RuntimeError):
+        FileManager.save_chunks(failing_chunks(), str(test_file))
+
+    assert FileManager.load_from_file(str(test_file)) == "Original content"
+    assert [p.name for p in tmp_path.iterdir()] == ["keep.txt"]
+
+def test_save_chunks_permissions_and_symlinks(tmp_path, monkeypatch):
+    """
+    Test that a new file gets the umask's permissions (without the umask being
+    changed, which would race with other threads), an existing one keeps its own,
+    and saving through a symlink replaces the file it points at.
+    """
+    mask = os.umask(0o022)
+    try:
+        new_file = tmp_path / "new.txt"
+        with monkeypatch.context() as patch:
+            patch.setattr(os, "umask", lambda mask: pytest.fail("the umask was changed"))
+            FileManager.save_chunks(["new"], str(new_file))
+        assert stat.S_IMODE(new_file.stat().st_mode) == 0o644
+
+        new_file.chmod(0o600)
+        FileManager.save_chunks(["again"], str(new_file))
+        assert stat.S_IMODE(new_file.stat().st_mode) == 0o600
+    finally:
+        os.umask(mask)
+
+    link = tmp_path / "link.txt"
+    link.symlink_to(new_file)
+    FileManager.save_chunks(["through link"], str(link))
+    assert link.is_symlink()
+    assert new_file.read_text() == "through link"
+
+def test_buffer_save_streams_chunks(tmp_path):
+    """
+    Test that a gap buffer with text on both sides of the gap saves in small chunks.
+    """
+    gb = GapBuffer(10)
+    gb.insert("Hello world")
+    gb.move_cursor(5)
+    assert list(gb.iter_chunks(4)) == ["Hell", "o", " wor", "ld"]
+
+    test_file = tmp_path / "buffer.txt"
+    gb.save_to_file(str(test_file))
+    assert FileManager.load_from_file(str(test_file)) == "Hello world"
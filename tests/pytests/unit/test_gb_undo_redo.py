@@ -169,3 +169,131 @@ def test_redo_stack_cleared_after_new_edit(buffer):
     buffer.insert("xyz") # new edit after undo should clear redo stack
     buffer.record_state()
     assert len(buffer.redo_stack) == 0
+
+
+######################## DELTA HISTORY TESTS ################################
+
+def test_edits_record_deltas_not_snapshots(buffer):
+    """
+    Test that edits store only the affected text rather than a copy of the buffer.
+    """
+    buffer.insert("def")
+    entry = buffer.undo_stack[-1]
+    assert entry["type"] == "insert"
+    assert entry["text"] == "def"
+    assert "buffer" not in entry
+
+
+def test_undo_redo_delete_and_cursor(buffer):
+    """
+    Test that deletes are undone and redone from their deltas, restoring the cursor
+    they were made at, while cursor moves on their own are not undo steps.
+    """
+    buffer.insert("def")        # "abcdef"
+    buffer.move_cursor(1)
+    buffer.delete(3)            # "aef"
+    assert buffer.get_text() == "aef"
+
+    buffer.undo()               # delete reverted, cursor back at 1
+    assert buffer.get_text() == "abcdef"
+    assert buffer.gap_start == 1
+
+    buffer.undo()               # the cursor move is skipped: "def" is removed
+    assert buffer.get_text() == "abc"
+    assert buffer.gap_start == 3
+
+    buffer.redo()
+    buffer.redo()
+    assert buffer.get_text() == "aef"
+    assert buffer.gap_start == 1
+
+
+def test_undo_delete_selection_restores_selection(buffer):
+    """
+    Test that undoing delete_selection restores both the text and the selection.
+    """
+    buffer.select(1, 3)
+    buffer.delete_selection()
+    assert buffer.get_text() == "a"
+
+    buffer.undo()
+    assert buffer.get_text() == "abc"
+    assert (buffer.selection_start, buffer.selection_end) == (1, 3)
+
+
+######################## GROUPING AND COALESCING TESTS ################################
+
+def test_cursor_and_selection_changes_are_not_recorded(buffer):
+    """
+    Test that moving the cursor and selecting text add nothing to the history.
+    """
+    history = len(buffer.undo_stack)
+    buffer.move_cursor(1)
+    buffer.select(0, 2)
+    buffer.move_cursor(3)
+    assert len(buffer.undo_stack) == history
+
+
+def test_typing_is_coalesced_until_newline(buffer):
+    """
+    Test that consecutive keystrokes form one undo step, ended by a typed newline
+    or a cursor move.
+    """
+    for char in "de\nfg":
+        buffer.insert(char)
+    assert buffer.get_text() == "abcde\nfg"
+    assert len(buffer.undo_stack) == 3  # "abc", "de\n", "fg"
+
+    buffer.undo()
+    assert buffer.get_text() == "abcde\n"
+    buffer.undo()
+    assert buffer.get_text() == "abc"
+    buffer.redo()
+    assert buffer.get_text() == "abcde\n"
+
+    buffer.move_cursor(0)
+    buffer.insert("x")
+    buffer.move_cursor(2)
+    buffer.insert("y")          # Not adjacent to the previous keystroke's run
+    buffer.undo()
+    assert buffer.get_text() == "xabcde\n"
+
+
+def test_forward_deletes_are_coalesced(buffer):
+    """
+    Test that repeated single-character deletes at the cursor form one undo step.
+    """
+    buffer.move_cursor(0)
+    buffer.delete()
+    buffer.delete()
+    assert buffer.get_text() == "c"
+    assert len(buffer.undo_stack) == 2
+
+    buffer.undo()
+    assert buffer.get_text() == "abc"
+    assert buffer.gap_start == 0
+
+
+def test_group_is_one_undo_step(buffer):
+    """
+    Test that edits inside (nested) groups are undone and redone together.
+    """
+    with buffer.group():
+        buffer.insert("d")
+        buffer.move_cursor(0)
+        with buffer.group():
+            buffer.delete(2)
+            buffer.insert("XY")
+    assert buffer.get_text() == "XYcd"
+    assert buffer.undo_stack[-1]["type"] == "group"
+
+    buffer.undo()
+    assert buffer.get_text() == "abc"
+    assert buffer.gap_start == 3
+    buffer.redo()
+    assert buffer.get_text() == "XYcd"
+    buffer.undo()
+    assert buffer.get_text() == "abc"
+
+    with pytest.raises(ValueError):
+        buffer.end_group()
@@ -0,0 +1,106 @@
+import pytest
+
+from app.editor_buffer.engines import ENGINES, create_buffer
+from app.editor_buffer.history import entry_size
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    An empty buffer of every engine.
+    """
+    return create_buffer(request.param)
+
+def type_lines(buffer, count, width=0):
+    """
+    Insert `count` numbered lines, padded by `width` dots, one undo step each.
+    """
+    for number in range(count):
+        buffer.insert("line %03d%s\n" % (number, "." * width))
+
+def test_max_entries_evicts_oldest(buffer):
+    """
+    Test that the oldest undo steps are dropped once there are too many.
+    """
+    buffer.configure_history(max_entries=3)
+    type_lines(buffer, 5)
+    assert len(buffer.undo_stack) == 3
+
+    for _ in range(5):
+        buffer.undo()
+    assert buffer.get_text() == "line 000\nline 001\n"
+
+@pytest.mark.parametrize("overflow", ["compress", "spill"])
+def test_byte_budget_compresses_or_spills(buffer, overflow):
+    """
+    Test that old entries over the byte budget are compressed or spilled rather
+    than dropped, and still undo correctly.
+    """
+    type_lines(buffer, 20, width=500)
+    full_size = buffer.history_usage()["undo_bytes"]
+    buffer.configure_history(max_bytes=full_size // 2, overflow=overflow)
+
+    usage = buffer.history_usage()
+    assert usage["undo_bytes"] <= full_size // 2
+    assert usage["cold_entries"] > 0
+    assert (usage["spilled_bytes"] > 0) == (overflow == "spill")
+    assert buffer.undo_stack[0]["type"] == ("compressed" if overflow == "compress" else "spilled")
+
+    while buffer.undo_stack:
+        buffer.undo()
+    assert buffer.get_text() == ""
+    for _ in range(20):
+        buffer.redo()
+    assert buffer.get_text().count("\n") == 20
+
+def test_spill_file_is_compacted(buffer):
+    """
+    Test that the spill file gives back the space of entries dropped or undone.
+    """
+    buffer.configure_history(max_entries=30, overflow="spill")
+    type_lines(buffer, 20, width=500)
+    buffer.configure_history(max_entries=30, max_bytes=buffer.history_usage()["undo_bytes"] // 4,
+                             overflow="spill")
+    spilled = buffer.history_usage()["spilled_bytes"]
+    assert spilled > 0
+
+    # Dropping most of the spilled entries shrinks the file to what is left
+    buffer.configure_history(max_entries=3, max_bytes=1000000, overflow="spill")
+    assert 0 < buffer.history_usage()["spilled_bytes"] < spilled // 2
+    while buffer.undo_stack:
+        buffer.undo()
+    assert buffer.history_usage()["spilled_bytes"] == 0
+    assert buffer.get_text().count("\n") == 17
+
+def test_byte_budget_keeps_newest_step(buffer):
+    """
+    Test that evicting for the byte budget always keeps the most recent step.
+    """
+    buffer.configure_history(max_bytes=1)
+    type_lines(buffer, 3)
+    buffer.insert("x" * 1000)
+    assert len(buffer.undo_stack) == 1
+    assert buffer.history_usage()["undo_bytes"] == entry_size(buffer.undo_stack[0])
+
+    buffer.undo()
+    assert buffer.get_text().endswith("line 002\n")
+
+def test_history_usage_tracks_both_stacks(buffer):
+    """
+    Test the usage report as entries move between the undo and redo stacks.
+    """
+    type_lines(buffer, 4)
+    buffer.undo()
+    usage = buffer.history_usage()
+    assert (usage["undo_entries"], usage["redo_entries"]) == (3, 1)
+    assert usage["undo_bytes"] == sum(entry_size(entry) for entry in buffer.undo_stack)
+    assert usage["redo_bytes"] > 0
+
+def test_invalid_history_config(buffer):
+    """
+    Test that unknown overflow modes and negative limits are rejected.
+    """
+    with pytest.raises(ValueError):
+        buffer.configure_history(overflow="discard")
+    with pytest.raises(ValueError):
+        buffer.configure_history(max_entries=-1)
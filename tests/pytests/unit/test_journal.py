@@ -0,0 +1,188 @@
+import pickle
+import struct
+from array import array
+
+import pytest
+
+from app.editor_buffer import text_buffer
+from app.editor_buffer.engines import ENGINES, create_buffer
+from app.editor_buffer.journal import (CHECKPOINT, HEADER, MAGIC, PUSH, SAVE, decode_entry, encode_entry,
+                                       UndoJournal, file_fingerprint, journal_path)
+
+
+def open_document(engine, path):
+    """
+    Create a buffer with the undo journal enabled and load `path` into it.
+    """
+    buf = create_buffer(engine)
+    buf.configure_history(journal=True)
+    buf.load_from_file(str(path))
+    return buf
+
+@pytest.fixture
+def saved_document(tmp_path):
+    """
+    A file saved after three undo steps, with one more step undone (so it can be redone).
+    """
+    path = tmp_path / "notes.txt"
+    buf = create_buffer()
+    buf.configure_history(journal=True)
+    for text in ("one\n", "two\n", "three\n", "four\n"):
+        buf.insert(text)
+    buf.undo()
+    buf.save_to_file(str(path))
+    buf._close_journal()
+    return path
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_history_survives_reopening(saved_document, engine):
+    """
+    Test that undo and redo continue across sessions, in any engine.
+    """
+    buf = open_document(engine, saved_document)
+    assert buf.get_text() == "one\ntwo\nthree\n"
+
+    buf.undo()
+    assert buf.get_text() == "one\ntwo\n"
+    buf.redo()
+    buf.redo()
+    assert buf.get_text() == "one\ntwo\nthree\nfour\n"
+
+def test_journal_is_replayed_lazily(saved_document):
+    """
+    Test that nothing is replayed on load, and edits made before the first undo
+    end up on top of the restored history.
+    """
+    buf = open_document("gap_buffer", saved_document)
+    assert buf._journal_pending is not None
+
+    buf.move_cursor(0)
+    buf.insert("zero\n")
+    assert buf._journal_pending is not None
+
+    assert len(buf.undo_stack) == 4
+    assert buf.redo_stack == []
+    buf.undo()
+    buf.undo()
+    assert buf.get_text() == "one\ntwo\n"
+
+def test_unsaved_edits_and_stale_journals_are_not_replayed(saved_document):
+    """
+    Test that edits made after the last save are dropped from the journal, and that
+    a journal is ignored once the file has been changed by something else.
+    """
+    buf = open_document("gap_buffer", saved_document)
+    buf.insert("unsaved\n")
+    buf._close_journal()
+
+    buf = open_document("gap_buffer", saved_document)
+    assert len(buf.undo_stack) == 3
+    buf._close_journal()
+
+    saved_document.write_text("changed elsewhere\n")
+    buf = open_document("gap_buffer", saved_document)
+    assert not buf.undo_stack
+    buf.undo()
+    assert buf.get_text() == "changed elsewhere\n"
+
+def test_checkpoints_bound_the_replay(tmp_path, monkeypatch):
+    """
+    Test that only the records after the last checkpoint are replayed.
+    """
+    monkeypatch.setattr(text_buffer, "CHECKPOINT_INTERVAL", 10)
+    path = tmp_path / "long.txt"
+    buf = create_buffer()
+    buf.configure_history(journal=True)
+    buf.save_to_file(str(path))  # Starts the journal
+    for number in range(25):
+        buf.insert("line %d\n" % number)
+    buf.save_to_file(str(path))
+    buf._close_journal()
+
+    buf = open_document("gap_buffer", path)
+    start, _ = buf._journal_pending
+    assert start > len(MAGIC)
+    assert len(buf.undo_stack) == 25
+
+    assert journal_path(str(path)) == str(tmp_path / ".long.txt.undo")
+
+def test_encode_entry_round_trip():
+    """
+    Test the compact encoding of edits and the JSON encoding of other entries.
+    """
+    edit = {"type": "delete", "position": 3, "text": "héllo", "cursor": 8, "selection": (3, None)}
+    batch = {"type": "batch", "edits": [(0, "a", "b")], "cursor": 0, "selection": (None, None)}
+    replace = {"type": "replace", "positions": array("q", [1, 5]), "pattern": "a", "replacement": "bc",
+               "cursor": 2, "selection": (None, None)}
+    group = {"type": "group", "entries": [edit, batch]}
+    for entry in (edit, batch, replace, group):
+        assert decode_entry(encode_entry(entry)) == entry
+    assert len(encode_entry(edit)) < 50
+
+def test_malformed_entries_are_rejected():
+    """
+    Test that entries which are not well-formed plain data raise ValueError.
+    """
+    for data in (b"p" + pickle.dumps({"type": "insert"}), b"j[]", b'j{"type": "insert"}',
+                 b'j{"type": "batch", "edits": [[0, "a"]], "cursor": 0, "selection": [null, null]}',
+                 b"i\x00\x01"):
+        with pytest.raises(ValueError):
+            decode_entry(data)
+
+def test_malformed_journal_is_dropped(saved_document):
+    """
+    Test that a journal with a damaged record is replaced instead of restored.
+    """
+    path = journal_path(str(saved_document))
+    with open(path, "ab") as f:
+        f.write(HEADER.pack(PUSH, 3) + b"j{]")
+        f.write(HEADER.pack(SAVE, 16) + struct.pack("<qq", *file_fingerprint(str(saved_document))))
+
+    buf = open_document("gap_buffer", saved_document)
+    buf.insert("new\n")
+    assert len(buf.undo_stack) == 1
+    buf.undo()
+    buf.undo()
+    assert buf.get_text() == "one\ntwo\nthree\n"
+    with open(path, "rb") as f:
+        assert b"j{]" not in f.read()
+
+def test_checkpoints_rewrite_the_journal(tmp_path, monkeypatch):
+    """
+    Test that a checkpoint replaces the journal instead of appending to it, keeping
+    only what reopening the last save needs.
+    """
+    monkeypatch.setattr(text_buffer, "CHECKPOINT_INTERVAL", 10)
+    path = tmp_path / "growing.txt"
+    buf = create_buffer()
+    buf.configure_history(journal=True)
+    buf.save_to_file(str(path))
+    for number in range(200):
+        buf.insert("line %d\n" % number)
+    buf.save_to_file(str(path))
+    buf._close_journal()
+
+    # The first save's segment, then the latest checkpoint and the records since
+    journal = UndoJournal(journal_path(str(path)))
+    journal.file = open(journal.path, "rb")
+    kinds = [kind for kind, _, _ in journal._scan()]
+    journal.close()
+    assert kinds.count(CHECKPOINT) == 2
+    assert kinds[-1] == SAVE
+
+    buf = open_document("rope", path)
+    assert len(buf.undo_stack) == 200
+
+def test_changing_limits_keeps_the_journal(tmp_path):
+    """
+    Test that configure_history only turns the journal off when asked to.
+    """
+    path = tmp_path / "limits.txt"
+    path.write_text("text")
+    buf = open_document("gap_buffer", path)
+    buf.configure_history(max_entries=100)
+    assert buf.history_config["journal"]
+    assert buf._journal is not None
+
+    buf.configure_history(journal=False)
+    assert buf._journal is None
@@ -0,0 +1,89 @@
+import pytest
+
+from app.editor_buffer.engines import ENGINES, create_buffer
+from app.editor_buffer.line_index import LineIndex
+
+
+TEXT = "first\nsecond line\n\nlast"
+
+
+def test_line_index_tracks_edits_at_point():
+    """
+    Test that the index follows inserts, deletes and point moves without a rescan.
+    """
+    index = LineIndex([TEXT[:8], TEXT[8:]], len(TEXT), point=6)
+    assert index.line_count == 4
+    assert [index.line_start(n) for n in range(4)] == [0, 6, 18, 19]
+
+    index.insert("new\n")       # "first\nnew\nsecond line\n\nlast"
+    assert index.line_count == 5
+    assert index.line_start(2) == 10
+    assert index.line_of(12) == 2
+
+    index.move(0)
+    index.delete(6)             # "new\nsecond line\n\nlast"
+    assert index.line_count == 4
+    assert [index.line_start(n) for n in range(4)] == [0, 4, 16, 17]
+
+def test_line_index_moves_lazily():
+    """
+    Test that moving the point leaves the index as it is until the next edit.
+    """
+    index = LineIndex([TEXT], len(TEXT), point=0)
+    index.move(len(TEXT))
+    index.move(3)
+    assert index.split == 0
+    assert index.line_of(20) == 3
+
+    index.move(19)
+    index.delete(1)             # "first\nsecond line\n\nast"
+    assert index.split == 19
+    assert [index.line_start(n) for n in range(4)] == [0, 6, 18, 19]
+    index.move(7)
+    index.insert("\n")           # "first\ns\necond line\n\nast"
+    assert [index.line_start(n) for n in range(5)] == [0, 6, 8, 19, 20]
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    A buffer of every engine holding TEXT.
+    """
+    buf = create_buffer(request.param)
+    buf.insert(TEXT)
+    return buf
+
+def test_offset_line_col_round_trip(buffer):
+    """
+    Test converting between offsets and (line, column) for every offset.
+    """
+    for offset in range(len(TEXT) + 1):
+        line, column = buffer.offset_to_line_col(offset)
+        assert line == TEXT[:offset].count("\n")
+        assert buffer.line_col_to_offset(line, column) == offset
+
+def test_get_line_and_count_follow_edits(buffer):
+    """
+    Test get_line and line_count before and after edits and undo.
+    """
+    assert buffer.line_count == 4
+    assert [buffer.get_line(n) for n in range(4)] == TEXT.split("\n")
+
+    buffer.move_cursor(6)
+    buffer.delete(7)            # removes "second "
+    buffer.insert("a\nb ")
+    assert [buffer.get_line(n) for n in range(buffer.line_count)] == ["first", "a", "b line", "", "last"]
+
+    buffer.undo()
+    buffer.undo()
+    assert [buffer.get_line(n) for n in range(buffer.line_count)] == TEXT.split("\n")
+
+def test_line_bounds_raise(buffer):
+    """
+    Test that out-of-range lines, columns and offsets raise ValueError.
+    """
+    with pytest.raises(ValueError):
+        buffer.get_line(4)
+    with pytest.raises(ValueError):
+        buffer.line_col_to_offset(0, 6)
+    with pytest.raises(ValueError):
+        buffer.offset_to_line_col(len(TEXT) + 1)
@@ -0,0 +1,79 @@
+import main
+
+
+def write_script(tmp_path, *commands):
+    """
+    Write a script of commands and return its path.
+    """
+    path = tmp_path / "script.txt"
+    path.write_text("\n".join(commands) + "\n")
+    return str(path)
+
+def test_run_script(tmp_path, capsys):
+    """
+    Test that a script runs every command except blanks and comments, without
+    leaving a journal or autosave log beside the file it saves.
+    """
+    saved = tmp_path / "out.txt"
+    session = main.Session(interactive=False)
+    count, elapsed = main.run_script(session, [
+        "# a comment", "insert hello world", "", "move 5", "delete 6", "undo",
+        "replace world there", "save %s" % saved, "cursors",
+    ])
+    assert count == 7 and elapsed >= 0
+    assert session.failures == 0
+    assert "Cursors: [" in capsys.readouterr().out
+    assert saved.read_text() == "hello there"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["out.txt"]
+    assert not session.documents.documents
+
+def test_unknown_and_incomplete_commands_are_errors(capsys):
+    """
+    Test that unknown commands, missing arguments and invalid ones are reported and counted.
+    """
+    session = main.Session(interactive=False)
+    main.run_command(session, "frobnicate")
+    assert "Unknown command" in capsys.readouterr().out
+    main.run_command(session, "undo now")
+    main.run_command(session, "insert")
+    assert capsys.readouterr().out == "Unknown command. Type 'help' for a list of commands.\nUsage: insert <text>\n"
+    main.run_command(session, "move x")
+    assert capsys.readouterr().out == "Invalid position\n"
+    assert session.failures == 4
+    assert session.running
+    session.documents.close_all()
+
+def test_main_exit_status(tmp_path, capsys):
+    """
+    Test that a script run exits with 1 if any command failed, and 0 otherwise.
+    """
+    assert main.main([write_script(tmp_path, "insert text", "exit")]) == 0
+    assert "Ran 2 commands" in capsys.readouterr().err
+
+    assert main.main([write_script(tmp_path, "insert text", "bogus", "save %s" % tmp_path)]) == 1
+    assert "2 commands failed" in capsys.readouterr().err
+
+def test_failing_commands_do_not_stop_a_script(tmp_path, monkeypatch, capsys):
+    """
+    Test that commands failing with IndexError or OSError are reported and counted,
+    and the commands after them still run.
+    """
+    def out_of_range(session, argument):
+        raise IndexError("Line out of range")
+
+    def unreadable(session, argument):
+        raise PermissionError("Permission denied: 'locked.txt'")
+
+    monkeypatch.setitem(main.COMMANDS, "line", (out_of_range, "<n>", ""))
+    monkeypatch.setitem(main.COMMANDS, "load", (unreadable, "[file]", ""))
+    saved = tmp_path / "out.txt"
+    session = main.Session(interactive=False)
+    count, _ = main.run_script(session, ["insert a", "line 5", "load locked.txt", "insert b",
+                                         "save %s" % saved])
+    assert count == 5
+    assert session.failures == 2
+    assert saved.read_text() == "ab"
+    assert capsys.readouterr().out.splitlines()[-2:] == ["Line out of range", "Permission denied: 'locked.txt'"]
+
+    script = write_script(tmp_path, "insert a", "line 5", "insert b")
+    assert main.main([script]) == 1
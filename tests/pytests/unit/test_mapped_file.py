@@ -0,0 +1,158 @@
+import threading
+
+import pytest
+
+from app.editor_buffer.gap_buffer import GapBuffer
+from app.editor_buffer.piece_table import PieceTable
+from app.utils.file_manager import FileManager
+from app.utils.mapped_file import MappedText
+
+
+SAMPLE = "héllo wörld ✓ line\n" * 50
+
+
+@pytest.fixture
+def sample_file(tmp_path, monkeypatch):
+    """
+    Write a multi-byte UTF-8 file and use tiny blocks so it spans many of them.
+    """
+    monkeypatch.setattr(MappedText, "BLOCK_SIZE", 7)
+    monkeypatch.setattr(MappedText, "CACHED_BLOCKS", 2)
+    path = tmp_path / "sample.txt"
+    path.write_bytes(SAMPLE.encode("utf-8"))
+    return str(path)
+
+def test_mapped_text_slices_match_file(sample_file):
+    """
+    Test that length and arbitrary slices match the decoded file, including across blocks.
+    """
+    mapped = FileManager.map_file(sample_file)
+    assert len(mapped) == len(SAMPLE)
+    for start, stop in [(0, 5), (3, 40), (100, 101), (0, len(SAMPLE)), (len(SAMPLE) - 3, len(SAMPLE) + 10)]:
+        assert mapped[start:stop] == SAMPLE[start:stop]
+    mapped.close()
+
+def test_mapped_text_is_sliced_from_several_threads(sample_file):
+    """
+    Test that threads slicing the same view at once, through its small shared block
+    cache, all read the right text.
+    """
+    mapped = FileManager.map_file(sample_file)
+    bad = []
+
+    def reader(seed):
+        for step in range(300):
+            start = (seed * 37 + step * 11) % len(SAMPLE)
+            if mapped[start:start + 23] != SAMPLE[start:start + 23]:
+                bad.append(start)
+
+    threads = [threading.Thread(target=reader, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert not bad
+    mapped.close()
+
+def test_block_cache_keeps_the_most_recently_used(sample_file):
+    """
+    Test that a block read again is kept in the cache over older ones.
+    """
+    mapped = FileManager.map_file(sample_file)
+    first, second, third = (mapped._char_starts[index] for index in range(3))
+    for start in (first, second, first, third):
+        mapped[start:start + 1]
+    assert list(mapped._cache) == [0, 2]
+    mapped.close()
+
+def test_map_empty_and_missing_file(tmp_path):
+    """
+    Test mapping an empty file and that a missing file raises FileNotFoundError.
+    """
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+    assert FileManager.map_file(str(empty))[:] == ""
+
+    with pytest.raises(FileNotFoundError):
+        FileManager.map_file(str(tmp_path / "missing.txt"))
+
+def test_piece_table_loads_lazily(sample_file):
+    """
+    Test that the piece table keeps the mapped view as its original text.
+    """
+    pt = PieceTable()
+    pt.load_from_file(sample_file)
+    assert isinstance(pt.original, MappedText)
+    pt.select(1, 4)
+    assert pt.get_selection() == "éll"
+
+def test_piece_table_saves_over_its_mapped_file(sample_file):
+    """
+    Test that saving over the mapped file keeps the document intact.
+    """
+    pt = PieceTable()
+    pt.load_from_file(sample_file)
+    pt.insert(">> ")
+    pt.save_to_file(sample_file)
+    assert pt.get_text() == ">> " + SAMPLE
+    assert FileManager.load_from_file(sample_file) == ">> " + SAMPLE
+
+def test_gap_buffer_load_is_not_an_undo_step(sample_file):
+    """
+    Test that loading into a gap buffer does not leave an undo entry behind.
+    """
+    gb = GapBuffer()
+    gb.load_from_file(sample_file)
+    assert gb.get_text() == SAMPLE
+    assert not gb.undo_stack
+
+def test_unmappable_files_are_read_in_text_mode(tmp_path):
+    """
+    Test that CRLF files load with the same newlines as the other engines, and that
+    invalid UTF-8 fails at load time.
+    """
+    crlf = tmp_path / "crlf.txt"
+    crlf.write_bytes(b"ab\r\ncd\r\n")
+    pt = PieceTable()
+    pt.load_from_file(str(crlf))
+    assert pt.get_text() == "ab\ncd\n"
+    assert pt.get_line(0) == "ab"
+
+    with pytest.raises(ValueError):
+        MappedText(str(crlf))
+    invalid = tmp_path / "invalid.txt"
+    invalid.write_bytes(b"ok \xff\xfe")
+    with pytest.raises(ValueError):
+        FileManager.map_file(str(invalid))
+
+def test_loading_again_closes_the_previous_map(sample_file):
+    """
+    Test that loading another file releases the mapped original.
+    """
+    pt = PieceTable()
+    pt.load_from_file(sample_file)
+    mapped = pt.original
+    pt.load_from_file(sample_file)
+    assert mapped._file.closed
+    assert pt.get_text() == SAMPLE
+
+def test_snapshot_keeps_the_map_open(sample_file, tmp_path):
+    """
+    Test that a snapshot of a piece table can still be read after the table loads
+    another file or is closed, and that the map is closed once the snapshot goes.
+    """
+    other = tmp_path / "other.txt"
+    other.write_text("other\n")
+    for release in ("load", "close"):
+        pt = PieceTable()
+        pt.load_from_file(sample_file)
+        mapped = pt.original
+        snapshot = pt.snapshot()
+        if release == "load":
+            pt.load_from_file(str(other))
+        else:
+            pt.close()
+        assert not mapped._file.closed
+        assert snapshot.get_text() == SAMPLE
+        del snapshot
+        assert mapped._file.closed
@@ -0,0 +1,96 @@
+import pytest
+
+from app.editor_buffer import gap_buffer, text_buffer
+from app.editor_buffer.engines import ENGINES, create_buffer
+
+
+TEXT = "alpha\nbeta\ngamma\n"
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    A buffer of every engine with a cursor at the start of each line.
+    """
+    buf = create_buffer(request.param)
+    buf.insert(TEXT)
+    buf.move_cursor(6)
+    buf.add_cursor(0)
+    buf.add_cursor(11)
+    return buf
+
+def test_insert_at_cursors(buffer):
+    """
+    Test that text goes in at every cursor and every cursor moves past its own insert.
+    """
+    assert buffer.get_cursors() == [0, 6, 11]
+    buffer.insert_at_cursors("- ")
+    assert buffer.get_text() == "- alpha\n- beta\n- gamma\n"
+    assert buffer.get_cursors() == [2, 10, 17]
+    assert buffer.cursor == 10
+
+    buffer.insert_at_cursors("*")
+    assert buffer.get_text() == "- *alpha\n- *beta\n- *gamma\n"
+
+def test_delete_at_cursors_merges_overlaps(buffer):
+    """
+    Test deleting after every cursor, with overlapping deletions merged.
+    """
+    buffer.add_cursor(2)
+    buffer.delete_at_cursors(3)
+    assert buffer.get_text() == "\na\nma\n"
+    assert buffer.get_cursors() == [0, 1, 3]
+
+    with pytest.raises(ValueError):
+        buffer.delete_at_cursors(-1)
+
+def test_multi_cursor_edit_is_one_undo_step(buffer):
+    """
+    Test that one multi-cursor edit is undone and redone as a single step.
+    """
+    buffer.insert_at_cursors("> ")
+    buffer.undo()
+    assert buffer.get_text() == TEXT
+    assert buffer.cursor == 6
+    buffer.redo()
+    assert buffer.get_text() == "> alpha\n> beta\n> gamma\n"
+
+def test_other_edits_drop_secondary_cursors(buffer):
+    """
+    Test that a single-cursor edit leaves only the primary cursor.
+    """
+    buffer.insert("x")
+    assert buffer.get_cursors() == [7]
+
+    buffer.clear_cursors()
+    with pytest.raises(ValueError):
+        buffer.add_cursor(100)
+
+def test_listeners_see_each_edit_of_a_small_batch(buffer, monkeypatch):
+    """
+    Test that small batches are reported edit by edit, last first, and large ones as
+    a whole-document change.
+    """
+    seen = []
+    buffer.add_edit_listener(lambda *edit: seen.append(edit))
+    buffer.insert_at_cursors("#")
+    assert seen == [(11, "", "#"), (6, "", "#"), (0, "", "#")]
+
+    monkeypatch.setattr(text_buffer, "NOTIFY_BATCH_LIMIT", 2)
+    seen.clear()
+    buffer.replace_all("#", "")
+    assert seen == [(None, "", "")]
+
+@pytest.mark.parametrize("edit_cost", [0, 10 ** 9])
+def test_gap_buffer_sweep_and_rebuild(monkeypatch, edit_cost):
+    """
+    Test that the gap buffer gives the same result whether a batch is swept or rebuilt.
+    """
+    monkeypatch.setattr(gap_buffer, "SWEEP_EDIT_COST", edit_cost)
+    buf = gap_buffer.GapBuffer(initial_size=4)
+    buf.insert("ab" * 20)
+    assert buf.replace_all("b", "xyz") == 20
+    assert buf.get_text() == "axyz" * 20
+    assert buf.cursor == 4
+    buf.undo()
+    assert buf.get_text() == "ab" * 20
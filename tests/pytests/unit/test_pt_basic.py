@@ -0,0 +1,86 @@
+import pytest
+
+from app.editor_buffer.engines import ENGINES, create_buffer
+from app.editor_buffer.piece_table import ADDED, ORIGINAL, PieceTable
+from app.editor_buffer.text_buffer import TextBuffer
+
+
+def test_init():
+    """
+    Test that a new piece table holds the original text as a single piece.
+    """
+    pt = PieceTable("hello")
+    assert pt.get_text() == "hello"
+    assert pt.pieces == [(ORIGINAL, 0, 5)]
+    assert pt.cursor == 0
+
+def test_insert_splits_piece():
+    """
+    Test that inserting inside the original text splits its piece without copying it.
+    """
+    pt = PieceTable("hello world")
+    pt.move_cursor(5)
+    pt.insert(",")
+    assert pt.get_text() == "hello, world"
+    assert pt.pieces == [(ORIGINAL, 0, 5), (ADDED, 0, 1), (ORIGINAL, 5, 6)]
+    assert pt.original == "hello world", "Original text must never change"
+
+def test_consecutive_inserts_extend_piece():
+    """
+    Test that typing character by character grows a single added piece.
+    """
+    pt = PieceTable()
+    for char in "abc":
+        pt.insert(char)
+    assert pt.get_text() == "abc"
+    assert pt.pieces == [(ADDED, 0, 3)]
+
+def test_delete_across_pieces():
+    """
+    Test deleting a span that starts and ends inside different pieces.
+    """
+    pt = PieceTable("hello world")
+    pt.move_cursor(5)
+    pt.insert(" big")
+    pt.move_cursor(3)
+    pt.delete(6)
+    assert pt.get_text() == "hel world"
+
+    pt.undo()
+    assert pt.get_text() == "hello big world"
+
+def test_selection_and_undo_redo():
+    """
+    Test selection, delete_selection and undo/redo through the shared interface.
+    """
+    pt = PieceTable("Hello, world!")
+    pt.select(7, 12)
+    assert pt.get_selection() == "world"
+    pt.delete_selection()
+    assert pt.get_text() == "Hello, !"
+
+    pt.undo()
+    assert pt.get_text() == "Hello, world!"
+    pt.redo()
+    assert pt.get_text() == "Hello, !"
+
+@pytest.mark.parametrize("engine", list(ENGINES))
+def test_engines_share_interface(engine):
+    """
+    Test that every registered engine implements TextBuffer and edits identically.
+    """
+    buf = create_buffer(engine)
+    assert isinstance(buf, TextBuffer)
+    buf.insert("abc")
+    buf.move_cursor(0)
+    buf.insert("X")
+    buf.move_cursor(2)
+    buf.delete(1)
+    assert buf.get_text() == "Xac"
+
+def test_unknown_engine_raises():
+    """
+    Test that asking for an unknown engine raises ValueError.
+    """
+    with pytest.raises(ValueError):
+        create_buffer("rope-ish")
@@ -0,0 +1,78 @@
+import pytest
+
+from app.editor_buffer.engines import ENGINES, create_buffer
+
+
+TEXT = "Hello, world!\nSecond line\n"
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    A buffer of every engine, with the cursor in the middle of the text.
+    """
+    buf = create_buffer(request.param)
+    buf.insert(TEXT)
+    buf.move_cursor(9)
+    return buf
+
+def test_get_range_reads_only_the_span(buffer, monkeypatch):
+    """
+    Test get_range, and that neither it nor get_selection builds the whole text.
+    """
+    monkeypatch.setattr(buffer, "get_text", lambda: pytest.fail("get_text called"))
+    assert buffer.get_range(7, 12) == "world"
+    assert buffer.get_range(3, 3) == ""
+    buffer.select(14, 20)
+    assert buffer.get_selection() == "Second"
+
+    with pytest.raises(ValueError):
+        buffer.get_range(5, 2)
+    with pytest.raises(ValueError):
+        buffer.get_range(0, len(TEXT) + 1)
+
+def test_delete_range(buffer):
+    """
+    Test that delete_range removes the span in one undo step and clears the selection.
+    """
+    buffer.select(0, 3)
+    buffer.delete_range(5, 12)
+    assert buffer.get_text() == "Hello!\nSecond line\n"
+    assert buffer.cursor == 5
+    assert buffer.get_selection() == ""
+
+    buffer.undo()
+    assert buffer.get_text() == TEXT
+    assert buffer.cursor == 9
+    assert (buffer.selection_start, buffer.selection_end) == (0, 3)
+
+def test_replace_range_is_one_undo_step(buffer):
+    """
+    Test replacing, inserting into and emptying ranges, each undone in one step.
+    """
+    buffer.replace_range(7, 12, "there")
+    assert buffer.get_text() == "Hello, there!\nSecond line\n"
+    assert buffer.cursor == 12
+
+    buffer.replace_range(0, 0, ">> ")
+    buffer.replace_range(17, 24, "")
+    assert buffer.get_text() == ">> Hello, there!\nline\n"
+
+    buffer.undo()
+    buffer.undo()
+    assert buffer.get_text() == "Hello, there!\nSecond line\n"
+    buffer.undo()
+    assert buffer.get_text() == TEXT
+    buffer.redo()
+    assert buffer.get_text() == "Hello, there!\nSecond line\n"
+
+def test_stale_selection_is_clamped(buffer):
+    """
+    Test that a selection left past the end of the text by later edits is clamped.
+    """
+    buffer.select(14, len(TEXT))
+    buffer.move_cursor(0)
+    buffer.delete(5)
+    assert buffer.get_selection() == "d line\n"
+    buffer.delete_selection()
+    assert buffer.get_text() == ", world!\nSecon"
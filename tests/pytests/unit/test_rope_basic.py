@@ -0,0 +1,83 @@
+import pytest
+
+from app.editor_buffer import rope
+from app.editor_buffer.rope import Rope, build, concat, split
+
+
+@pytest.fixture
+def small_leaves(monkeypatch):
+    """
+    Use tiny leaves so short strings still produce deep trees.
+    """
+    monkeypatch.setattr(rope, "LEAF_SIZE", 4)
+
+
+def check_balanced(node):
+    """
+    Assert that every branch is AVL balanced with correct cached values, returning its height.
+    """
+    if node is None or node.is_leaf:
+        return 0
+    left, right = check_balanced(node.left), check_balanced(node.right)
+    assert abs(left - right) <= 1, "Rope is not balanced"
+    assert node.length == node.left.length + node.right.length
+    assert node.newlines == node.left.newlines + node.right.newlines
+    return 1 + max(left, right)
+
+def test_build_split_concat(small_leaves):
+    """
+    Test that splitting and re-joining a rope gives back the same text and stays balanced.
+    """
+    text = "".join(chr(ord("a") + i % 26) for i in range(200))
+    root = build(text)
+    for index in (0, 1, 57, 199, 200):
+        left, right = split(root, index)
+        joined = concat(left, right)
+        check_balanced(joined)
+        chunks = []
+        rope._collect(joined, 0, joined.length, chunks)
+        assert "".join(chunks) == text
+
+def test_edits_and_line_count(small_leaves):
+    """
+    Test insert, delete and cached line counts on a multi-leaf rope.
+    """
+    r = Rope("line one\nline two\nline three")
+    assert r.line_count == 3
+
+    r.move_cursor(9)
+    r.insert("inserted\n")
+    assert r.get_text() == "line one\ninserted\nline two\nline three"
+    assert r.line_count == 4
+
+    r.move_cursor(0)
+    r.delete(9)
+    assert r.get_text() == "inserted\nline two\nline three"
+    assert r.line_count == 3
+    check_balanced(r.root)
+
+def test_selection_reads_only_range(small_leaves):
+    """
+    Test that get_selection returns the right slice across several leaves.
+    """
+    r = Rope("Hello, world!")
+    r.select(3, 11)
+    assert r.get_selection() == "lo, worl"
+
+def test_undo_redo_and_snapshot(small_leaves):
+    """
+    Test undo/redo of edits and of an explicit record_state() checkpoint.
+    """
+    r = Rope("abc")
+    r.record_state()
+    r.move_cursor(3)
+    r.insert("def")
+    r.undo()
+    r.undo()
+    assert r.get_text() == "abc"
+    r.undo()
+    assert r.get_text() == "abc"
+    r.redo()
+    r.redo()
+    r.redo()
+    assert r.get_text() == "abcdef"
@@ -0,0 +1,113 @@
+import re
+
+import pytest
+
+from app.editor_buffer import search, text_buffer
+from app.editor_buffer.engines import ENGINES, create_buffer
+
+
+TEXT = "one fish\ntwo fish\nred fish\nblue fish"
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request, monkeypatch):
+    """
+    A buffer of every engine, searched in tiny windows so matches straddle them.
+    """
+    monkeypatch.setattr(search, "SEARCH_CHUNK_SIZE", 4)
+    monkeypatch.setattr(search, "MAX_REGEX_MATCH", 8)
+    buf = create_buffer(request.param)
+    buf.insert(TEXT)
+    buf.move_cursor(13)  # Put the gap in the middle of a match
+    return buf
+
+def test_find_and_find_all(buffer):
+    """
+    Test find and lazy find_all against str.find, including matches across windows.
+    """
+    expected = [i for i in range(len(TEXT)) if TEXT.startswith("fish", i)]
+    assert list(buffer.find_all("fish")) == expected
+    assert buffer.find("fish", 10) == TEXT.find("fish", 10)
+    assert buffer.find("whale") == -1
+
+    with pytest.raises(ValueError):
+        buffer.find("")
+
+def test_find_all_is_lazy(buffer):
+    """
+    Test that find_all returns a generator that can stop after the first match.
+    """
+    matches = buffer.find_all("fish")
+    assert next(matches) == 4
+
+def test_find_regex(buffer):
+    """
+    Test regex search with anchors, compared with re.finditer on the whole text.
+    """
+    pattern = re.compile(r"^\w+ fish$", re.MULTILINE)
+    expected = [(m.start(), m.end()) for m in pattern.finditer(TEXT)]
+    assert list(buffer.find_regex(pattern)) == expected
+    assert list(buffer.find_regex(r"b\w+", 20)) == [(27, 31)]
+
+def test_find_next_selects_and_wraps(buffer):
+    """
+    Test that find_next selects successive matches and wraps to the start.
+    """
+    buffer.move_cursor(0)
+    starts = [buffer.find_next("fish") for _ in range(5)]
+    assert starts == [4, 13, 22, 32, 4]
+    assert buffer.get_selection() == "fish"
+    assert buffer.cursor == 8
+
+def test_replace_all_is_one_undo_step(buffer):
+    """
+    Test that replace_all replaces every match (including one split by the gap)
+    and that a single undo/redo reverts/reapplies all of them.
+    """
+    assert buffer.replace_all("fish", "cat\n") == 4
+    assert buffer.get_text() == TEXT.replace("fish", "cat\n")
+    assert buffer.line_count == 8
+    assert buffer.get_line(1) == ""
+
+    buffer.undo()
+    assert buffer.get_text() == TEXT
+    assert buffer.cursor == 13
+    buffer.redo()
+    assert buffer.get_text() == TEXT.replace("fish", "cat\n")
+
+def test_dense_replace_all_records_only_positions(buffer, monkeypatch):
+    """
+    Test that a replace_all with many matches rebuilds the text and keeps a compact
+    undo entry that still undoes and redoes exactly.
+    """
+    monkeypatch.setattr(text_buffer, "NOTIFY_BATCH_LIMIT", 2)
+    changes = []
+    buffer.add_edit_listener(lambda *change: changes.append(change))
+    assert buffer.replace_all("fish", "cat\n") == 4
+    assert buffer.get_text() == TEXT.replace("fish", "cat\n")
+    assert buffer.cursor == 4 + len("cat\n")
+    assert changes == [(None, "", "")]
+    entry = buffer.undo_stack[-1]
+    assert entry["type"] == "replace"
+    assert list(entry["positions"]) == [4, 13, 22, 32]
+
+    buffer.undo()
+    assert buffer.get_text() == TEXT
+    assert buffer.cursor == 13
+    assert buffer.get_line(3) == "blue fish"
+    buffer.redo()
+    assert buffer.get_text() == TEXT.replace("fish", "cat\n")
+
+def test_replace_all_edge_cases(buffer):
+    """
+    Test replace_all with no matches, an empty replacement and an empty pattern.
+    """
+    history = len(buffer.undo_stack)
+    assert buffer.replace_all("whale", "x") == 0
+    assert len(buffer.undo_stack) == history
+
+    assert buffer.replace_all(" fish", "") == 4
+    assert buffer.get_text() == "one\ntwo\nred\nblue"
+
+    with pytest.raises(ValueError):
+        buffer.replace_all("", "x")
@@ -0,0 +1,126 @@
+import threading
+
+import pytest
+
+from app.editor_buffer.engines import ENGINES, create_buffer
+from app.editor_buffer.gap_buffer import LIST_SLOT_BYTES, GapBuffer
+from app.editor_buffer.stats import bucket_label
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    A buffer of every engine with stats turned on.
+    """
+    buf = create_buffer(request.param)
+    buf.configure_stats()
+    return buf
+
+def test_operations_are_counted_and_timed(buffer):
+    """
+    Test that every call is recorded once, with only the outermost operation timed.
+    """
+    buffer.insert("Hello, world!")
+    buffer.move_cursor(0)
+    buffer.replace_range(7, 12, "there")
+    buffer.undo()
+
+    operations = buffer.get_stats()["operations"]
+    assert {name: timing["calls"] for name, timing in operations.items()} == {
+        "insert": 1, "move_cursor": 1, "replace_range": 1, "undo": 1}
+    timing = operations["replace_range"]
+    assert 0 < timing["mean_us"] <= timing["max_us"] <= timing["total_us"]
+    assert sum(timing["histogram"].values()) == 1
+
+def test_stats_off_collects_nothing(buffer):
+    """
+    Test that turning stats off removes the timing wrappers and the collected stats.
+    """
+    assert "insert" in vars(buffer)
+    buffer.configure_stats(False)
+    assert "insert" not in vars(buffer)
+    assert buffer.get_stats() is None
+
+    buffer.insert("text")
+    buffer.reset_stats()
+    buffer.configure_stats()
+    assert buffer.get_stats()["operations"] == {}
+
+def test_undo_memory_and_reset(buffer):
+    """
+    Test the undo counters and the history and memory figures in the report.
+    """
+    buffer.insert("one")
+    buffer.insert(" two")
+    stats = buffer.get_stats()
+    assert stats["counters"]["undo_entries"] == 2
+    assert stats["counters"]["largest_undo_entry"] <= stats["counters"]["undo_entry_bytes"]
+    assert stats["history"]["undo_bytes"] == stats["counters"]["undo_entry_bytes"]
+    assert stats["memory_bytes"] == buffer.memory_usage()
+
+    buffer.reset_stats()
+    assert buffer.get_stats()["operations"] == {}
+    assert buffer.get_stats()["counters"] == {}
+
+def test_stats_survive_loading(buffer, tmp_path):
+    """
+    Test that loading a file (which re-initialises the engine) keeps stats on.
+    """
+    path = tmp_path / "doc.txt"
+    path.write_text("content")
+    buffer.load_from_file(str(path))
+    buffer.get_text()
+    assert set(buffer.get_stats()["operations"]) == {"load_from_file", "get_text"}
+
+@pytest.mark.parametrize("storage", ["list", "array"])
+def test_gap_buffer_counters(storage):
+    """
+    Test the gap buffer's gap move, resize and copy counters.
+    """
+    buf = GapBuffer(initial_size=4, storage=storage)
+    buf.configure_growth(min_gap=0)
+    buf.configure_stats()
+    buf.insert("abcdef")
+    buf.move_cursor(2)
+    buf.move_cursor(5)
+    counters = buf.get_stats()["counters"]
+    assert counters["resizes"] == 1
+    assert counters["largest_buffer"] == 12
+    assert counters["gap_moves"] == 2
+    assert counters["gap_move_distance"] == 7
+    slot = buf.buffer.itemsize if storage == "array" else LIST_SLOT_BYTES
+    assert counters["bytes_copied"] == 7 * slot
+
+def test_bucket_labels():
+    """
+    Test the histogram bucket labels.
+    """
+    assert bucket_label(0) == "<1us"
+    assert bucket_label(6) == "<64us"
+    assert bucket_label(11) == "<2ms"
+
+def test_concurrent_readers_are_all_timed():
+    """
+    Test that reads made by several threads at once under the read lock are each
+    recorded, however their calls interleave.
+    """
+    buf = create_buffer("rope")
+    buf.insert("text " * 100)
+    buf.configure_locking()
+    buf.configure_stats()
+    barrier = threading.Barrier(4)
+
+    def reader():
+        barrier.wait()
+        for _ in range(500):
+            buf.get_text()
+            buf.find("text")
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    operations = buf.get_stats()["operations"]
+    assert operations["get_text"]["calls"] == operations["find"]["calls"] == 2000
+    assert sum(operations["find"]["histogram"].values()) == 2000
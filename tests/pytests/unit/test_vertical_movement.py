@@ -0,0 +1,57 @@
+import pytest
+
+from app.editor_buffer.engines import ENGINES, create_buffer
+
+
+@pytest.fixture(params=list(ENGINES))
+def buffer(request):
+    """
+    A buffer of every engine holding a long, a short and another long line.
+    """
+    buf = create_buffer(request.param)
+    buf.insert("a long first line\nshort\nanother long line")
+    return buf
+
+def test_goal_column_is_remembered(buffer):
+    """
+    Test that moving through a short line snaps back to the original column.
+    """
+    buffer.move_cursor(12)                  # line 0, column 12
+    buffer.move_down()
+    assert buffer.offset_to_line_col(buffer.cursor) == (1, 5), "Should clamp to the short line"
+    buffer.move_down()
+    assert buffer.offset_to_line_col(buffer.cursor) == (2, 12), "Should return to the goal column"
+    buffer.move_up()
+    buffer.move_up()
+    assert buffer.offset_to_line_col(buffer.cursor) == (0, 12)
+
+def test_goal_column_reset_by_other_moves(buffer):
+    """
+    Test that a horizontal move or an edit replaces the remembered column.
+    """
+    buffer.move_cursor(12)
+    buffer.move_down()                      # (1, 5)
+    buffer.move_cursor(buffer.cursor - 2)   # (1, 3)
+    buffer.move_down()
+    assert buffer.offset_to_line_col(buffer.cursor) == (2, 3)
+
+def test_move_past_first_and_last_line(buffer):
+    """
+    Test that moving up from the first line or down from the last does nothing.
+    """
+    buffer.move_cursor(3)
+    buffer.move_up()
+    assert buffer.cursor == 3
+    buffer.move_cursor(buffer.get_cursor_limit())
+    buffer.move_down()
+    assert buffer.cursor == buffer.get_cursor_limit()
+
+def test_line_start_and_end(buffer):
+    """
+    Test moving to the start and end of the current line.
+    """
+    buffer.move_cursor(20)                  # inside "short"
+    buffer.move_line_start()
+    assert buffer.offset_to_line_col(buffer.cursor) == (1, 0)
+    buffer.move_line_end()
+    assert buffer.offset_to_line_col(buffer.cursor) == (1, 5)
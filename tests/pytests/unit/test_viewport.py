@@ -0,0 +1,65 @@
+import pytest
+
+from app.editor_buffer.gap_buffer import GapBuffer
+from app.layout.viewport import Viewport
+from app.layout.word_wrap import WordWrapLayout
+
+
+@pytest.fixture
+def buffer():
+    """
+    A gap buffer holding ten numbered lines.
+    """
+    gb = GapBuffer()
+    gb.insert("\n".join(f"line {n}" for n in range(10)))
+    return gb
+
+def test_render_only_changed_rows(buffer):
+    """
+    Test that the first render draws every visible row and later ones only changes.
+    """
+    view = Viewport(buffer, height=3)
+    assert view.render() == [(0, 0, "line 0"), (1, 1, "line 1"), (2, 2, "line 2")]
+    assert view.render() == []
+
+    buffer.move_cursor(buffer.line_col_to_offset(1, 4))
+    buffer.insert("!")
+    assert view.render() == [(1, 1, "line! 1")]
+
+def test_only_visible_lines_are_fetched(buffer):
+    """
+    Test that the viewport reads no lines outside its window.
+    """
+    view = Viewport(buffer, height=2)
+    view.scroll_to(4)
+    view.render()
+    assert sorted(view._line_cache) == [4, 5]
+
+def test_inserting_a_line_shifts_rows_below(buffer):
+    """
+    Test that adding a line redraws the rows that moved down.
+    """
+    view = Viewport(buffer, height=3)
+    view.render()
+    buffer.move_cursor(buffer.line_col_to_offset(1, 0))
+    buffer.insert("new\n")
+    assert view.render() == [(1, 1, "new"), (2, 2, "line 1")]
+
+def test_follow_cursor_scrolls(buffer):
+    """
+    Test that the window scrolls just enough to keep the cursor visible.
+    """
+    view = Viewport(buffer, height=3)
+    buffer.move_cursor(buffer.line_col_to_offset(7, 0))
+    view.follow_cursor()
+    assert view.top_line == 5
+    buffer.move_cursor(0)
+    view.follow_cursor()
+    assert view.top_line == 0
+
+def test_wrapped_rows_fill_the_viewport(buffer):
+    """
+    Test that with a layout, wrapped rows count towards the viewport height.
+    """
+    view = Viewport(buffer, height=3, layout=WordWrapLayout(buffer, 4))
+    assert view.render() == [(0, 0, "line"), (1, 0, "0"), (2, 1, "line")]
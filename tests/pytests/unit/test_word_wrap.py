@@ -0,0 +1,59 @@
+import pytest
+
+from app.editor_buffer.gap_buffer import GapBuffer
+from app.layout.word_wrap import WordWrapLayout, wrap_line
+
+
+def test_wrap_line_breaks_at_spaces():
+    """
+    Test greedy wrapping at spaces, hard breaks for long words and empty lines.
+    """
+    assert wrap_line("the quick brown fox", 10) == [(0, 9), (10, 19)]
+    assert wrap_line("abcdefghij", 4) == [(0, 4), (4, 8), (8, 10)]
+    assert wrap_line("", 5) == [(0, 0)]
+
+@pytest.fixture
+def layout():
+    """
+    A layout of width 10 over a three-line gap buffer, with every line wrapped once.
+    """
+    gb = GapBuffer()
+    gb.insert("the quick brown fox\nshort\njumps over the lazy dog")
+    wrap = WordWrapLayout(gb, 10)
+    wrap.visual_lines(0, 100)
+    return wrap
+
+def test_visual_lines(layout):
+    """
+    Test that visual lines are produced from the top line for the requested height.
+    """
+    assert layout.visual_lines(0, 3) == [(0, "the quick"), (0, "brown fox"), (1, "short")]
+    assert layout.visual_lines(2, 10) == [(2, "jumps over"), (2, "the lazy"), (2, "dog")]
+
+def test_edit_only_invalidates_touched_lines(layout):
+    """
+    Test that an edit forgets only the cached rows of the lines it changes.
+    """
+    gb = layout.buffer
+    gb.move_cursor(gb.line_col_to_offset(1, 5))
+    gb.insert(" line\nnew")
+    assert layout._rows[0] is not None
+    assert layout._rows[1] is None and layout._rows[2] is None
+    assert layout._rows[3] is not None
+    assert layout.visual_lines(1, 2) == [(1, "short line"), (2, "new")]
+
+    gb.undo()
+    assert len(layout._rows) == 3
+    assert layout.visual_lines(0, 10)[2] == (1, "short")
+
+def test_set_width_rewraps_lazily(layout):
+    """
+    Test that changing the width drops the cache and re-wraps on demand.
+    """
+    layout.set_width(20)
+    assert layout._rows is None
+    assert layout.visual_lines(0, 1) == [(0, "the quick brown fox")]
+    assert layout._rows[0] is not None and layout._rows[2] is None
+
+    with pytest.raises(ValueError):
+        layout.set_width(0)